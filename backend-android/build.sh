@@ -17,4 +17,4 @@ echo "📁 Collecting static files..."
 python manage.py collectstatic --noinput
 
 echo "✅ Build completed successfully!"
-echo "💡 To start the server, run: gunicorn --bind 0.0.0.0:8000 tars.wsgi:application"
+echo "💡 To start the server, run: gunicorn tars.wsgi:application"
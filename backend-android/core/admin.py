@@ -145,7 +145,8 @@ class ClassAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    # Kept in step with the enrollments by the website backend
+    readonly_fields = ['enrolled_count', 'created_at', 'updated_at']
 
 
 @admin.register(Resource)
@@ -0,0 +1,128 @@
+"""
+Async versions of the aggregate endpoints, for the ASGI deployment:
+
+    uvicorn tars.asgi:application --workers 2
+
+/api/async/home/ and /api/async/portal/ return the same bodies as
+/api/home/ and /api/portal/. DRF views are sync only, so these are plain
+Django async views. They run the same checks APIView would: allowed
+methods, then the DEFAULT_AUTHENTICATION_CLASSES. Errors are rendered
+with DRF's exception handler. Clients that send
+``Accept: application/msgpack`` get MessagePack, as from the DRF views.
+
+Django's async ORM (``afirst()``, ``aget()``, ``async for``) sends every
+query of a request through ``sync_to_async`` on one shared thread, so
+``asyncio.gather`` over those queries still runs them one after another.
+``gather_sections`` instead runs each independent section on its own
+executor thread, with that thread's own database connection, so the
+sections' round trips overlap. A section is its queries plus the
+serialization, which may query too.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .renderers import MessagePackRenderer
+from .snapshots import aget_home_snapshot, snapshot_data, snapshot_response
+from .views import PORTAL_SECTIONS
+
+
+def wants_msgpack(request):
+    return MessagePackRenderer.media_type in request.headers.get('Accept', '')
+
+
+def render_data(request, data, status=200):
+    if wants_msgpack(request):
+        body = MessagePackRenderer().render(data)
+        return HttpResponse(body, status=status, content_type=MessagePackRenderer.media_type)
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def error_response(request, exc):
+    """``exc`` rendered the way APIView.handle_exception renders it"""
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        header = authenticators[0].authenticate_header(request) if authenticators else None
+        if header:
+            exc.auth_header = header
+        else:
+            exc.status_code = 403
+    drf_response = exception_handler(exc, {})
+    response = render_data(request, drf_response.data, drf_response.status_code)
+    if drf_response.has_header('WWW-Authenticate'):
+        response['WWW-Authenticate'] = drf_response['WWW-Authenticate']
+    return response
+
+
+async def authenticated_user(request):
+    """The user found by the DRF authentication classes, or None; raises AuthenticationFailed"""
+    for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(auth().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def check_request(request, authenticated=False):
+    """An error response if a GET-only view must refuse ``request``, else None"""
+    try:
+        if request.method not in ('GET', 'HEAD'):
+            raise exceptions.MethodNotAllowed(request.method)
+        if authenticated:
+            user = await authenticated_user(request)
+            if user is None or not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        return error_response(request, exc)
+    return None
+
+
+def _run_section(build):
+    # Executor threads outlive requests: clean up their connections the
+    # way Django does around a request (CONN_MAX_AGE still applies)
+    close_old_connections()
+    try:
+        return build()
+    finally:
+        close_old_connections()
+
+
+async def gather_sections(sections):
+    """Build every ``{name: callable}`` section concurrently; returns ``{name: data}``."""
+    results = await asyncio.gather(*(
+        sync_to_async(_run_section, thread_sensitive=False)(build) for build in sections.values()
+    ))
+    return dict(zip(sections, results))
+
+
+@csrf_exempt
+async def home_page_data(request):
+    """
+    Async /api/home/: the HomeSnapshot row, read with the async ORM
+    """
+    error = await check_request(request)
+    if error:
+        return error
+    snapshot = await aget_home_snapshot()
+    if wants_msgpack(request):
+        return render_data(request, snapshot_data(snapshot))
+    return snapshot_response(request, snapshot)
+
+
+@csrf_exempt
+async def member_portal_data(request):
+    """
+    Async /api/portal/: classes and resources are queried and serialized concurrently
+    """
+    error = await check_request(request, authenticated=True)
+    if error:
+        return error
+    return render_data(request, await gather_sections(PORTAL_SECTIONS))
@@ -0,0 +1,99 @@
+"""
+JWT authentication with a cached principal.
+
+simplejwt's JWTAuthentication loads the user row on every authenticated
+request. CachedJWTAuthentication keeps a principal in the default cache
+under ``principal:v2:<user_id>`` for ``PRINCIPAL_CACHE_TIMEOUT`` seconds: the
+user's fields without the password hash, and the MD5 digest of the hash
+that revocation checks compare (what tokens already carry), so no hash
+ends up in the shared cache. The user is rebuilt from it with the password
+deferred. Saves and deletes of the user evict it through the invalidation
+bus (see core/signals.py), so deactivations and password changes apply at
+once.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .invalidation import invalidation_bus
+
+
+def principal_cache_key(user_id):
+    # v2: entries no longer hold User objects
+    return f'principal:v2:{user_id}'
+
+
+def invalidate_principal(*user_ids):
+    cache.delete_many([principal_cache_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def _principals_changed(user_ids):
+    # After a listener reconnect (None) entries expire with PRINCIPAL_CACHE_TIMEOUT
+    if user_ids:
+        invalidate_principal(*user_ids)
+
+
+invalidation_bus.subscribe('principal', _principals_changed)
+
+
+def load_principal(user_id):
+    """``(fields, password_digest)`` of the user with ``user_id``, False if there's none"""
+    User = get_user_model()
+    user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is None:
+        return False
+    fields = {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields if field.attname != 'password'
+    }
+    return fields, get_md5_hash_password(user.password)
+
+
+def get_principal(user_id):
+    """The cached user with ``user_id`` (password deferred), None if there's none"""
+    # False marks a user id that doesn't exist
+    principal = cache.get_or_set(
+        principal_cache_key(user_id),
+        lambda: load_principal(user_id),
+        getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 300),
+    )
+    if not principal:
+        return None
+    fields, digest = principal
+    User = get_user_model()
+    user = User.from_db(User._default_manager.db, list(fields), list(fields.values()))
+    user.password_digest = digest
+    return user
+
+
+def password_digest(user):
+    """get_md5_hash_password(user.password), without loading a deferred password"""
+    digest = getattr(user, 'password_digest', None)
+    return digest if digest is not None else get_md5_hash_password(user.password)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_principal(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest(user):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,82 @@
+import http.client
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .benchmark_gunicorn import free_port, load, summary, wait_until_up
+
+# (server, paths): the DRF views under gunicorn.conf.py, then the async
+# views under uvicorn; 'asgi-sync' shows what the sync views cost under ASGI
+RUNS = {
+    'wsgi': ('gunicorn', ('/api/home/', '/api/portal/')),
+    'asgi': ('uvicorn', ('/api/async/home/', '/api/async/portal/')),
+    'asgi-sync': ('uvicorn', ('/api/home/', '/api/portal/')),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare /api/home/ and /api/portal/ under gunicorn (WSGI) with "
+        "/api/async/home/ and /api/async/portal/ under uvicorn (ASGI): latency and throughput. Linux only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Worker processes for both servers")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent keep-alive clients")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per path and server")
+        parser.add_argument('--user', help="Username the portal requests authenticate as (default: first active user)")
+        parser.add_argument('--run', action='append', dest='runs', choices=list(RUNS))
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(is_active=True).order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No active user to authenticate the portal requests as; pass --user")
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        workers = options['workers']
+
+        for name in options['runs'] or list(RUNS):
+            server, paths = RUNS[name]
+            port = free_port()
+            if server == 'gunicorn':
+                argv = [
+                    sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                    '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'tars.wsgi:application',
+                ]
+                processes = workers + 1
+            else:
+                argv = [
+                    sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--port', str(port),
+                    '--workers', str(workers), '--no-access-log', 'tars.asgi:application',
+                ]
+                # A single uvicorn worker runs in the supervisor process
+                processes = workers + 1 if workers > 1 else 1
+            process = subprocess.Popen(argv, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_up(process, port, processes)
+                for path in paths:
+                    self.check_path(port, path, headers)
+                    latencies, errors = load(port, [path], options['concurrency'], options['duration'], headers)
+                    if not latencies:
+                        raise CommandError(f"{name} {path}: no successful requests")
+                    latencies.sort()
+                    self.stdout.write(f"{name:>9} {path:<18} {summary(latencies, options['duration'])}, {errors} errors")
+            finally:
+                process.terminate()
+                process.wait()
+
+    def check_path(self, port, path, headers):
+        # load() counts any status under 500 as served; make sure it's a 200
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        if response.status != 200:
+            raise CommandError(f"GET {path} returned {response.status}")
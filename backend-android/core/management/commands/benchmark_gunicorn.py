@@ -0,0 +1,162 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ('/api/home/', '/api/classes/', '/api/team-members/', '/api/health/')
+
+# 'bare' is what the start scripts used to run; 'tuned' reads gunicorn.conf.py
+SETUPS = {
+    'bare': ['--config', os.devnull, '--worker-class', 'sync'],
+    'tuned': ['--config', 'gunicorn.conf.py'],
+}
+
+
+def process_tree(pid):
+    """``pid`` and its child processes (Linux /proc)."""
+    pids = [pid]
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            pids += [int(child) for child in f.read().split()]
+    return pids
+
+
+def memory_kb(pid):
+    """(RSS, PSS) in kB; PSS splits pages shared copy-on-write between the processes using them."""
+    rss = pss = 0
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Rss:'):
+                rss = int(line.split()[1])
+            elif line.startswith('Pss:'):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+def wait_until_up(process, port, processes, timeout=60):
+    """Wait until ``process`` has ``processes`` processes in its tree and answers on ``port``."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"{process.args[2]} exited with status {process.returncode}")
+        # Up once every worker is forked and one of them answers
+        if len(process_tree(process.pid)) >= processes:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+                connection.request('GET', '/api/health/')
+                connection.getresponse().read()
+                connection.close()
+                return
+            except OSError:
+                pass
+        time.sleep(0.01)
+    raise CommandError(f"{process.args[2]} didn't come up within {timeout}s")
+
+
+def load(port, paths, concurrency, duration, headers=None):
+    """GET ``paths`` round-robin from keep-alive clients; returns (latencies in ms, errors)."""
+    headers = headers or {}
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        i = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            # A worker being recycled closes its keep-alive connections;
+            # retry once on a new one, as browsers and proxies do
+            for _ in range(2):
+                try:
+                    connection.request('GET', paths[i % len(paths)], headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status < 500
+                    break
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                    ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+            i += 1
+        connection.close()
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return latencies, errors[0]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def summary(latencies, duration):
+    """'req/s, p50, p95' for a sorted list of latencies"""
+    return (
+        f"{len(latencies) / duration:7.1f} req/s, "
+        f"p50 {latencies[len(latencies) // 2]:6.1f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:6.1f} ms"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a bare gunicorn with gunicorn.conf.py (preload, gthread): "
+        "boot time, throughput, latency and memory of master and workers. Linux only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help="Worker processes for both setups")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent keep-alive clients")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per setup")
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable)")
+        parser.add_argument('--setup', action='append', dest='setups', choices=sorted(SETUPS))
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError("benchmark_gunicorn reads process memory from /proc and needs Linux")
+        paths = options['paths'] or DEFAULT_PATHS
+
+        for name in options['setups'] or sorted(SETUPS):
+            port = free_port()
+            argv = [
+                sys.executable, '-m', 'gunicorn', *SETUPS[name],
+                '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']), 'tars.wsgi:application',
+            ]
+            started = time.perf_counter()
+            process = subprocess.Popen(argv, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_up(process, port, options['workers'] + 1)
+                boot_ms = (time.perf_counter() - started) * 1000
+                latencies, errors = load(port, paths, options['concurrency'], options['duration'])
+                pids = process_tree(process.pid)
+                rss, pss = map(sum, zip(*(memory_kb(pid) for pid in pids)))
+            finally:
+                process.terminate()
+                process.wait()
+
+            if not latencies:
+                raise CommandError(f"{name}: no successful requests")
+            latencies.sort()
+            self.stdout.write(
+                f"{name:>6}: {summary(latencies, options['duration'])}, {errors} errors; "
+                f"boot {boot_ms:.0f} ms; RSS {rss / 1024:.0f} MB, PSS {pss / 1024:.0f} MB over {len(pids)} processes"
+            )
@@ -0,0 +1,59 @@
+import gzip
+import json
+import time
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.renderers import MessagePackRenderer
+from core.views import home_page_data, member_portal_data, ClassViewSet, ResourceViewSet
+
+ENDPOINTS = (
+    ('portal', '/api/portal/', member_portal_data),
+    ('home', '/api/home/', home_page_data),
+    ('classes', '/api/classes/', ClassViewSet.as_view({'get': 'list'})),
+    ('resources', '/api/resources/', ResourceViewSet.as_view({'get': 'list'})),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare JSON and MessagePack payload sizes and encode/decode times on the current data"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = APIRequestFactory()
+        # Unsaved user: only has to pass IsAuthenticated
+        user = get_user_model()(username='benchmark')
+        formats = (
+            ('json', JSONRenderer(), json.loads),
+            ('msgpack', MessagePackRenderer(), msgpack.unpackb),
+        )
+
+        for name, path, view in ENDPOINTS:
+            # Non-JSON Accept: /api/home/ otherwise returns its stored JSON bytes
+            request = factory.get(path, HTTP_ACCEPT=MessagePackRenderer.media_type)
+            force_authenticate(request, user=user)
+            data = view(request).data
+
+            for label, renderer, decode in formats:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    body = renderer.render(data)
+                encode_us = (time.perf_counter() - started) * 1e6 / iterations
+
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    decode(body)
+                decode_us = (time.perf_counter() - started) * 1e6 / iterations
+
+                self.stdout.write(
+                    f"{name:>9} {label:>7}: {len(body):>7} bytes "
+                    f"({len(gzip.compress(body)):>6} gzipped), "
+                    f"encode {encode_us:8.1f} us, decode {decode_us:8.1f} us"
+                )
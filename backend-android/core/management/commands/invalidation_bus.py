@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core.invalidation import bus_settings, invalidation_bus
+
+
+class Command(BaseCommand):
+    help = (
+        "Watch or publish to the cross-process invalidation bus. Run 'listen' "
+        "in one terminal (or against the other backend) and 'publish' in another."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['listen', 'publish'])
+        parser.add_argument('topic', nargs='?', help="Topic to publish, e.g. profile or core.class")
+        parser.add_argument('keys', nargs='*', help="Keys to publish")
+
+    def handle(self, *args, **options):
+        bus = bus_settings()
+        if connections[bus['DATABASE']].vendor != 'postgresql':
+            raise CommandError("The invalidation bus needs PostgreSQL")
+
+        if options['action'] == 'publish':
+            if not options['topic'] or not options['keys']:
+                raise CommandError("publish needs a topic and at least one key")
+            with transaction.atomic():
+                invalidation_bus.publish(options['topic'], *options['keys'])
+            self.stdout.write(f"Published {len(options['keys'])} key(s) to {options['topic']!r}")
+            return
+
+        connection = invalidation_bus.listen_connection()
+        self.stdout.write(f"Listening on {bus['CHANNEL']!r}, Ctrl+C to stop")
+        try:
+            while True:
+                for payload in invalidation_bus.poll(connection):
+                    message = json.loads(payload)
+                    self.stdout.write(f"{message['origin']}: {message['topic']} {message['keys']}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -252,6 +252,16 @@ class Class(models.Model):
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
     
+    def save(self, *args, **kwargs):
+        # enrolled_count only moves by the website backend's conditional
+        # UPDATEs; writing back a stale copy would undo seats taken since
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'enrolled_count'
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def is_full(self):
         return self.enrolled_count >= self.max_participants
@@ -419,3 +429,50 @@ class Resource(models.Model):
         if self.tags:
             return [tag.strip() for tag in self.tags.split(',')]
         return []
+
+
+class Enrollment(models.Model):
+    """
+    A member's seat in a class.
+
+    The table is created by the website backend's migrations, which also
+    serve enrollment (backend/core/enrollment.py). It's mirrored here so
+    deleting a Member or Class cascades to it, and frees the seat (see
+    core/signals.py).
+    """
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='enrollments')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'core_enrollment'
+        ordering = ['course', 'created_at']
+        verbose_name = "Enrollment"
+        verbose_name_plural = "Enrollments"
+
+    def __str__(self):
+        return f"{self.member.user.username} - {self.course.title}"
+
+
+class HomeSnapshot(models.Model):
+    """
+    Pre-rendered /api/home/ payload, kept in a single row (pk=1).
+
+    The table is created by the website backend's migrations (see
+    backend/core/models.py); this backend only reads and rewrites the row.
+    """
+    body = models.BinaryField(default=b'', help_text="Rendered JSON")
+    gzip_body = models.BinaryField(default=b'')
+    brotli_body = models.BinaryField(null=True, blank=True, help_text="Empty when brotli isn't installed")
+    etag = models.CharField(max_length=64, blank=True)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False
+        db_table = 'core_homesnapshot'
+        verbose_name = "Home Snapshot"
+        verbose_name_plural = "Home Snapshots"
+
+    def __str__(self):
+        return f"Home Snapshot ({self.generated_at})"
@@ -0,0 +1,105 @@
+"""
+Cached user profile payloads for the auth profile endpoints.
+
+The profile (user fields plus the linked Member and TeamMember summaries)
+is built once and kept in the cache under ``profile:<user_id>``. Saves to
+User, Member, TeamMember and Domain evict the affected entries (see
+core/signals.py), so in the steady state a profile request is a single
+cache read. Evictions go through the invalidation bus (core/invalidation.py)
+so workers of both backends drop their copies too.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .invalidation import invalidation_bus
+
+
+def profile_cache_key(user_id):
+    return f'profile:{user_id}'
+
+
+def build_profile(user):
+    """Serialize a user with its Member and TeamMember summaries."""
+    member = getattr(user, 'member_profile', None)
+    team_member = getattr(user, 'team_member_profile', None)
+
+    member_summary = None
+    if member is not None:
+        member_summary = {
+            'id': member.id,
+            'domain': {
+                'id': member.domain.id,
+                'name': member.domain.name,
+                'display_name': member.domain.display_name,
+            } if member.domain else None,
+            'lead': {
+                'id': member.lead.id,
+                'name': member.lead.name,
+            } if member.lead else None,
+            'university_roll': member.university_roll,
+            'is_active': member.is_active,
+        }
+
+    team_member_summary = None
+    if team_member is not None:
+        team_member_summary = {
+            'id': team_member.id,
+            'name': team_member.name,
+            'role': team_member.role,
+            'role_display': team_member.get_role_display(),
+            'position': team_member.position,
+            'is_active': team_member.is_active,
+        }
+
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_staff': user.is_staff,
+        'is_active': user.is_active,
+        'date_joined': user.date_joined,
+        'member': member_summary,
+        'team_member': team_member_summary,
+    }
+
+
+def load_profile(user_id):
+    """Build a profile from the database in one query."""
+    User = get_user_model()
+    user = User.objects.select_related(
+        'member_profile__domain',
+        'member_profile__lead',
+        'team_member_profile',
+    ).get(pk=user_id)
+    return build_profile(user)
+
+
+def get_profile(user_id):
+    """Return the cached profile, loading it on a miss. None if the user is gone."""
+    User = get_user_model()
+    try:
+        # Single-flight on the two-tier cache: one load per expiry
+        return cache.get_or_set(
+            profile_cache_key(user_id),
+            lambda: load_profile(user_id),
+            getattr(settings, 'PROFILE_CACHE_TIMEOUT', 900),
+        )
+    except User.DoesNotExist:
+        return None
+
+
+def invalidate_profile(*user_ids):
+    cache.delete_many([profile_cache_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def _profiles_changed(user_ids):
+    # After a listener reconnect (None) stale entries expire with PROFILE_CACHE_TIMEOUT
+    if user_ids:
+        invalidate_profile(*user_ids)
+
+
+invalidation_bus.subscribe('profile', _profiles_changed)
@@ -0,0 +1,104 @@
+"""
+MessagePack wire format for the Android app.
+
+Clients that send ``Accept: application/msgpack`` get the same payloads as
+JSON, packed with MessagePack. Choice fields the app switches on
+(difficulty, status, category, role, platform) are sent as the index of
+the value in the model's choices; the tables are published by
+/api/info/ under ``msgpack_enums``.
+
+Only the fields a serializer lists in ``Meta.enum_fields`` are encoded,
+found through the serializer that produced the data (``serializer.data``
+keeps it) and its nested serializers. Other keys with the same names, such
+as the health check's ``status``, are sent unchanged, as are values outside
+a table.
+
+New choices must be appended to the end of a model's choices list so
+existing codes keep their meaning.
+"""
+
+from functools import lru_cache
+
+import msgpack
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Class, Resource, TeamMember, SocialLink
+
+ENUM_CHOICES = {
+    'difficulty': Class.DIFFICULTY_CHOICES,
+    'status': Class.STATUS_CHOICES,
+    'category': Resource.CATEGORY_CHOICES,
+    'role': TeamMember.ROLE_CHOICES,
+    'platform': SocialLink.PLATFORM_CHOICES,
+}
+
+# field -> {value: code}
+ENUM_CODES = {
+    field: {value: code for code, (value, _) in enumerate(choices)}
+    for field, choices in ENUM_CHOICES.items()
+}
+
+
+def enum_tables():
+    """field -> list of values, indexed by code"""
+    return {field: [value for value, _ in choices] for field, choices in ENUM_CHOICES.items()}
+
+
+@lru_cache(maxsize=None)
+def enum_schema(serializer_class):
+    """
+    ``(codes, nested)`` for a serializer class: ``{field: {value: code}}``
+    for its enum fields and ``{field: schema}`` for its nested serializers
+    """
+    codes = {field: ENUM_CODES[field] for field in getattr(serializer_class.Meta, 'enum_fields', ())}
+    nested = {}
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        if isinstance(field, serializers.Serializer):
+            nested[name] = enum_schema(type(field))
+    return codes, nested
+
+
+def serializer_schema(data):
+    """The schema of the serializer behind ``ReturnDict``/``ReturnList`` data, if any"""
+    serializer = getattr(data, 'serializer', None)
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if serializer is None or not hasattr(serializer, 'Meta'):
+        return None
+    return enum_schema(type(serializer))
+
+
+def encode_enums(data, schema=None):
+    schema = serializer_schema(data) or schema
+    if isinstance(data, dict):
+        codes, nested = schema or ({}, {})
+        encoded = {}
+        for key, value in data.items():
+            table = codes.get(key)
+            if table is not None and isinstance(value, str) and value in table:
+                encoded[key] = table[value]
+            else:
+                encoded[key] = encode_enums(value, nested.get(key))
+        return encoded
+    if isinstance(data, (list, tuple)):
+        return [encode_enums(item, schema) for item in data]
+    return data
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    # datetimes, Decimals, UUIDs, lazy strings etc. as the JSON renderer would
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(encode_enums(data), default=self._encoder.default, use_bin_type=True)
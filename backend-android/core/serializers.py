@@ -1,14 +1,91 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
+from .formatting import format_month, format_datetime
 from .models import SiteSettings, Sponsor, SocialLink, Class, Resource, TeamMember, Domain, Member
 
 
-class SiteSettingsSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that accepts ``fields=`` / ``omit=`` keyword arguments.
+
+    Dropped fields are removed before serialization, so their method and
+    property fields are never evaluated. ``Meta.field_dependencies`` maps
+    fields that aren't plain model fields (properties, SerializerMethodFields,
+    ``get_*_display``) to the model lookups they read, which lets
+    ``optimize_queryset`` work out the columns and relations to load.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if omit:
+            for name in set(self.fields) & set(omit):
+                self.fields.pop(name)
+
+    def _lookups_for(self, name, field):
+        dependencies = getattr(self.Meta, 'field_dependencies', {})
+        if name in dependencies:
+            return dependencies[name]
+        if field.source == '*':
+            return None
+        return [field.source.replace('.', '__')]
+
+    def optimize_queryset(self, queryset):
+        """
+        Restrict ``queryset`` to the columns and relations the remaining
+        fields need. Returns it unchanged if any field's needs are unknown.
+        """
+        model = self.Meta.model
+        only = {model._meta.pk.name}
+        select = set()
+        prefetch = set()
+
+        for name, field in self.fields.items():
+            lookups = self._lookups_for(name, field)
+            if lookups is None:
+                return queryset
+            for lookup in lookups:
+                if isinstance(lookup, Prefetch):
+                    prefetch.add(lookup)
+                    continue
+                parts = lookup.split('__')
+                try:
+                    model_field = model._meta.get_field(parts[0])
+                except FieldDoesNotExist:
+                    return queryset
+                if model_field.many_to_many or model_field.one_to_many:
+                    prefetch.add(parts[0])
+                elif model_field.is_relation:
+                    only.add(parts[0])
+                    # Reading through the relation (or a nested serializer) needs the row
+                    if len(parts) > 1 or isinstance(field, serializers.BaseSerializer):
+                        select.add(parts[0])
+                elif model_field.concrete:
+                    only.add(parts[0])
+                else:
+                    return queryset
+
+        queryset = queryset.select_related(None).prefetch_related(None).only(*only)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class SiteSettingsSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = SiteSettings
         fields = ['id', 'club_name', 'club_full_name', 'club_motto', 'club_logo', 'university_logo', 'hero_background', 'updated_at']
 
 
-class SponsorSerializer(serializers.ModelSerializer):
+class SponsorSerializer(DynamicFieldsModelSerializer):
     collaboration_date_formatted = serializers.SerializerMethodField()
     
     class Meta:
@@ -17,20 +94,28 @@ class SponsorSerializer(serializers.ModelSerializer):
             'id', 'name', 'logo', 'website', 'collaboration_agenda', 
             'collaboration_date', 'collaboration_date_formatted', 'is_active', 'order'
         ]
+        field_dependencies = {
+            'collaboration_date_formatted': ['collaboration_date'],
+        }
     
     def get_collaboration_date_formatted(self, obj):
-        return obj.collaboration_date.strftime('%B %Y')
+        return format_month(obj.collaboration_date)
 
 
-class SocialLinkSerializer(serializers.ModelSerializer):
+class SocialLinkSerializer(DynamicFieldsModelSerializer):
     platform_display = serializers.CharField(source='get_platform_display', read_only=True)
     
     class Meta:
         model = SocialLink
         fields = ['id', 'platform', 'platform_display', 'url', 'icon_class', 'is_active', 'order']
+        # Integer codes in MessagePack responses (core/renderers.py)
+        enum_fields = ['platform']
+        field_dependencies = {
+            'platform_display': ['platform'],
+        }
 
 
-class TeamMemberSerializer(serializers.ModelSerializer):
+class TeamMemberSerializer(DynamicFieldsModelSerializer):
     role_display = serializers.CharField(source='get_role_display', read_only=True)
 
     class Meta:
@@ -53,23 +138,31 @@ class TeamMemberSerializer(serializers.ModelSerializer):
             'order',
             'is_active',
         ]
+        enum_fields = ['role']
+        field_dependencies = {
+            'role_display': ['role'],
+        }
 
 
-class TeamMemberRefSerializer(serializers.ModelSerializer):
+class TeamMemberRefSerializer(DynamicFieldsModelSerializer):
     role_display = serializers.CharField(source='get_role_display', read_only=True)
 
     class Meta:
         model = TeamMember
         fields = ['id', 'name', 'role', 'role_display', 'position']
+        enum_fields = ['role']
+        field_dependencies = {
+            'role_display': ['role'],
+        }
 
 
-class DomainSerializer(serializers.ModelSerializer):
+class DomainSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Domain
         fields = ['id', 'name', 'display_name', 'description', 'logo', 'is_active']
 
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(DynamicFieldsModelSerializer):
     user_id = serializers.IntegerField(source='user.id', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
     domain = DomainSerializer(read_only=True)
@@ -95,7 +188,7 @@ class MemberSerializer(serializers.ModelSerializer):
         ]
 
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(DynamicFieldsModelSerializer):
     difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
     status_display = serializers.SerializerMethodField()
     mode = serializers.ReadOnlyField()
@@ -113,6 +206,16 @@ class ClassSerializer(serializers.ModelSerializer):
             'meeting_link', 'location', 'syllabus', 'is_active', 'order',
             'created_at', 'updated_at'
         ]
+        enum_fields = ['difficulty', 'status']
+        field_dependencies = {
+            'difficulty_display': ['difficulty'],
+            'status_display': ['status', 'start_date', 'end_date'],
+            'mode': ['meeting_link', 'location'],
+            'mode_display': ['meeting_link', 'location'],
+            'is_full': ['enrolled_count', 'max_participants'],
+            'is_joinable': ['status', 'is_active', 'start_date', 'end_date'],
+            'start_date_formatted': ['start_date'],
+        }
     
     def get_status_display(self, obj):
         """Return computed status display based on time"""
@@ -123,12 +226,12 @@ class ClassSerializer(serializers.ModelSerializer):
         if not obj.start_date:
             return "Date not set"
         try:
-            return obj.start_date.strftime('%B %d, %Y at %I:%M %p')
+            return format_datetime(obj.start_date)
         except Exception as e:
             return f"Invalid date: {str(e)}"
 
 
-class ResourceSerializer(serializers.ModelSerializer):
+class ResourceSerializer(DynamicFieldsModelSerializer):
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     tag_list = serializers.ReadOnlyField()
     
@@ -140,3 +243,8 @@ class ResourceSerializer(serializers.ModelSerializer):
             'is_active', 'download_count', 'order',
             'created_at', 'updated_at'
         ]
+        enum_fields = ['category']
+        field_dependencies = {
+            'category_display': ['category'],
+            'tag_list': ['tags'],
+        }
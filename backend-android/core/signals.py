@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import SiteSettings, Sponsor, SocialLink, Class, Enrollment, Resource, TeamMember, Domain, Member
+from .invalidation import invalidation_bus
+from . import authentication, profiles  # noqa: F401 - subscribe their bus handlers
+from .snapshots import refresh_home_snapshot_on_commit
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    invalidation_bus.publish('principal', instance.pk)
+    invalidation_bus.publish('profile', instance.pk)
+
+
+@receiver(pre_save, sender=Member)
+@receiver(pre_save, sender=TeamMember)
+def remember_previous_user(sender, instance, update_fields=None, **kwargs):
+    # An admin can move the profile to another user; the one it leaves goes stale too
+    instance.previous_user_id = None
+    if instance.pk is not None and (update_fields is None or 'user' in update_fields):
+        instance.previous_user_id = sender.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Member)
+def member_changed(sender, instance, **kwargs):
+    invalidation_bus.publish('profile', instance.user_id, getattr(instance, 'previous_user_id', None))
+
+
+# pre_delete for these two: the SET_NULL on Member runs before post_delete
+@receiver([post_save, pre_delete], sender=TeamMember)
+def team_member_changed(sender, instance, **kwargs):
+    # Members show their lead's name, so their profiles go stale too
+    led_user_ids = list(Member.objects.filter(lead=instance).values_list('user_id', flat=True))
+    invalidation_bus.publish(
+        'profile', instance.user_id, getattr(instance, 'previous_user_id', None), *led_user_ids
+    )
+
+
+@receiver([post_save, pre_delete], sender=Domain)
+def domain_changed(sender, instance, **kwargs):
+    invalidation_bus.publish('profile', *Member.objects.filter(domain=instance).values_list('user_id', flat=True))
+
+
+@receiver(request_started)
+def start_invalidation_listener(sender, **kwargs):
+    # Lazily, so each forked worker gets its own listener thread
+    invalidation_bus.ensure_listening()
+
+
+# Models behind the website backend's /api/suggest/ index
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=TeamMember)
+@receiver([post_save, post_delete], sender=Domain)
+def suggest_source_changed(sender, instance, **kwargs):
+    invalidation_bus.publish(sender._meta.label_lower, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=Sponsor)
+@receiver([post_save, post_delete], sender=TeamMember)
+@receiver([post_save, post_delete], sender=SocialLink)
+def home_source_changed(sender, instance, **kwargs):
+    refresh_home_snapshot_on_commit()
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    # Deleting a Member cascades here; free the seat the way the website
+    # backend's release_seat does
+    Class.objects.filter(pk=instance.course_id, enrolled_count__gt=0).update(enrolled_count=F('enrolled_count') - 1)
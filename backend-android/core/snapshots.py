@@ -0,0 +1,174 @@
+"""
+Materialized /api/home/ payload.
+
+The home page reads five tables. Instead of querying them per request, the
+rendered JSON (plus gzip and brotli versions) is stored in the single
+``HomeSnapshot`` row. Saves and deletes of SiteSettings, Sponsor,
+TeamMember and SocialLink rewrite the row once their transaction commits,
+once per transaction however many rows it touched (see core/signals.py),
+so an admin bulk action renders the payload once and outside its
+transaction. Both backends share the table, so whichever process made the
+change, the other serves the new payload with one primary-key read.
+
+Bulk ``QuerySet.update()`` skips signals; ``HOME_SNAPSHOT_MAX_AGE`` bounds
+how long such a change can go unnoticed. When the row goes stale, one
+request re-renders it while the others keep serving the stale row.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from .middleware import compression_settings, accepted_encodings, brotli, compress
+from .models import SiteSettings, Sponsor, SocialLink, TeamMember, HomeSnapshot
+from .serializers import SiteSettingsSerializer, SponsorSerializer, SocialLinkSerializer, TeamMemberSerializer
+
+SNAPSHOT_PK = 1
+
+
+# Section -> the serializer that renders it
+HOME_SERIALIZERS = {
+    'site_settings': SiteSettingsSerializer,
+    'sponsors': SponsorSerializer,
+    'mentors': TeamMemberSerializer,
+    'leads': TeamMemberSerializer,
+    'social_links': SocialLinkSerializer,
+}
+
+
+def build_home_payload():
+    """The /api/home/ data, straight from the database"""
+    site_settings = SiteSettings.objects.first()
+    sponsors = Sponsor.objects.filter(is_active=True)
+    mentors = TeamMember.objects.filter(is_active=True, role='mentor')
+    leads = TeamMember.objects.filter(is_active=True, role='lead')
+    social_links = SocialLink.objects.filter(is_active=True)
+
+    return {
+        'site_settings': SiteSettingsSerializer(site_settings).data if site_settings else None,
+        'sponsors': SponsorSerializer(sponsors, many=True).data,
+        'mentors': TeamMemberSerializer(mentors, many=True).data,
+        'leads': TeamMemberSerializer(leads, many=True).data,
+        'social_links': SocialLinkSerializer(social_links, many=True).data,
+    }
+
+
+def snapshot_data(snapshot):
+    """
+    The snapshot's payload for renderers other than JSON, each section
+    tagged with its serializer as ``serializer.data`` would be (so the
+    MessagePack renderer finds its enum fields)
+    """
+    payload = json.loads(bytes(snapshot.body))
+    for name, serializer_class in HOME_SERIALIZERS.items():
+        section = payload.get(name)
+        if isinstance(section, list):
+            payload[name] = ReturnList(section, serializer=serializer_class(many=True))
+        elif isinstance(section, dict):
+            payload[name] = ReturnDict(section, serializer=serializer_class())
+    return payload
+
+
+def refresh_home_snapshot():
+    """Re-render the snapshot row; joins the caller's transaction if there is one."""
+    with transaction.atomic():
+        HomeSnapshot.objects.get_or_create(pk=SNAPSHOT_PK)
+        # Lock before reading: a concurrent refresh waits here and then
+        # renders with the other transaction's changes committed
+        snapshot = HomeSnapshot.objects.select_for_update().get(pk=SNAPSHOT_PK)
+
+        body = JSONRenderer().render(build_home_payload())
+        options = compression_settings()
+        snapshot.body = body
+        snapshot.gzip_body = compress(body, 'gzip', options)
+        snapshot.brotli_body = compress(body, 'br', options) if brotli is not None else None
+        snapshot.etag = hashlib.sha1(body).hexdigest()
+        snapshot.save()
+    return snapshot
+
+
+def refresh_home_snapshot_on_commit():
+    """
+    Refresh the snapshot after the current transaction commits (at once
+    outside one), unless a refresh is already waiting for that commit
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'home_snapshot_refresh', None)
+    # A rolled-back transaction drops its callback, not the attribute
+    if pending is not None and any(func is pending for _, func, _ in connection.run_on_commit):
+        return
+
+    def refresh():
+        connection.home_snapshot_refresh = None
+        refresh_home_snapshot()
+
+    connection.home_snapshot_refresh = refresh
+    transaction.on_commit(refresh, robust=True)
+
+
+def is_stale(snapshot):
+    max_age = timedelta(seconds=getattr(settings, 'HOME_SNAPSHOT_MAX_AGE', 3600))
+    return snapshot is None or not snapshot.body or snapshot.generated_at < timezone.now() - max_age
+
+
+def refresh_stale_home_snapshot(stale):
+    """
+    Refresh the ``stale`` snapshot a request read, unless another request
+    is already at it (serve ``stale`` meanwhile) or has just finished (serve
+    its row)
+    """
+    with transaction.atomic():
+        current = HomeSnapshot.objects.select_for_update(skip_locked=True).filter(pk=SNAPSHOT_PK).first()
+        if current is None and stale is not None and stale.body:
+            # Locked by the request refreshing it
+            return stale
+        if current is not None and not is_stale(current):
+            return current
+        return refresh_home_snapshot()
+
+
+def get_home_snapshot():
+    snapshot = HomeSnapshot.objects.filter(pk=SNAPSHOT_PK).first()
+    if is_stale(snapshot):
+        snapshot = refresh_stale_home_snapshot(snapshot)
+    return snapshot
+
+
+async def aget_home_snapshot():
+    """get_home_snapshot() for async views"""
+    snapshot = await HomeSnapshot.objects.filter(pk=SNAPSHOT_PK).afirst()
+    if is_stale(snapshot):
+        snapshot = await sync_to_async(refresh_stale_home_snapshot)(snapshot)
+    return snapshot
+
+
+def snapshot_response(request, snapshot):
+    """Serve the stored bytes, precompressed when the client allows it"""
+    # Weak: the same tag covers the identity and compressed bodies
+    etag = f'W/"{snapshot.etag}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    variants = (('br', snapshot.brotli_body), ('gzip', snapshot.gzip_body), (None, snapshot.body))
+    for coding, body in variants:
+        if body and (coding is None or accepted.get(coding, accepted.get('*', 0.0)) > 0):
+            break
+
+    response = HttpResponse(bytes(body), content_type='application/json')
+    if coding:
+        response['Content-Encoding'] = coding
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -1,3 +1,119 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+import msgpack
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Class, Domain, HomeSnapshot, Member, TeamMember
+from .renderers import MessagePackRenderer, encode_enums
+from .warmup import warm_up
+
+MSGPACK = MessagePackRenderer.media_type
+
+
+def decode_enums(data, tables, fields):
+    """Undo encode_enums for ``fields``, at any depth"""
+    if isinstance(data, dict):
+        return {
+            key: tables[key][value] if key in fields and isinstance(value, int) else decode_enums(value, tables, fields)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [decode_enums(item, tables, fields) for item in data]
+    return data
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class MessagePackTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The website backend's migrations create this shared table
+        with connection.schema_editor() as editor:
+            editor.create_model(HomeSnapshot)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(HomeSnapshot)
+
+    def setUp(self):
+        self.lead = TeamMember.objects.create(name='Asha', role='lead', position='Tech Lead')
+        Class.objects.create(
+            title='Intro to Robotics', description='Basics', duration='4 weeks', difficulty='advanced',
+            start_date=timezone.now() + timedelta(days=7),
+        )
+        user = get_user_model().objects.create_user(username='member', password='secret', is_staff=True)
+        Member.objects.create(user=user, lead=self.lead, domain=Domain.objects.create(name='ai', display_name='AI'))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.tables = self.client.get('/api/info/').json()['msgpack_enums']
+
+    def get(self, path, accept=MSGPACK):
+        response = self.client.get(path, HTTP_ACCEPT=accept)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def unpack(self, path):
+        response = self.get(path)
+        self.assertEqual(response['Content-Type'], MSGPACK)
+        return msgpack.unpackb(response.content)
+
+    def test_enums_round_trip(self):
+        for path, fields in (
+            ('/api/classes/', {'difficulty', 'status'}),
+            ('/api/members/', {'role'}),
+            ('/api/home/', {'role'}),
+        ):
+            with self.subTest(path=path):
+                packed = self.unpack(path)
+                self.assertEqual(decode_enums(packed, self.tables, fields), self.get(path, 'application/json').json())
+
+    def test_enum_fields_are_integer_codes(self):
+        course, = self.unpack('/api/classes/')['results']
+        self.assertEqual(self.tables['difficulty'][course['difficulty']], 'advanced')
+        self.assertIsInstance(course['status'], int)
+        # Nested serializer, and a snapshot read back from the database
+        member, = self.unpack('/api/members/')['results']
+        self.assertEqual(self.tables['role'][member['lead']['role']], 'lead')
+        lead, = self.unpack('/api/home/')['leads']
+        self.assertEqual(self.tables['role'][lead['role']], 'lead')
+
+    def test_keys_outside_a_serializer_stay_unchanged(self):
+        self.assertEqual(self.unpack('/api/health/')['status'], 'healthy')
+        self.assertEqual(encode_enums({'status': 'upcoming', 'role': 'lead'}), {'status': 'upcoming', 'role': 'lead'})
+
+    def test_json_is_unchanged_without_msgpack(self):
+        for accept in ('application/json', '*/*'):
+            with self.subTest(accept=accept):
+                response = self.get('/api/classes/', accept)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertEqual(response.json()['results'][0]['difficulty'], 'advanced')
+
+
+class HealthCheckTests(TestCase):
+    def test_pool_counters_are_staff_only(self):
+        client = APIClient()
+        self.assertNotIn('password_pool', client.get('/api/health/').json())
+        client.force_authenticate(get_user_model().objects.create_user(username='staff', is_staff=True))
+        self.assertIn('password_pool', client.get('/api/health/').json())
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class WarmUpTests(TestCase):
+    def test_lists_are_built_and_refusals_fail(self):
+        Class.objects.create(
+            title='Intro to Robotics', description='Basics', duration='4 weeks', start_date=timezone.now(),
+        )
+        report = warm_up(paths=('/api/members/',))
+        details = {step['step']: step['detail'] for step in report['steps']}
+        self.assertEqual(details['/api/portal/'], '1 classes, 0 resources')
+        self.assertEqual(details['/api/classes/'], '1 row(s)')
+        self.assertEqual(details['/api/resources/'], '0 row(s)')
+        self.assertEqual(details['/api/members/'], 'failed: HTTP 401')
+        self.assertIn('/api/members/', report['failed'])
+        self.assertNotIn('/api/portal/', report['failed'])
@@ -0,0 +1,217 @@
+"""
+Token-bucket throttles for the auth and counter endpoints.
+
+The bucket is tracked as a GCRA "theoretical arrival time": one float per
+key that is equivalent to a token bucket holding ``num_requests`` tokens and
+refilling them evenly over the period. Rates use DRF's ``"10/min"`` format
+and live in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``.
+
+Two storage backends are available through ``RATE_LIMIT['BACKEND']``:
+
+- ``memory``: a per-process dict, for a single worker. Each check reads,
+  spends and writes a bucket under one lock, so threads racing on a key
+  never spend the same token. It holds at most ``max_keys`` buckets,
+  dropping the least recently used one when full (a dropped bucket starts
+  full again).
+- ``cache``: a Django cache alias shared by all workers. Threads of one
+  worker take turns on it, but its get and set are two cache round trips,
+  not one atomic update, so requests racing on one key from different
+  workers can each spend the same token.
+
+A store's ``update(key, spend, timeout)`` hands the stored arrival time
+(``None`` for a new key) and the store's clock to ``spend``, which returns
+the new arrival time, or ``None`` to leave the bucket as it is.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+def parse_rate(rate):
+    """Turn ``"10/min"`` into ``(10, 60)``, like DRF's SimpleRateThrottle."""
+    num, period = rate.split('/')
+    duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return int(num), duration
+
+
+class MemoryBucketStore:
+    """Per-process bucket state, least recently set first."""
+
+    max_keys = 10000
+    # Seconds between scans for expired buckets while the store is full
+    prune_interval = 1.0
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = None
+
+    def get(self, key):
+        return self._tats.get(key)
+
+    def set(self, key, tat, timeout):
+        with self._lock:
+            self._put(key, tat)
+
+    def update(self, key, spend, timeout):
+        with self._lock:
+            tat = spend(self._tats.get(key), self.clock())
+            if tat is not None:
+                self._put(key, tat)
+            return tat
+
+    def _put(self, key, tat):
+        # Callers hold the lock
+        if key in self._tats:
+            self._tats.move_to_end(key)
+        elif len(self._tats) >= self.max_keys:
+            now = self.clock()
+            if self._pruned_at is None or now - self._pruned_at >= self.prune_interval:
+                self._pruned_at = now
+                self._prune(now)
+            while len(self._tats) >= self.max_keys:
+                self._tats.popitem(last=False)
+        self._tats[key] = tat
+
+    def _prune(self, now):
+        # Buckets whose arrival time has passed are full again and can be dropped
+        for key, tat in list(self._tats.items()):
+            if tat <= now:
+                del self._tats[key]
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+            self._pruned_at = None
+
+
+class CacheBucketStore:
+    """
+    Bucket state in a shared Django cache. Not atomic across workers: see
+    the module docstring.
+    """
+
+    # Wall-clock time, since the stored values are compared across processes
+    clock = staticmethod(time.time)
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, tat, timeout):
+        self.cache.set(key, tat, timeout)
+
+    def update(self, key, spend, timeout):
+        with self._lock:
+            tat = spend(self.get(key), self.clock())
+            if tat is not None:
+                self.set(key, tat, timeout)
+            return tat
+
+
+_stores = {}
+
+
+def get_store():
+    config = getattr(settings, 'RATE_LIMIT', {})
+    backend = config.get('BACKEND', 'memory')
+    if backend not in _stores:
+        if backend == 'memory':
+            _stores[backend] = MemoryBucketStore()
+        elif backend == 'cache':
+            _stores[backend] = CacheBucketStore(config.get('CACHE_ALIAS', 'default'))
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT backend: {backend}")
+    return _stores[backend]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token-bucket throttle keyed by client IP, user or route.
+
+    Subclasses set ``scope`` (the key into DEFAULT_THROTTLE_RATES) and
+    ``key_by`` (``'ip'``, ``'user'`` or ``'route'``). ``'user'`` falls back to
+    the client IP for anonymous requests. The IP is DRF's ``get_ident``,
+    which reads X-Forwarded-For only as far as ``NUM_PROXIES`` trusted
+    proxies wrote it.
+    """
+    scope = None
+    key_by = 'ip'
+    rate = None
+
+    def __init__(self, store=None):
+        if self.rate is None:
+            self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.store = store or get_store()
+        self._wait = None
+        if self.rate:
+            self.num_requests, self.duration = parse_rate(self.rate)
+            # Time each token takes to come back
+            self.interval = self.duration / self.num_requests
+
+    def get_cache_key(self, request, view):
+        if self.key_by == 'user' and request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        elif self.key_by == 'route':
+            match = getattr(request, 'resolver_match', None)
+            ident = f"route:{match.route if match else request.path}"
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if not self.rate:
+            return True
+
+        self._wait = None
+        self.store.update(self.get_cache_key(request, view), self.spend, int(self.duration) + 1)
+        return self._wait is None
+
+    def spend(self, tat, now):
+        """Take a token: the bucket's new arrival time, or None when it is empty."""
+        if tat is None or tat < now:
+            tat = now
+
+        new_tat = tat + self.interval
+        # The bucket is empty once the arrival time runs a full period ahead
+        if new_tat - now > self.duration + 1e-6:
+            self._wait = new_tat - now - self.duration
+            return None
+        return new_tat
+
+    def wait(self):
+        return self._wait
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+    key_by = 'ip'
+
+
+class RegisterRateThrottle(TokenBucketThrottle):
+    scope = 'register'
+    key_by = 'ip'
+
+
+class TokenRefreshRateThrottle(TokenBucketThrottle):
+    scope = 'token_refresh'
+    key_by = 'ip'
+
+
+class DownloadRateThrottle(TokenBucketThrottle):
+    scope = 'download'
+    key_by = 'user'
@@ -1,65 +1,100 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, SAFE_METHODS
 from .models import SiteSettings, Sponsor, SocialLink, Class, Resource, TeamMember, Domain, Member
 from .serializers import (
     SiteSettingsSerializer, SponsorSerializer, SocialLinkSerializer,
     ClassSerializer, ResourceSerializer, TeamMemberSerializer,
     DomainSerializer, MemberSerializer
 )
+from .snapshots import get_home_snapshot, snapshot_data, snapshot_response
+from .throttling import DownloadRateThrottle
 
 
-class SiteSettingsViewSet(viewsets.ReadOnlyModelViewSet):
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for read requests: ?fields=id,title keeps only those
+    fields, ?omit=description drops fields. Unrequested fields are never
+    evaluated and the queryset only loads the columns and relations the
+    remaining fields need (see DynamicFieldsModelSerializer).
+    """
+
+    def get_sparse_fieldset(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return {}
+        sparse = {}
+        for key in ('fields', 'omit'):
+            value = self.request.query_params.get(key)
+            names = [name.strip() for name in value.split(',') if name.strip()] if value else []
+            if names:
+                sparse[key] = names
+        return sparse
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_sparse_fieldset().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        sparse = self.get_sparse_fieldset()
+        if sparse:
+            serializer = self.get_serializer_class()(context=self.get_serializer_context(), **sparse)
+            queryset = serializer.optimize_queryset(queryset)
+        return queryset
+
+
+class SiteSettingsViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for site settings"""
     queryset = SiteSettings.objects.all()
     serializer_class = SiteSettingsSerializer
     permission_classes = [AllowAny]
 
 
-class SponsorViewSet(viewsets.ReadOnlyModelViewSet):
+class SponsorViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for sponsors"""
     queryset = Sponsor.objects.filter(is_active=True)
     serializer_class = SponsorSerializer
     permission_classes = [AllowAny]
 
 
-class SocialLinkViewSet(viewsets.ReadOnlyModelViewSet):
+class SocialLinkViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for social links"""
     queryset = SocialLink.objects.filter(is_active=True)
     serializer_class = SocialLinkSerializer
     permission_classes = [AllowAny]
 
 
-class ClassViewSet(viewsets.ReadOnlyModelViewSet):
+class ClassViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for classes - requires authentication"""
     queryset = Class.objects.filter(is_active=True)
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated]
 
 
-class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
+class ResourceViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for resources - requires authentication"""
     queryset = Resource.objects.filter(is_active=True)
     serializer_class = ResourceSerializer
     permission_classes = [IsAuthenticated]
 
 
-class TeamMemberViewSet(viewsets.ReadOnlyModelViewSet):
+class TeamMemberViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for mentors/leads"""
     queryset = TeamMember.objects.filter(is_active=True)
     serializer_class = TeamMemberSerializer
     permission_classes = [AllowAny]
 
 
-class DomainViewSet(viewsets.ReadOnlyModelViewSet):
+class DomainViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for member domains"""
     queryset = Domain.objects.filter(is_active=True)
     serializer_class = DomainSerializer
     permission_classes = [AllowAny]
 
 
-class MemberViewSet(viewsets.ReadOnlyModelViewSet):
+class MemberViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for members (PII)"""
     queryset = Member.objects.filter(is_active=True)
     serializer_class = MemberSerializer
@@ -75,28 +110,28 @@ class MemberViewSet(viewsets.ReadOnlyModelViewSet):
 @permission_classes([AllowAny])
 def home_page_data(request):
     """
-    Single endpoint to get all home page data
+    Single endpoint to get all home page data, served from the HomeSnapshot row
     """
-    # Get site settings (should be only one)
-    site_settings = SiteSettings.objects.first()
-    
-    # Get active sponsors
-    sponsors = Sponsor.objects.filter(is_active=True)
-
-    # Get active mentors/leads
-    mentors = TeamMember.objects.filter(is_active=True, role='mentor')
-    leads = TeamMember.objects.filter(is_active=True, role='lead')
-    
-    # Get active social links
-    social_links = SocialLink.objects.filter(is_active=True)
-    
-    return Response({
-        'site_settings': SiteSettingsSerializer(site_settings).data if site_settings else None,
-        'sponsors': SponsorSerializer(sponsors, many=True).data,
-        'mentors': TeamMemberSerializer(mentors, many=True).data,
-        'leads': TeamMemberSerializer(leads, many=True).data,
-        'social_links': SocialLinkSerializer(social_links, many=True).data,
-    })
+    snapshot = get_home_snapshot()
+    if request.accepted_renderer.format != 'json':
+        # Browsable API / MessagePack render the data themselves
+        return Response(snapshot_data(snapshot))
+    return snapshot_response(request, snapshot)
+
+
+def portal_classes():
+    return ClassSerializer(Class.objects.filter(is_active=True), many=True).data
+
+
+def portal_resources():
+    return ResourceSerializer(Resource.objects.filter(is_active=True), many=True).data
+
+
+# Independent parts of /api/portal/; the async view runs them concurrently
+PORTAL_SECTIONS = {
+    'classes': portal_classes,
+    'resources': portal_resources,
+}
 
 
 @api_view(['GET'])
@@ -105,20 +140,12 @@ def member_portal_data(request):
     """
     Single endpoint to get all member portal data
     """
-    # Get active classes
-    classes = Class.objects.filter(is_active=True)
-    
-    # Get active resources
-    resources = Resource.objects.filter(is_active=True)
-    
-    return Response({
-        'classes': ClassSerializer(classes, many=True).data,
-        'resources': ResourceSerializer(resources, many=True).data,
-    })
+    return Response({name: build() for name, build in PORTAL_SECTIONS.items()})
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([DownloadRateThrottle])
 def increment_download(request, resource_id):
     """
     Increment download count for a resource
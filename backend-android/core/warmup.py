@@ -0,0 +1,125 @@
+"""
+Warm-up for freshly started workers.
+
+A new worker pays for its first requests: DB connections are opened,
+lazily imported modules (zoneinfo data, the media storage) load, URL resolvers
+and serializer classes are exercised for the first time, and the
+in-process caches (local cache tier) are empty.
+``warm_up()`` does all of that up front: it renders the public read
+endpoints once, as an anonymous client, and builds the authenticated ones
+(the portal sections and the first page of each list) directly, since an
+anonymous request would stop at their 401. It records how long each step
+took, and which ones failed.
+
+It runs when a server starts and ``WARM_UP_ON_BOOT`` is set: from
+gunicorn.conf.py's hooks, or on the ASGI lifespan startup (tars/asgi.py).
+Not on import of tars.wsgi, which runserver and its autoreloader share,
+and not from AppConfig.ready, which also runs for migrate and other
+management commands. ``manage.py warm_caches`` runs it on demand, e.g. as
+a post-deploy step to fill the shared cache and the home snapshot. Under
+gunicorn.conf.py (preload_app) it runs once, in the master, and the
+workers inherit the warmed state when they fork; the DB connections it
+opened are closed before forking.
+"""
+
+import importlib
+import time
+
+from django.db import connections
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from .snapshots import get_home_snapshot
+from .views import PORTAL_SECTIONS, ClassViewSet, ResourceViewSet
+
+WARM_IMPORTS = (
+    'core.formatting',
+)
+
+# First pages of what the website and the app load on start: the public
+# endpoints, rendered, and the lists that need a user, built directly
+WARM_PATHS = (
+    '/api/home/',
+    '/api/team-members/',
+    '/api/domains/',
+)
+WARM_LISTS = {
+    '/api/classes/': ClassViewSet,
+    '/api/resources/': ResourceViewSet,
+}
+
+last_report = None
+
+
+def _open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+    return f'{len(connections.all())} connection(s)'
+
+
+def _import_modules():
+    for name in WARM_IMPORTS:
+        importlib.import_module(name)
+    return f'{len(WARM_IMPORTS)} module(s)'
+
+
+def _render(path):
+    # No user: a made-up one could reach code that saves or caches per user
+    request = APIRequestFactory().get(path)
+    match = resolve(path)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if not 200 <= response.status_code < 300:
+        raise RuntimeError(f'HTTP {response.status_code}')
+    return f'HTTP {response.status_code}'
+
+
+def _build_portal():
+    sizes = {name: len(build()) for name, build in PORTAL_SECTIONS.items()}
+    return ', '.join(f'{size} {name}' for name, size in sizes.items())
+
+
+def _build_first_page(viewset):
+    # The viewset's own queryset (what staff see) and serializer, without a
+    # request: the auth stack would turn an anonymous one away
+    page = viewset.queryset.all()[:api_settings.PAGE_SIZE]
+    return f'{len(viewset.serializer_class(page, many=True).data)} row(s)'
+
+
+def warm_up(paths=WARM_PATHS, lists=WARM_LISTS):
+    """Run every warm-up step; failures are recorded, not raised."""
+    global last_report
+
+    steps = [
+        ('database', _open_connections),
+        ('imports', _import_modules),
+        ('home_snapshot', lambda: f'etag {get_home_snapshot().etag[:12]}'),
+    ]
+    steps += [(path, lambda path=path: _render(path)) for path in paths]
+    steps.append(('/api/portal/', _build_portal))
+    steps += [(path, lambda viewset=viewset: _build_first_page(viewset)) for path, viewset in lists.items()]
+
+    report = []
+    started = time.perf_counter()
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            detail = step()
+        except Exception as e:
+            detail = f'failed: {str(e)}'
+        report.append({
+            'step': name,
+            'ms': round((time.perf_counter() - step_started) * 1000, 1),
+            'detail': detail,
+        })
+
+    last_report = {
+        'finished_at': timezone.now().isoformat(),
+        'total_ms': round((time.perf_counter() - started) * 1000, 1),
+        'failed': [step['step'] for step in report if step['detail'].startswith('failed')],
+        'steps': report,
+    }
+    return last_report
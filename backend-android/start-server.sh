@@ -7,5 +7,5 @@ echo "🤖 Starting TARS Android Backend Server..."
 # Run migrations
 python manage.py migrate --noinput
 
-# Start server with gunicorn
-gunicorn --bind 0.0.0.0:8000 --workers 3 tars.wsgi:application
+# Start server with gunicorn (workers, threads and recycling: gunicorn.conf.py)
+gunicorn tars.wsgi:application
@@ -0,0 +1,18 @@
+"""
+Admin URLs, imported on the first request under /admin/ (see tars/urls.py).
+
+INSTALLED_APPS uses tars.apps.LazyAdminConfig, which doesn't autodiscover
+at startup, so the ModelAdmins are registered here, just before the admin
+site builds its URL patterns from them.
+"""
+
+from django.contrib import admin
+
+admin.autodiscover()
+
+# Customize admin site headers
+admin.site.site_header = "TARS Club Administration (Android Backend)"
+admin.site.site_title = "TARS Android Admin Portal"
+admin.site.index_title = "Welcome to TARS Club Management - Android Backend"
+
+urlpatterns, app_name, _ = admin.site.urls
@@ -0,0 +1,28 @@
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.contrib.admin.checks import check_admin_app, check_dependencies
+from django.core import checks
+
+
+def discover_admin():
+    """Register every app's ModelAdmins; tars/admin_urls.py does it on import."""
+    from . import admin_urls  # noqa: F401
+
+
+def check_discovered_admin_app(app_configs, **kwargs):
+    discover_admin()
+    return check_admin_app(app_configs, **kwargs)
+
+
+class LazyAdminConfig(SimpleAdminConfig):
+    """
+    The admin without autodiscovery at startup.
+
+    API workers rarely serve /admin/, so the admin modules and their URL
+    patterns are loaded with the first request under /admin/ (tars/urls.py
+    points there lazily). System checks discover them first, so
+    ``manage.py check`` still validates every ModelAdmin.
+    """
+
+    def ready(self):
+        checks.register(check_dependencies, checks.Tags.admin)
+        checks.register(check_discovered_admin_app, checks.Tags.admin)
@@ -0,0 +1,211 @@
+"""
+Composite GET endpoint: /api/batch/ runs several API reads in one round trip.
+
+    POST /api/batch/
+    {"requests": [{"id": "home", "path": "/api/home/"},
+                  {"id": "profile", "path": "/api/auth/profile/"}]}
+
+Each sub-request is resolved against the URLconf and dispatched in-process
+to its view. The caller is authenticated once by the batch view and that
+user is handed to every sub-view, so JWT validation is not repeated. Only
+GET requests under /api/ are allowed, which makes the sub-requests
+read-only and safe to run concurrently. Async views and streaming
+responses (the ASGI-only endpoints) can't be run in-process here and get a
+501 entry of their own. With ``BATCH_API['MAX_WORKERS']`` above 1 the
+sub-requests are spread over a thread pool shared by the process's batches.
+Its threads live on and keep their database connections between
+sub-requests, closed like a request thread's once past CONN_MAX_AGE or
+broken, so a process holds at most MAX_WORKERS extra connections and
+doesn't open one per sub-request. A sub-view that fails gets a generic 500
+entry; the exception is logged.
+
+The response keeps the request order:
+
+    {"responses": [{"id": "home", "status": 200, "body": {...}}, ...]}
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Non-header META keys a sub-request inherits from the batch request
+INHERITED_META = (
+    'SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'SERVER_PROTOCOL',
+)
+
+# Headers that would make a sub-view return a compressed or empty body
+EXCLUDED_META = (
+    'HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+)
+
+
+def _batch_settings():
+    return {
+        'MAX_REQUESTS': 10,
+        'MAX_WORKERS': 4,
+        **getattr(settings, 'BATCH_API', {}),
+    }
+
+
+class SubRequest(HttpRequest):
+    """A GET request derived from the batch request for one sub-path."""
+
+    def __init__(self, parent, path, query):
+        super().__init__()
+        self.method = 'GET'
+        self.path = self.path_info = path
+        self.META = {
+            key: value for key, value in parent.META.items()
+            if (key.startswith('HTTP_') or key in INHERITED_META) and key not in EXCLUDED_META
+        }
+        self.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query)
+        self.GET = QueryDict(query)
+        self._scheme = parent.scheme
+
+        # Reuse the batch request's authentication instead of re-validating
+        # the token in every sub-view (see rest_framework.request.Request)
+        if parent.user and parent.user.is_authenticated:
+            self._force_auth_user = parent.user
+            self._force_auth_token = parent.auth
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+def _error(request_id, status_code, detail):
+    return {'id': request_id, 'status': status_code, 'body': {'error': detail}}
+
+
+def _validate(item, index):
+    """Return (id, path, query) for a sub-request, or an error entry."""
+    if not isinstance(item, dict):
+        return None, _error(index, status.HTTP_400_BAD_REQUEST, 'Each request must be an object')
+
+    request_id = item.get('id', index)
+    method = str(item.get('method', 'GET')).upper()
+    path = item.get('path')
+    if method != 'GET':
+        return None, _error(request_id, status.HTTP_405_METHOD_NOT_ALLOWED, 'Only GET requests can be batched')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return None, _error(request_id, status.HTTP_400_BAD_REQUEST, 'path must start with /api/')
+
+    parts = urlsplit(path)
+    if parts.path.rstrip('/') == '/api/batch':
+        return None, _error(request_id, status.HTTP_400_BAD_REQUEST, 'Batches cannot be nested')
+    return (request_id, parts.path, parts.query), None
+
+
+def _dispatch(parent, request_id, path, query):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return _error(request_id, status.HTTP_404_NOT_FOUND, 'Not found')
+
+    if iscoroutinefunction(match.func):
+        return _error(request_id, status.HTTP_501_NOT_IMPLEMENTED, 'Async views cannot be batched')
+
+    sub_request = SubRequest(parent, path, query)
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if response.streaming:
+            response.close()
+            return _error(request_id, status.HTTP_501_NOT_IMPLEMENTED, 'Streaming responses cannot be batched')
+        body = _body(response)
+    except Exception:
+        # One failing read shouldn't take the rest of the batch down
+        logger.exception('Batched request to %s failed', path)
+        return _error(request_id, status.HTTP_500_INTERNAL_SERVER_ERROR, 'Request failed')
+    return {'id': request_id, 'status': response.status_code, 'body': body}
+
+
+def _body(response):
+    body = getattr(response, 'data', None)
+    if body is None:
+        if hasattr(response, 'render'):
+            response.render()
+        try:
+            body = json.loads(response.content) if response.content else None
+        except ValueError:
+            body = response.content.decode(response.charset, errors='replace')
+    return body
+
+
+def _dispatch_in_thread(parent, request_id, path, query):
+    # What request_started/request_finished do for a request thread
+    close_old_connections()
+    try:
+        return _dispatch(parent, request_id, path, query)
+    finally:
+        close_old_connections()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """The process's batch thread pool, sized on first use; a forked worker starts its own"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch(request):
+    """Run a list of GET sub-requests and return all their responses at once"""
+    items = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return Response(
+            {'error': 'requests must be a non-empty list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    options = _batch_settings()
+    if len(items) > options['MAX_REQUESTS']:
+        return Response(
+            {'error': f"At most {options['MAX_REQUESTS']} requests per batch"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    responses = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        job, error = _validate(item, index)
+        if error:
+            responses[index] = error
+        else:
+            pending.append((index, job))
+
+    if options['MAX_WORKERS'] > 1 and len(pending) > 1:
+        pool = _get_pool(options['MAX_WORKERS'])
+        futures = [
+            (index, pool.submit(_dispatch_in_thread, request, *job))
+            for index, job in pending
+        ]
+        for index, future in futures:
+            responses[index] = future.result()
+    else:
+        for index, job in pending:
+            responses[index] = _dispatch(request, *job)
+
+    return Response({'responses': responses})
@@ -0,0 +1,184 @@
+"""
+Bounded worker pool for password hashing and verification.
+
+PBKDF2 holds a CPU for tens of milliseconds per call. Running it on a
+small, fixed pool caps how many hashes a worker computes at once, so a
+login burst can't take the CPU from its other requests. The request thread
+still waits for its result (up to QUEUE_TIMEOUT); what the pool bounds is
+the hashing, and the queue behind it: callers beyond the queue limit are
+turned away immediately instead of piling up. hashlib releases the GIL
+while hashing, so the pool threads run in parallel with the rest of the
+worker.
+
+A busy pool raises PasswordPoolBusy wherever a password is checked.
+The auth views answer it with their own 503, and PasswordPoolBusyMiddleware
+turns it into a 503 everywhere else (the admin login).
+
+Only the CPU-bound hashing runs on the pool; user lookups and saves stay on
+the request thread so the pool threads never hold database connections.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.http import HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+# Seconds a client turned away by the busy pool is asked to wait
+RETRY_AFTER = 2
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool is saturated or a job waited too long."""
+
+
+class PasswordHashingPool:
+    """Thread pool with a hard cap on queued jobs and simple counters."""
+
+    def __init__(self, max_workers=2, max_queue=16, timeout=5.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'timed_out': 0,
+            'wait_seconds': 0.0,
+            'run_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    def _get_executor(self):
+        # Created lazily so gunicorn workers don't inherit threads from the master
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='password-hashing',
+                    )
+        return self._executor
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool and block until it returns."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._stats['rejected'] += 1
+                raise PasswordPoolBusy('Password hashing pool is saturated')
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+        enqueued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished_at = time.perf_counter()
+                waited = started_at - enqueued_at
+                with self._lock:
+                    self._stats['completed'] += 1
+                    self._stats['wait_seconds'] += waited
+                    self._stats['run_seconds'] += finished_at - started_at
+                    self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+
+        future = self._get_executor().submit(job)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise PasswordPoolBusy('Timed out waiting for the password hashing pool')
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def make_password(self, password):
+        return self.run(make_password, password)
+
+    def verify_password(self, password, encoded):
+        """Return ``(is_correct, must_update)`` like Django's ``verify_password``."""
+        return self.run(verify_password, password, encoded)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data['pending'] = self._pending
+        completed = data['completed'] or 1
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': data['pending'],
+            'submitted': data['submitted'],
+            'completed': data['completed'],
+            'rejected': data['rejected'],
+            'timed_out': data['timed_out'],
+            'avg_wait_ms': round(data['wait_seconds'] * 1000 / completed, 3),
+            'avg_run_ms': round(data['run_seconds'] * 1000 / completed, 3),
+            'max_wait_ms': round(data['max_wait_seconds'] * 1000, 3),
+        }
+
+
+_config = getattr(settings, 'AUTH_HASHING', {})
+
+password_pool = PasswordHashingPool(
+    max_workers=_config.get('MAX_WORKERS', 2),
+    max_queue=_config.get('MAX_QUEUE', 16),
+    timeout=_config.get('QUEUE_TIMEOUT', 5.0),
+)
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that verifies passwords on the hashing pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user (#20760).
+            password_pool.make_password(password)
+            return None
+
+        is_correct, must_update = password_pool.verify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+
+        if must_update:
+            # Same upgrade AbstractBaseUser.check_password performs, minus the inline hash
+            user.password = password_pool.make_password(password)
+            user.save(update_fields=['password'])
+        return user
+
+
+class PasswordPoolBusyMiddleware(MiddlewareMixin):
+    """Answer a PasswordPoolBusy raised by any view with a 503 rather than a 500."""
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, PasswordPoolBusy):
+            return None
+        detail = 'Too many sign-in attempts right now, please try again shortly'
+        if request.path.startswith('/api/'):
+            response = JsonResponse({'error': detail}, status=503)
+        else:
+            response = HttpResponse(detail, content_type='text/plain', status=503)
+        response['Retry-After'] = str(RETRY_AFTER)
+        return response
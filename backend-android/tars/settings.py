@@ -14,12 +14,12 @@ Key differences from website backend:
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import os
-from dotenv import load_dotenv
+import sys
+import tempfile
 from urllib.parse import urlparse, parse_qsl
 
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,34 +40,51 @@ ALLOWED_HOSTS = config(
 )
 
 # Add Render hostname if present
-if os.environ.get('RENDER_EXTERNAL_HOSTNAME'):
-    ALLOWED_HOSTS.append(os.environ.get('RENDER_EXTERNAL_HOSTNAME'))
+if config('RENDER_EXTERNAL_HOSTNAME', default=None):
+    ALLOWED_HOSTS.append(config('RENDER_EXTERNAL_HOSTNAME'))
+
+
+# Uploaded media go to Cloudinary when it's configured, else under MEDIA_ROOT
+USE_CLOUDINARY = bool(config('CLOUDINARY_CLOUD_NAME', default=''))
+
+# MEDIA_ROOT doesn't survive a redeploy: without DEBUG, local media must be
+# asked for rather than be what a missing or renamed variable falls back to
+if not DEBUG and not USE_CLOUDINARY and not config('LOCAL_MEDIA_STORAGE', default=False, cast=bool):
+    raise ImproperlyConfigured(
+        "CLOUDINARY_CLOUD_NAME is not set. Configure Cloudinary, or set "
+        "LOCAL_MEDIA_STORAGE=True to keep uploads under MEDIA_ROOT."
+    )
 
 
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # Registers ModelAdmins on first use rather than at startup (tars/apps.py)
+    "tars.apps.LazyAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "cloudinary_storage",
-    "cloudinary",
     "rest_framework",
     "rest_framework_simplejwt",
     "corsheaders",
     "core",
 ]
 
+if USE_CLOUDINARY:
+    INSTALLED_APPS += ["cloudinary_storage", "cloudinary"]
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # 503 instead of a 500 when the password hashing pool turns a login away
+    "tars.passwords.PasswordPoolBusyMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -76,7 +93,10 @@ MIDDLEWARE = [
 
 STORAGES = {
     "default": {
-        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+        "BACKEND": (
+            "cloudinary_storage.storage.MediaCloudinaryStorage" if USE_CLOUDINARY
+            else "django.core.files.storage.FileSystemStorage"
+        ),
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -123,10 +143,10 @@ def _database_config_from_url(db_url: str) -> dict:
     # Neon requires SSL. If not explicitly set in DATABASE_URL, default it.
     host = parsed.hostname or ''
     if host.endswith('neon.tech') and 'sslmode' not in options:
-        options['sslmode'] = os.getenv('PGSSLMODE', 'require')
+        options['sslmode'] = config('PGSSLMODE', default='require')
 
     # Respect port in DATABASE_URL (important for managed DBs/poolers).
-    port = parsed.port or int(os.getenv('DB_PORT', '5432'))
+    port = parsed.port or config('DB_PORT', default=5432, cast=int)
 
     return {
         'ENGINE': 'django.db.backends.postgresql',
@@ -136,10 +156,13 @@ def _database_config_from_url(db_url: str) -> dict:
         'HOST': parsed.hostname,
         'PORT': port,
         'OPTIONS': options,
+        # Keep connections between requests so warmed ones get reused
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 
 
-_db_url = _normalize_database_url(os.getenv('DATABASE_URL') or config('DATABASE_URL', default=None))
+_db_url = _normalize_database_url(config('DATABASE_URL', default=None))
 
 # Check if we should use SQLite for local development
 # Only defaults to True if DATABASE_URL is not set
@@ -167,9 +190,15 @@ else:
             'PASSWORD': config('DB_PASSWORD', default='postgres'),
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 
+# This app's migrations stop where the website backend took over the shared
+# schema, so the test database is built from the models instead
+if 'test' in sys.argv[1:2]:
+    MIGRATION_MODULES = {'core': None}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -190,6 +219,19 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = [
+    'tars.passwords.PooledModelBackend',
+]
+
+# Password hashing pool (tars/passwords.py)
+# Caps how many PBKDF2 computations a worker runs at once during login bursts
+AUTH_HASHING = {
+    'MAX_WORKERS': config('AUTH_HASHING_MAX_WORKERS', default=2, cast=int),
+    'MAX_QUEUE': config('AUTH_HASHING_MAX_QUEUE', default=16, cast=int),
+    'QUEUE_TIMEOUT': config('AUTH_HASHING_QUEUE_TIMEOUT', default=5.0, cast=float),
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -214,9 +256,9 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 # Cloudinary Config
 CLOUDINARY_STORAGE = {
-    'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),
-    'API_KEY': os.environ.get('CLOUDINARY_API_KEY'),
-    'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET'),
+    'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=None),
+    'API_KEY': config('CLOUDINARY_API_KEY', default=None),
+    'API_SECRET': config('CLOUDINARY_API_SECRET', default=None),
 }
 
 
@@ -262,7 +304,7 @@ else:
     ]
     
     # Add production Android backend URL if specified
-    android_backend_url = os.environ.get('ANDROID_BACKEND_URL')
+    android_backend_url = config('ANDROID_BACKEND_URL', default=None)
     if android_backend_url:
         CORS_ALLOWED_ORIGINS.append(android_backend_url)
 
@@ -275,20 +317,119 @@ CSRF_TRUSTED_ORIGINS = config(
 
 # Add production Android backend URL to CSRF trusted origins
 if not DEBUG:
-    android_backend_url = os.environ.get('ANDROID_BACKEND_URL')
+    android_backend_url = config('ANDROID_BACKEND_URL', default=None)
     if android_backend_url and android_backend_url not in CSRF_TRUSTED_ORIGINS:
         CSRF_TRUSTED_ORIGINS.append(android_backend_url)
 
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication with the user cached (core/authentication.py)
+        'core.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # JSON stays the default; the app asks for MessagePack via Accept
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # Proxies that append to X-Forwarded-For (Render's one): throttles key
+    # on the address the last of them saw, not on what the client sent
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
+    # Token-bucket rates for core.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('THROTTLE_LOGIN', default='10/min'),
+        'register': config('THROTTLE_REGISTER', default='5/min'),
+        'token_refresh': config('THROTTLE_TOKEN_REFRESH', default='30/min'),
+        'download': config('THROTTLE_DOWNLOAD', default='60/min'),
+    },
+}
+
+# Per-worker LRU in front of a shared cache (core/cache_backends.py). The
+# shared tier is Redis when CACHE_REDIS_URL is set (needs the redis
+# package), otherwise a file cache shared by the workers on this host.
+# KEY_PREFIX keeps this backend's entries apart from the other backend's
+# when they share a Redis or a file cache directory.
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='tars-android')
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=2000, cast=int),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=30, cast=int),
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+    } if CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_FILE_DIR', default=os.path.join(tempfile.gettempdir(), 'tars-android-cache')),
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+    },
+}
+
+# Tests cache in memory: their users' ids repeat those of a local server's
+# database, and cached principals would outlive the run in the file cache
+if 'test' in sys.argv[1:2]:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tars-android-tests',
+    }
+
+# Seconds a cached JWT user lives (core/authentication.py)
+PRINCIPAL_CACHE_TIMEOUT = config('PRINCIPAL_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a cached /api/auth/profile/ payload lives (core/profiles.py)
+PROFILE_CACHE_TIMEOUT = config('PROFILE_CACHE_TIMEOUT', default=900, cast=int)
+
+# Cross-process cache invalidation over Postgres LISTEN/NOTIFY
+# (core/invalidation.py); both backends must use the same channel
+INVALIDATION_BUS = {
+    'ENABLED': config('INVALIDATION_BUS_ENABLED', default=True, cast=bool),
+    'CHANNEL': config('INVALIDATION_BUS_CHANNEL', default='tars_invalidation'),
+    'DATABASE': 'default',
+}
+
+# Run core.warmup.warm_up() when a server starts: gunicorn.conf.py's hooks,
+# or the ASGI lifespan startup (tars/asgi.py)
+WARM_UP_ON_BOOT = config('WARM_UP_ON_BOOT', default=True, cast=bool)
+
+# Seconds before /api/home/ re-renders its HomeSnapshot even without a
+# change signal (core/snapshots.py)
+HOME_SNAPSHOT_MAX_AGE = config('HOME_SNAPSHOT_MAX_AGE', default=3600, cast=int)
+
+# /api/batch/ limits (tars/batch.py); MAX_WORKERS=1 runs sub-requests serially
+BATCH_API = {
+    'MAX_REQUESTS': config('BATCH_MAX_REQUESTS', default=10, cast=int),
+    'MAX_WORKERS': config('BATCH_MAX_WORKERS', default=4, cast=int),
+}
+
+# gzip/brotli for API responses (core/middleware.py); compressed bodies of
+# the shared endpoints are cached by payload hash so unchanged payloads are
+# compressed once. SHARED_PATHS and EXCLUDED_PATHS keep their defaults
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CACHE_ALIAS': 'default',
+    'CACHE_TIMEOUT': config('COMPRESSION_CACHE_TIMEOUT', default=3600, cast=int),
+}
+
+# Rate limiter storage: 'memory' (per worker) or 'cache' (shared across workers)
+RATE_LIMIT = {
+    'BACKEND': config('RATE_LIMIT_BACKEND', default='memory'),
+    # Straight to the shared tier: a per-worker copy would undercount
+    'CACHE_ALIAS': 'shared',
 }
 
 # JWT Settings
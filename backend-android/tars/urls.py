@@ -4,19 +4,22 @@ URL configuration for tars project - Android Backend
 This backend is specifically configured for the Android app.
 """
 
-from django.contrib import admin
 from django.urls import path, include
+from django.urls.resolvers import RoutePattern, URLResolver
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from . import views
 from . import auth_views
+from .batch import batch
 from rest_framework_simplejwt.views import TokenRefreshView
 from core.views import (
     SiteSettingsViewSet, SponsorViewSet, SocialLinkViewSet,
     ClassViewSet, ResourceViewSet, TeamMemberViewSet, DomainViewSet, MemberViewSet, home_page_data, member_portal_data,
     increment_download
 )
+from core.throttling import TokenRefreshRateThrottle
+from core import async_views
 
 # Create router for viewsets
 router = DefaultRouter()
@@ -29,11 +32,6 @@ router.register(r'members', MemberViewSet)
 router.register(r'classes', ClassViewSet)
 router.register(r'resources', ResourceViewSet)
 
-# Customize admin site headers
-admin.site.site_header = "TARS Club Administration (Android Backend)"
-admin.site.site_title = "TARS Android Admin Portal"
-admin.site.index_title = "Welcome to TARS Club Management - Android Backend"
-
 urlpatterns = [
     # Root endpoint
     path("", views.root, name="root"),
@@ -41,19 +39,26 @@ urlpatterns = [
     # Test endpoint for debugging
     path("api/test/classes/", views.test_classes, name="test_classes"),
     
-    # Admin
-    path("admin/", admin.site.urls),
+    # Admin, imported on its first request (tars/admin_urls.py)
+    URLResolver(RoutePattern("admin/"), "tars.admin_urls", app_name="admin", namespace="admin"),
     
     # Health & Info
     path("api/health/", views.health_check, name="health_check"),
     path("api/info/", views.api_info, name="api_info"),
     
+    # Several GET requests in one round trip
+    path("api/batch/", batch, name="batch"),
+    
     # Home page data
     path("api/home/", home_page_data, name="home_page_data"),
     
     # Member portal data
     path("api/portal/", member_portal_data, name="member_portal_data"),
     
+    # Async home/portal for the ASGI deployment (core/async_views.py)
+    path("api/async/home/", async_views.home_page_data, name="home_page_data_async"),
+    path("api/async/portal/", async_views.member_portal_data, name="member_portal_data_async"),
+    
     # Increment download count
     path("api/resources/<int:resource_id>/download/", increment_download, name="increment_download"),
     
@@ -64,7 +69,7 @@ urlpatterns = [
     path("api/auth/register/", auth_views.register, name="register"),
     path("api/auth/login/", auth_views.login, name="login"),
     path("api/auth/logout/", auth_views.logout, name="logout"),
-    path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/auth/token/refresh/", TokenRefreshView.as_view(throttle_classes=[TokenRefreshRateThrottle]), name="token_refresh"),
     
     # User Profile
     path("api/auth/profile/", auth_views.user_profile, name="user_profile"),
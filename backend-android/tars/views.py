@@ -3,6 +3,10 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db import connection
 from django.utils import timezone
+from core.renderers import enum_tables
+from core import warmup
+from core.cache_backends import cache_stats
+from .passwords import password_pool
 
 
 @api_view(['GET'])
@@ -18,6 +22,7 @@ def root(request):
             'health': '/api/health/',
             'info': '/api/info/',
             'home': '/api/home/',
+            'batch': '/api/batch/',
             'admin': '/admin/',
             'auth': {
                 'register': '/api/auth/register/',
@@ -43,14 +48,22 @@ def health_check(request):
     - API is running
     - Database connection is working
     - Returns current timestamp
+    Staff also get the password hashing pool's counters, which would tell
+    anyone else when login is saturated
     """
     health_status = {
         'status': 'healthy',
         'timestamp': timezone.now().isoformat(),
         'service': 'TARS Backend API - Android',
         'platform': 'Android',
-        'database': 'disconnected'
+        'database': 'disconnected',
+        'cache': cache_stats(),
+        'warm_up': {
+            key: value for key, value in (warmup.last_report or {}).items() if key != 'steps'
+        },
     }
+    if request.user.is_staff:
+        health_status['password_pool'] = password_pool.stats()
     
     # Check database connection
     try:
@@ -79,7 +92,9 @@ def api_info(request):
             'health': '/api/health/',
             'admin': '/admin/',
             'info': '/api/info/'
-        }
+        },
+        # Integer codes used for choice fields in application/msgpack responses
+        'msgpack_enums': enum_tables(),
     })
 
 
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import SiteSettings, Sponsor, SocialLink, Class, Resource, TeamMember, Domain, Member, Meeting
+from django.db import connection
+from .models import (
+    SiteSettings, Sponsor, SocialLink, Class, Enrollment, Resource, TeamMember, Domain, Member, Meeting, MeetingOverride,
+)
+from .search import prefix_search_query
 
 
 @admin.register(SiteSettings)
@@ -83,6 +87,7 @@ class DomainAdmin(admin.ModelAdmin):
 class MemberAdmin(admin.ModelAdmin):
     list_display = ['user', 'domain', 'lead', 'university_roll', 'is_active']
     list_filter = ['is_active', 'domain']
+    # icontains on these hits the UPPER(col::text) trigram indexes from migration 0009
     search_fields = ['user__username', 'user__email', 'personal_mail', 'gla_mail', 'university_roll']
     ordering = ['-created_at']
 
@@ -119,6 +124,17 @@ class SocialLinkAdmin(admin.ModelAdmin):
     )
 
 
+class EnrollmentInline(admin.TabularInline):
+    model = Enrollment
+    extra = 0
+    fields = ['member', 'created_at']
+    readonly_fields = ['member', 'created_at']
+    
+    # Members enroll through the API, which takes the seat; deleting here frees it
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Class)
 class ClassAdmin(admin.ModelAdmin):
     list_display = ['title', 'instructor_display', 'difficulty', 'status', 'start_date', 'enrolled_count', 'max_participants', 'is_active']
@@ -150,7 +166,9 @@ class ClassAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    # Kept in step with the enrollments (core/enrollment.py)
+    readonly_fields = ['enrolled_count', 'created_at', 'updated_at']
+    inlines = [EnrollmentInline]
     
     def instructor_display(self, obj):
         if obj.instructor:
@@ -188,6 +206,20 @@ class ResourceAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'updated_at', 'download_count']
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the GIN-indexed tsvector on Postgres instead of ILIKE scans;
+        # the last word is a prefix, as the ILIKE search matched partial words
+        search_query = prefix_search_query(search_term) if connection.vendor == 'postgresql' else None
+        if search_query is not None:
+            return queryset.filter(search_vector=search_query), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class MeetingOverrideInline(admin.TabularInline):
+    model = MeetingOverride
+    extra = 0
+    fields = ['original_start', 'is_cancelled', 'title', 'scheduled_date', 'end_time', 'meeting_link', 'location']
+
 
 @admin.register(Meeting)
 class MeetingAdmin(admin.ModelAdmin):
@@ -208,7 +240,9 @@ class MeetingAdmin(admin.ModelAdmin):
             'description': 'Select speaker from team members, or leave empty and fill speaker_other for guest speakers.'
         }),
         ('Scheduling', {
-            'fields': ('scheduled_by', 'scheduled_date', 'end_time')
+            'fields': ('scheduled_by', 'scheduled_date', 'end_time', 'recurrence'),
+            'description': 'For a recurring meeting, the date and time are its first occurrence. '
+                           'Change or cancel single occurrences under Meeting Occurrence Overrides below.'
         }),
         ('Visibility', {
             'fields': ('domains',),
@@ -223,6 +257,7 @@ class MeetingAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [MeetingOverrideInline]
     
     def speaker_display(self, obj):
         if obj.speaker:
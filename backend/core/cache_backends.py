@@ -0,0 +1,347 @@
+"""
+Two-tier Django cache backend: a per-worker LRU in front of a shared cache.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.TwoTierCache',
+            'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 2000, 'LOCAL_TIMEOUT': 30},
+        },
+        'shared': {...},   # Redis, or the file cache as a local stand-in
+    }
+
+Reads check the in-process LRU first and fall back to the shared cache,
+keeping what they find locally for at most ``LOCAL_TIMEOUT`` seconds, and
+no longer than the shared entry has left when the shared backend lets us
+ask (Redis, the file cache). Over any other shared backend a local copy
+can outlive the shared entry by up to ``LOCAL_TIMEOUT``.
+Writes go to both tiers. Deletes are also broadcast over the invalidation
+bus (core/invalidation.py), so other workers drop their local copies
+without waiting for them to expire. The broadcast is ``publish_async``:
+the bus's listener thread sends it, so a delete doesn't wait for a
+NOTIFY round trip.
+
+Keys are versioned the Django way (``VERSION`` / ``version=``), and the
+version is passed through to the shared cache, so bumping ``VERSION``
+invalidates both tiers at once.
+
+``get_or_set`` is single-flight: threads of one worker wait on a per-key
+lock, and workers coordinate through an ``add()``-based lock in the shared
+cache, so an expired entry is recomputed once rather than by every
+request that misses at the same moment.
+
+``cache_stats()`` reports hits per tier, misses and coalesced
+recomputations for the health check.
+"""
+
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.redis import RedisCache
+
+from .invalidation import invalidation_bus
+
+_MISSING = object()
+
+# location -> LocalTier, shared by every thread's backend instance (Django
+# creates one instance per thread, like LocMemCache)
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class LocalTier:
+    """Bounded LRU of pickled values with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, pickled)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self._flights = {}  # key -> [lock, waiters]
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            self.delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    @contextmanager
+    def flight(self, key):
+        """Serialize recomputation of ``key`` among this worker's threads."""
+        with self.lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self.lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+
+def _get_tier(location, max_entries):
+    with _tiers_lock:
+        if location not in _tiers:
+            _tiers[location] = LocalTier(max_entries)
+        return _tiers[location]
+
+
+def cache_stats():
+    """Counters and sizes of every two-tier cache in this worker."""
+    return {
+        location: {**tier.stats, 'local_entries': len(tier.entries)}
+        for location, tier in _tiers.items()
+    }
+
+
+def _shared_remaining(shared, keys, version):
+    """
+    Seconds each of ``keys`` has left in the shared cache. Keys that never
+    expire, or whose expiry the backend doesn't expose, are left out.
+    """
+    remaining = {}
+    if isinstance(shared, RedisCache):
+        pipeline = shared._cache.get_client().pipeline(transaction=False)
+        for key in keys:
+            pipeline.pttl(shared.make_and_validate_key(key, version=version))
+        for key, milliseconds in zip(keys, pipeline.execute()):
+            if milliseconds != -1:
+                # -2: gone since we read it
+                remaining[key] = max(milliseconds, 0) / 1000
+    elif isinstance(shared, FileBasedCache):
+        now = time.time()
+        for key in keys:
+            try:
+                with open(shared._key_to_file(key, version), 'rb') as f:
+                    expires_at = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                remaining[key] = 0
+                continue
+            if expires_at is not None:
+                remaining[key] = expires_at - now
+    return remaining
+
+
+def _evict_local(keys):
+    for tier in list(_tiers.values()):
+        if keys is None:
+            tier.clear()
+        else:
+            tier.delete_many(keys)
+
+
+def _clear_local(keys):
+    _evict_local(None)
+
+
+invalidation_bus.subscribe('cache', _evict_local)
+invalidation_bus.subscribe('cache-clear', _clear_local)
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 30)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self._lock_wait = options.get('LOCK_WAIT', 5)
+        self._tier = _get_tier(location or 'default', options.get('LOCAL_MAX_ENTRIES', 1000))
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _version(self, version):
+        return self.version if version is None else version
+
+    def _shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self._local_timeout
+        return min(timeout - time.time(), self._local_timeout)
+
+    def _keep_local(self, found, version):
+        """Copy shared hits into the local tier, expiring no later than they do."""
+        remaining = _shared_remaining(self.shared, list(found), self._version(version))
+        for key, value in found.items():
+            ttl = min(remaining.get(key, self._local_timeout), self._local_timeout)
+            self._tier.set(self.make_and_validate_key(key, version=version), value, ttl)
+
+    def _broadcast(self, keys):
+        # Evictions made while handling another worker's message were
+        # already broadcast by that worker
+        if keys and not invalidation_bus.handling_remote():
+            invalidation_bus.publish_async('cache', *keys)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self._tier.get(local_key)
+        if value is not _MISSING:
+            self._tier.stats['local_hits'] += 1
+            return value
+
+        value = self.shared.get(key, _MISSING, version=self._version(version))
+        if value is _MISSING:
+            self._tier.stats['misses'] += 1
+            return default
+        self._tier.stats['shared_hits'] += 1
+        self._keep_local({key: value}, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._tier.get(self.make_and_validate_key(key, version=version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._tier.stats['local_hits'] += len(found)
+
+        if missing:
+            shared_found = self.shared.get_many(missing, version=self._version(version))
+            self._tier.stats['shared_hits'] += len(shared_found)
+            self._tier.stats['misses'] += len(missing) - len(shared_found)
+            self._keep_local(shared_found, version)
+            found.update(shared_found)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, self._shared_timeout(timeout), version=self._version(version))
+        self._tier.set(local_key, value, self._local_ttl(timeout))
+        self._tier.stats['sets'] += 1
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, self._shared_timeout(timeout), version=self._version(version))
+        ttl = self._local_ttl(timeout)
+        for key, value in data.items():
+            if key not in failed:
+                self._tier.set(self.make_and_validate_key(key, version=version), value, ttl)
+        self._tier.stats['sets'] += len(data) - len(failed)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self.shared.add(key, value, self._shared_timeout(timeout), version=self._version(version))
+        if added:
+            self._tier.set(local_key, value, self._local_ttl(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._tier.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, self._shared_timeout(timeout), version=self._version(version))
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._tier.delete(local_key)
+        deleted = self.shared.delete(key, version=self._version(version))
+        self._broadcast([local_key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        local_keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        self._tier.delete_many(local_keys)
+        self.shared.delete_many(keys, version=self._version(version))
+        self._broadcast(local_keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._tier.delete(local_key)
+        value = self.shared.incr(key, delta, version=self._version(version))
+        self._broadcast([local_key])
+        return value
+
+    def clear(self):
+        self._tier.clear()
+        self.shared.clear()
+        if not invalidation_bus.handling_remote():
+            invalidation_bus.publish('cache-clear', 'all')
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout=timeout, version=version)
+            return self.get(key, default, version=version)
+
+        with self._tier.flight(self.make_and_validate_key(key, version=version)):
+            # Another thread may have filled it while we waited
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._tier.stats['coalesced'] += 1
+                return value
+            return self._compute_once(key, default, timeout, version)
+
+    def _compute_once(self, key, compute, timeout, version):
+        shared_version = self._version(version)
+        lock_key = f'{key}:lock'
+        if self.shared.add(lock_key, 1, self._lock_timeout, version=shared_version):
+            try:
+                value = compute()
+                self.set(key, value, timeout, version=version)
+            finally:
+                self.shared.delete(lock_key, version=shared_version)
+            return value
+
+        # Another worker is computing it; wait for its result
+        deadline = time.monotonic() + self._lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.shared.get(key, _MISSING, version=shared_version)
+            if value is not _MISSING:
+                self._tier.stats['coalesced'] += 1
+                self._keep_local({key: value}, version)
+                return value
+
+        value = compute()
+        self.set(key, value, timeout, version=version)
+        return value
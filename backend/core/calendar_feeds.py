@@ -0,0 +1,318 @@
+"""
+iCalendar feeds of meetings and classes: /api/calendar/<token>.ics.
+
+Calendar apps can't send a JWT, so a feed URL carries a signed token
+instead (``feed_token``, handed out by /api/calendar/). It names the user
+and a fragment of their password hash, so changing the password revokes
+every feed URL issued before, like simplejwt's revoke claim.
+
+A feed holds the meetings MeetingViewSet would list for its user (every
+meeting for staff and team members, otherwise their domain's meetings and
+the all-domain ones) and the active classes. That only depends on the
+user's domain set, so feeds are rendered and cached per domain set, not
+per user: a poll costs the principal, profile, generation and feed cache
+reads, and a 304 when the ETag still matches.
+
+Rendering walks the rows with ``iterator()`` and writes each event's lines
+as it goes. Repeating meetings are one event with an RRULE; their
+overrides (core/recurrence.py) become EXDATEs and RECURRENCE-ID events.
+
+Every cached feed belongs to a generation, a random stamp in the cache.
+Meeting and class changes (published on the invalidation bus, see
+core/signals.py) drop the stamp, so the next poll renders new feeds for
+all domain sets at once and the old ones expire unused.
+"""
+
+import hashlib
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+
+from .authentication import get_principal, password_digest
+from .invalidation import invalidation_bus
+from .meeting_events import TOPIC
+from .models import Class, Meeting
+from .profiles import get_profile
+from .recurrence import IS_SERIES, is_occurrence, occurrence, parse_rrule
+
+TOKEN_SALT = 'core.calendar_feeds'
+GENERATION_KEY = 'calendar:generation'
+PRODID = '-//TARS//Meetings and classes//EN'
+UID_DOMAIN = 'tars'
+CHUNK_SIZE = 200
+
+# RFC 5545 limits content lines to 75 octets, continuations included
+LINE_OCTETS = 75
+
+
+# Tokens
+
+def password_fragment(user):
+    return password_digest(user)[:12]
+
+
+def feed_token(user):
+    return signing.dumps([user.pk, password_fragment(user)], salt=TOKEN_SALT)
+
+
+def feed_user(token):
+    """The active user a feed token was issued to, None if it's invalid or revoked"""
+    try:
+        user_id, fragment = signing.loads(token, salt=TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    user = get_principal(user_id)
+    if user is None or not user.is_active or fragment != password_fragment(user):
+        return None
+    return user
+
+
+def feed_domains(user):
+    """
+    None if ``user`` sees every meeting, else the ids of the domains whose
+    meetings they see besides the all-domain ones (MeetingViewSet's rules),
+    read from the cached profile.
+    """
+    profile = get_profile(user.pk)
+    if profile is None:
+        raise Http404("No such user")
+    if profile['is_staff'] or profile['team_member'] is not None:
+        return None
+    member = profile['member']
+    if member is None:
+        raise PermissionDenied("Only members have a calendar feed")
+    return frozenset([member['domain']['id']] if member['domain'] else [])
+
+
+# Content lines
+
+def escape(text):
+    text = text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+    return text.replace('\r\n', '\\n').replace('\r', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """``line`` as CRLF-terminated content lines of at most 75 octets"""
+    if len(line.encode()) <= LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    current, size = [], 0
+    for char in line:
+        width = len(char.encode())
+        # Continuations start with a space, which counts
+        if size + width > LINE_OCTETS - (1 if parts else 0):
+            parts.append(''.join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def utc_stamp(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def local_stamp(moment):
+    return timezone.localtime(moment).strftime('%Y%m%dT%H%M%S')
+
+
+def timezone_lines():
+    """
+    VTIMEZONE for settings.TIME_ZONE, which repeating meetings keep their
+    wall-clock time in. It gives the zone's current offset, exact for zones
+    without daylight saving time (Asia/Kolkata); clients that know the TZID
+    use their own rules anyway.
+    """
+    offset = timezone.localtime().utcoffset()
+    minutes = int(offset.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    offset = f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+    return [
+        'BEGIN:VTIMEZONE',
+        f'TZID:{settings.TIME_ZONE}',
+        'BEGIN:STANDARD',
+        'DTSTART:19700101T000000',
+        f'TZOFFSETFROM:{offset}',
+        f'TZOFFSETTO:{offset}',
+        f'TZNAME:{timezone.localtime().tzname()}',
+        'END:STANDARD',
+        'END:VTIMEZONE',
+    ]
+
+
+def text_lines(**properties):
+    return [f'{name.upper()}:{escape(value)}' for name, value in properties.items() if value]
+
+
+def meeting_description(meeting):
+    parts = [meeting.description or '']
+    if meeting.speaker_id or meeting.speaker_other:
+        parts.append(f'Speaker: {meeting.speaker_display}')
+    if meeting.meeting_link:
+        parts.append(f'Join: {meeting.meeting_link}')
+    return '\n\n'.join(part for part in parts if part)
+
+
+def meeting_event(meeting, timing, uid=None):
+    """VEVENT lines of ``meeting`` (or an occurrence of series ``uid``) with the ``timing`` lines"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:meeting-{uid or meeting.pk}@{UID_DOMAIN}',
+        f'DTSTAMP:{utc_stamp(meeting.updated_at)}',
+        *timing,
+    ]
+    lines += text_lines(
+        summary=meeting.title,
+        description=meeting_description(meeting),
+        location=meeting.location or meeting.meeting_link,
+    )
+    if meeting.meeting_link:
+        lines.append(f'URL:{meeting.meeting_link}')
+    lines += ['STATUS:CANCELLED' if meeting.status == 'cancelled' else 'STATUS:CONFIRMED', 'END:VEVENT']
+    return lines
+
+
+def meeting_end(meeting):
+    return meeting.end_time or meeting.scheduled_date + Meeting.DEFAULT_DURATION
+
+
+def utc_timing(meeting):
+    return [f'DTSTART:{utc_stamp(meeting.scheduled_date)}', f'DTEND:{utc_stamp(meeting_end(meeting))}']
+
+
+def series_events(meeting):
+    """The series as one repeating event, plus an event per changed occurrence"""
+    rule = parse_rrule(meeting.recurrence)
+    # Not the overrides a change to the rule left behind
+    overrides = sorted(
+        (override for override in meeting.overrides.all()
+         if is_occurrence(rule, meeting.scheduled_date, override.original_start)),
+        key=lambda override: override.original_start,
+    )
+    zone = settings.TIME_ZONE
+    # The rule repeats the local wall-clock time, so the first occurrence is local too
+    timing = [
+        f'DTSTART;TZID={zone}:{local_stamp(meeting.scheduled_date)}',
+        f'DTEND;TZID={zone}:{local_stamp(meeting_end(meeting))}',
+        f'RRULE:{meeting.recurrence}',
+    ]
+    timing += [f'EXDATE;TZID={zone}:{local_stamp(override.original_start)}' for override in overrides if override.is_cancelled]
+    lines = meeting_event(meeting, timing)
+    for override in overrides:
+        if not override.is_cancelled:
+            changed = occurrence(meeting, override.original_start, override)
+            timing = [f'RECURRENCE-ID;TZID={zone}:{local_stamp(override.original_start)}', *utc_timing(changed)]
+            lines += meeting_event(changed, timing, uid=meeting.pk)
+    return lines
+
+
+def class_event(course):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:class-{course.pk}@{UID_DOMAIN}',
+        f'DTSTAMP:{utc_stamp(course.updated_at)}',
+        f'DTSTART:{utc_stamp(course.start_date)}',
+    ]
+    if course.end_date and course.end_date > course.start_date:
+        lines.append(f'DTEND:{utc_stamp(course.end_date)}')
+    description = course.description
+    if course.instructor_id or course.instructor_name:
+        description = f'{description}\n\nInstructor: {course.instructor_display}'
+    lines += text_lines(summary=course.title, description=description, location=course.location or course.meeting_link)
+    if course.meeting_link:
+        lines.append(f'URL:{course.meeting_link}')
+    lines += ['STATUS:CONFIRMED', 'END:VEVENT']
+    return lines
+
+
+# Feeds
+
+def feed_meetings(domains, since):
+    meetings = Meeting.objects.filter(is_active=True).filter(
+        Q(scheduled_date__gte=since) | Q(recurrence_end__gt=since) | (IS_SERIES & Q(recurrence_end__isnull=True))
+    )
+    if domains is not None:
+        # A meeting with no domains is for everyone
+        meetings = meetings.filter(Q(domains__in=domains) | Q(domains__isnull=True)).distinct()
+    return meetings.select_related('speaker').prefetch_related('overrides').order_by('scheduled_date', 'pk')
+
+
+def feed_classes(since):
+    classes = Class.objects.filter(is_active=True).filter(
+        Q(start_date__gte=since) | Q(end_date__gte=since)
+    )
+    return classes.select_related('instructor').order_by('start_date', 'pk')
+
+
+def feed_chunks(domains):
+    """The feed's text, one chunk per event"""
+    since = timezone.now() - timedelta(days=getattr(settings, 'CALENDAR_FEED_PAST_DAYS', 90))
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:TARS meetings and classes',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+        *timezone_lines(),
+    ]
+    yield ''.join(map(fold, header))
+    for meeting in feed_meetings(domains, since).iterator(chunk_size=CHUNK_SIZE):
+        lines = series_events(meeting) if meeting.recurrence else meeting_event(meeting, utc_timing(meeting))
+        yield ''.join(map(fold, lines))
+    for course in feed_classes(since).iterator(chunk_size=CHUNK_SIZE):
+        yield ''.join(map(fold, class_event(course)))
+    yield fold('END:VCALENDAR')
+
+
+def render_feed(domains):
+    """``(etag, body)`` of the feed for ``domains``"""
+    body = ''.join(feed_chunks(domains)).encode()
+    return hashlib.sha1(body).hexdigest(), body
+
+
+def scope_key(domains):
+    if domains is None:
+        return 'all'
+    return 'domains-' + '-'.join(str(pk) for pk in sorted(domains))
+
+
+def get_feed(domains):
+    """The cached ``(etag, body)`` of the feed for ``domains``, rendered on a miss"""
+    generation = cache.get_or_set(GENERATION_KEY, lambda: uuid.uuid4().hex[:12], None)
+    timeout = getattr(settings, 'CALENDAR_FEED_CACHE_TIMEOUT', 3600)
+    return cache.get_or_set(f'calendar:{generation}:{scope_key(domains)}', lambda: render_feed(domains), timeout)
+
+
+def invalidate_feeds():
+    cache.delete(GENERATION_KEY)
+
+
+def _schedules_changed(keys):
+    invalidate_feeds()
+
+
+invalidation_bus.subscribe(TOPIC, _schedules_changed)
+invalidation_bus.subscribe('core.class', _schedules_changed)
+
+
+def feed_response(request, etag, body):
+    # Weak: the compression middleware may re-encode the body
+    etag = f'W/"{etag}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Content-Disposition'] = 'inline; filename="tars.ics"'
+    return response
@@ -0,0 +1,93 @@
+"""
+Class enrollment with atomic seat accounting.
+
+``Class.enrolled_count`` is the number of Enrollment rows of the class, and
+never more than ``max_participants``. ``enroll`` takes a seat with one
+conditional UPDATE:
+
+    UPDATE core_class SET enrolled_count = enrolled_count + 1
+     WHERE id = %s AND enrolled_count < max_participants AND ...
+
+Concurrent enrollments in a class queue on its row lock, and Postgres
+re-checks the condition against the row each one finds once the lock is
+released. So the last seat goes to exactly one request and the others
+match no row, however many arrive when registration opens. No read-then-write
+is involved, so no increment is lost. The Enrollment row is inserted in the
+same transaction, so a duplicate enrollment rolls the seat back.
+
+Deleting an Enrollment, through ``unenroll``, the admin or a cascade, frees
+its seat (see core/signals.py).
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from .models import Class, Enrollment
+
+
+class ClassFull(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This class is full.'
+    default_code = 'class_full'
+
+
+class EnrollmentClosed(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This class is not open for enrollment.'
+    default_code = 'enrollment_closed'
+
+
+def open_classes():
+    """Classes that take enrollments: active, not archived and not over"""
+    return Class.objects.filter(is_active=True).exclude(status='archived').filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=timezone.now())
+    )
+
+
+def enroll(member, class_id):
+    """
+    Give ``member`` a seat in class ``class_id``. Returns ``(enrollment,
+    created)``; an existing enrollment is returned as it is. Raises
+    NotFound, EnrollmentClosed or ClassFull.
+    """
+    existing = Enrollment.objects.filter(member=member, course_id=class_id).first()
+    if existing is not None:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            # Insert first: a concurrent duplicate fails on the unique
+            # constraint before it takes a seat
+            enrollment = Enrollment.objects.create(member=member, course_id=class_id)
+            seated = open_classes().filter(pk=class_id, enrolled_count__lt=F('max_participants')).update(
+                enrolled_count=F('enrolled_count') + 1,
+            )
+            if not seated:
+                # Rolls the enrollment back; then find out why
+                raise ClassFull()
+    except IntegrityError:
+        # The other request won, or the class is gone
+        existing = Enrollment.objects.filter(member=member, course_id=class_id).first()
+        if existing is not None:
+            return existing, False
+        raise exceptions.NotFound('No such class.')
+    except ClassFull:
+        if not Class.objects.filter(pk=class_id, is_active=True).exists():
+            raise exceptions.NotFound('No such class.')
+        if not open_classes().filter(pk=class_id).exists():
+            raise EnrollmentClosed()
+        raise
+    return enrollment, True
+
+
+def unenroll(member, class_id):
+    """Give up ``member``'s seat in class ``class_id``; False if they had none."""
+    deleted, _ = Enrollment.objects.filter(member=member, course_id=class_id).delete()
+    return bool(deleted)
+
+
+def release_seat(class_id):
+    # Conditional too: never below zero, whatever was edited by hand
+    Class.objects.filter(pk=class_id, enrolled_count__gt=0).update(enrolled_count=F('enrolled_count') - 1)
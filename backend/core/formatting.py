@@ -0,0 +1,51 @@
+"""
+Cached display strings for dates shown by the serializers.
+
+List endpoints format the same handful of timestamps over and over (every
+class starting on the hour, every sponsor from the same month), so the
+formatted strings are memoized per value. The display timezone is
+resolved once at import instead of per row.
+"""
+
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.utils import timezone
+
+DISPLAY_TIMEZONE = ZoneInfo('Asia/Kolkata')
+
+MONTH_FORMAT = '%B %Y'                        # "December 2025"
+DATETIME_FORMAT = '%B %d, %Y at %I:%M %p'     # "December 28, 2025 at 02:30 PM"
+
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def format_month(value):
+    return value.strftime(MONTH_FORMAT)
+
+
+def format_datetime(value):
+    """Format a datetime as-is, in whatever timezone it carries."""
+    # Aware datetimes compare equal across timezones, so the offset is part
+    # of the key: the same instant reads differently in UTC and IST
+    return _format_wall_clock(value, value.utcoffset())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _format_wall_clock(value, offset):
+    return value.strftime(DATETIME_FORMAT)
+
+
+def format_local_datetime(value):
+    """Format a datetime in IST; naive values are taken as the current timezone."""
+    # Made aware before the cache: what a naive value means depends on the
+    # activated timezone, while equal aware values are the same instant
+    if value.tzinfo is None:
+        value = timezone.make_aware(value)
+    return _format_instant(value)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _format_instant(value):
+    return value.astimezone(DISPLAY_TIMEZONE).strftime(DATETIME_FORMAT)
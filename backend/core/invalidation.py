@@ -0,0 +1,257 @@
+"""
+Cross-process invalidation bus on Postgres LISTEN/NOTIFY.
+
+The website and Android backends run as separate deployments (each with
+several workers) on one database, so a cache held in one process can't see
+edits made through another. ``invalidation_bus.publish(topic, *keys)``
+runs this process's handlers for the topic and sends a ``NOTIFY`` on
+``INVALIDATION_BUS['CHANNEL']``. Every worker runs a daemon thread that
+``LISTEN``s on that channel and runs its own handlers for messages
+published elsewhere.
+
+Both happen once the publishing transaction commits (right away outside
+one), and not at all if it rolls back. So no handler, here or elsewhere,
+reloads data that isn't visible yet or evicts a cache entry that a
+concurrent request could fill again from the old row before the commit.
+
+``publish_async`` is the same, except that in a process with a listener
+the NOTIFY is left to the listener thread, which sends it on its own
+connection: the publisher doesn't wait for a round trip, and keys published
+in a burst go out together. For evictions, where a late message only keeps
+another worker's copy a moment longer.
+
+Handlers are registered per topic with ``subscribe(topic, handler)`` and
+called with a list of string keys. After the listener loses its
+connection, messages may have been missed, so on reconnect every handler
+is called with ``None``: drop whatever can't be trusted.
+
+Topics in use: ``profile`` (user ids, core/profiles.py), ``principal``
+(user ids, core/authentication.py), ``cache`` and ``cache-clear`` (local
+tier keys, core/cache_backends.py) and model labels such as ``core.class``
+(primary keys, see core/signals.py).
+
+On other databases (SQLite in tests and local runs) only the local
+handlers run.
+"""
+
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD = 7000
+POLL_TIMEOUT = 30
+MAX_BACKOFF = 60
+
+HOSTNAME = socket.gethostname()
+
+
+def bus_settings():
+    return {
+        'ENABLED': True,
+        'CHANNEL': 'tars_invalidation',
+        'DATABASE': 'default',
+        **getattr(settings, 'INVALIDATION_BUS', {}),
+    }
+
+
+def process_id():
+    # Computed per call: the pid changes when gunicorn forks workers
+    return f'{HOSTNAME}:{os.getpid()}'
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._state = threading.local()
+        # publish_async keys waiting for the listener, by topic
+        self._outbox = defaultdict(set)
+        self._wake_reader = self._wake_writer = None
+
+    def subscribe(self, topic, handler):
+        self._handlers[topic].append(handler)
+
+    def dispatch(self, topic, keys):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(keys)
+            except Exception:
+                logger.exception("Invalidation handler for %r failed", topic)
+
+    def dispatch_all(self, keys):
+        for topic in list(self._handlers):
+            self.dispatch(topic, keys)
+
+    def handling_remote(self):
+        """True while this thread runs handlers for another process's message."""
+        return getattr(self._state, 'remote', False)
+
+    def _dispatch_remote(self, dispatch, *args):
+        self._state.remote = True
+        try:
+            dispatch(*args)
+        finally:
+            self._state.remote = False
+
+    def publish(self, topic, *keys):
+        keys = [str(key) for key in keys if key is not None]
+        if not keys:
+            return
+        transaction.on_commit(
+            partial(self._publish_committed, topic, keys), using=bus_settings()['DATABASE'], robust=True,
+        )
+
+    def _publish_committed(self, topic, keys):
+        self.dispatch(topic, keys)
+
+        options = bus_settings()
+        connection = connections[options['DATABASE']]
+        if not options['ENABLED'] or connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            for payload in self.payloads(topic, keys):
+                cursor.execute('SELECT pg_notify(%s, %s)', [options['CHANNEL'], payload])
+
+    def publish_async(self, topic, *keys):
+        keys = [str(key) for key in keys if key is not None]
+        if not keys:
+            return
+        transaction.on_commit(
+            partial(self._publish_async_committed, topic, keys), using=bus_settings()['DATABASE'], robust=True,
+        )
+
+    def _publish_async_committed(self, topic, keys):
+        if self._listener_pid != os.getpid():
+            # No listener here (a management command): send it now
+            self._publish_committed(topic, keys)
+            return
+        self.dispatch(topic, keys)
+        with self._lock:
+            waiting = bool(self._outbox)
+            self._outbox[topic].update(keys)
+            if not waiting:
+                self._wake_writer.send(b'\0')
+
+    def _send_outbox(self, connection):
+        with self._lock:
+            outbox, self._outbox = self._outbox, defaultdict(set)
+        channel = bus_settings()['CHANNEL']
+        with connection.cursor() as cursor:
+            for topic, keys in outbox.items():
+                for payload in self.payloads(topic, sorted(keys)):
+                    cursor.execute('SELECT pg_notify(%s, %s)', [channel, payload])
+
+    @staticmethod
+    def payloads(topic, keys):
+        """JSON messages for ``keys``, split to fit the NOTIFY size limit."""
+        origin = process_id()
+        chunk = []
+        size = 0
+        for key in keys:
+            if chunk and size + len(key) > MAX_PAYLOAD:
+                yield json.dumps({'origin': origin, 'topic': topic, 'keys': chunk})
+                chunk, size = [], 0
+            chunk.append(key)
+            size += len(key) + 4
+        if chunk:
+            yield json.dumps({'origin': origin, 'topic': topic, 'keys': chunk})
+
+    def receive(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        # Our own publishes were handled when they were made
+        if message.get('origin') == process_id():
+            return
+        self._dispatch_remote(self.dispatch, message.get('topic'), message.get('keys') or [])
+
+    # Listener
+
+    def ensure_listening(self):
+        """Start this process's listener thread if it isn't running yet."""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        options = bus_settings()
+        if not options['ENABLED'] or connections[options['DATABASE']].vendor != 'postgresql':
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+            # Wakes the listener when publish_async has something to send
+            self._wake_reader, self._wake_writer = socket.socketpair()
+            self._wake_reader.setblocking(False)
+            self._outbox.clear()
+            threading.Thread(target=self._listen_forever, name='invalidation-listener', daemon=True).start()
+
+    def listen_connection(self):
+        """A new autocommit connection LISTENing on the bus channel."""
+        options = bus_settings()
+        wrapper = connections[options['DATABASE']]
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {wrapper.ops.quote_name(options['CHANNEL'])}")
+        return connection
+
+    @staticmethod
+    def poll(connection, timeout=POLL_TIMEOUT, wake=None):
+        """Wait up to ``timeout`` seconds (or until ``wake`` is readable) and return the payloads received."""
+        readable, _, _ = select.select([connection] + ([wake] if wake is not None else []), [], [], timeout)
+        if wake is not None and wake in readable:
+            try:
+                wake.recv(4096)
+            except BlockingIOError:
+                pass
+        if connection not in readable:
+            return []
+        connection.poll()
+        payloads = [notify.payload for notify in connection.notifies]
+        connection.notifies.clear()
+        return payloads
+
+    def _listen_forever(self):
+        backoff = 1
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = self.listen_connection()
+                if connected_before:
+                    self._dispatch_remote(self.dispatch_all, None)
+                connected_before = True
+                backoff = 1
+                while True:
+                    for payload in self.poll(connection, wake=self._wake_reader):
+                        self.receive(payload)
+                    self._send_outbox(connection)
+                    # Handlers may have queried through this thread's
+                    # Django connection; don't keep it open between messages
+                    connections.close_all()
+            except Exception:
+                logger.exception("Invalidation listener lost its connection, retrying in %ss", backoff)
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from core.throttling import CacheBucketStore, MemoryBucketStore, TokenBucketThrottle
+
+
+class BenchmarkThrottle(TokenBucketThrottle):
+    scope = 'benchmark'
+    rate = '1000000/s'
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request overhead of the token-bucket throttles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+        parser.add_argument('--keys', type=int, default=1000, help="Number of distinct client IPs")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = APIRequestFactory()
+        requests = [
+            factory.post('/api/auth/login/', REMOTE_ADDR=f'10.0.{i // 256}.{i % 256}')
+            for i in range(options['keys'])
+        ]
+
+        for label, store in (('memory', MemoryBucketStore()), ('cache', CacheBucketStore())):
+            throttle = BenchmarkThrottle(store=store)
+            started = time.perf_counter()
+            for i in range(iterations):
+                throttle.allow_request(requests[i % len(requests)], None)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:>6}: {elapsed * 1e6 / iterations:.2f} us/request "
+                f"({iterations} requests over {len(requests)} keys)"
+            )
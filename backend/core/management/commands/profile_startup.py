@@ -0,0 +1,160 @@
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: load the WSGI app and serve one request
+# through it without a server in between
+PROBE = """
+import io, json, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+from tars.wsgi import application
+from django.conf import settings
+if settings.WARM_UP_ON_BOOT:
+    # What gunicorn.conf.py's hooks do when a server starts
+    from core.warmup import warm_up
+    warm_up()
+loaded = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'wsgi.input': io.BytesIO()}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+responded = time.perf_counter()
+print(json.dumps({
+    'status': statuses[0],
+    'load_ms': (loaded - started) * 1000,
+    'response_ms': (responded - loaded) * 1000,
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """(self_us, cumulative_us, module, depth) rows from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(own), int(cumulative), name.strip(), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile a cold start: where import time goes (python -X importtime) and "
+        "how long a fresh process takes to answer its first request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=['wsgi', 'runserver', 'gunicorn'], default='wsgi',
+            help="Call tars.wsgi.application directly, or start a real server and poll it",
+        )
+        parser.add_argument('--path', default='/api/health/', help="Path of the first request")
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help="Number of modules and packages to list")
+        parser.add_argument('--skip-warm-up', action='store_true', help="Run with WARM_UP_ON_BOOT=False")
+        parser.add_argument('--timeout', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        self.env = dict(os.environ)
+        if options['skip_warm_up']:
+            self.env['WARM_UP_ON_BOOT'] = 'False'
+
+        self.profile_imports(options['path'], options['top'])
+
+        measure = self.probe if options['server'] == 'wsgi' else self.serve
+        timings, cpu_times = [], []
+        for _ in range(options['runs']):
+            cpu_started = self.children_cpu()
+            timings.append(measure(options['server'], options['path'], options['timeout']))
+            cpu_times.append(self.children_cpu() - cpu_started)
+        self.stdout.write(
+            f"\nTime to first response ({options['server']}, {options['path']}, {len(timings)} runs): "
+            f"median {statistics.median(timings):.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms; "
+            f"CPU time median {statistics.median(cpu_times):.0f} ms"
+        )
+
+    @staticmethod
+    def children_cpu():
+        # Steadier than wall-clock time on a busy machine
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return (usage.ru_utime + usage.ru_stime) * 1000
+
+    def run(self, argv, **kwargs):
+        return subprocess.run(
+            argv, cwd=settings.BASE_DIR, env=self.env, capture_output=True, text=True, **kwargs
+        )
+
+    def profile_imports(self, path, top):
+        result = self.run([sys.executable, '-X', 'importtime', '-c', PROBE, path])
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(result.stderr)
+
+        packages = Counter()
+        for own, _, name, _ in rows:
+            packages[name.split('.')[0]] += own
+        total = sum(cumulative for _, cumulative, _, depth in rows if depth == 0)
+
+        self.stdout.write(
+            f"Imports: {total / 1000:.0f} ms over {len(rows)} modules; "
+            f"loading tars.wsgi took {probe['load_ms']:.0f} ms, "
+            f"the first request ({probe['status']}) {probe['response_ms']:.0f} ms"
+        )
+        self.stdout.write("\nSlowest top-level packages (self time):")
+        for name, own in packages.most_common(top):
+            self.stdout.write(f"{own / 1000:10.1f} ms  {name}")
+        self.stdout.write("\nSlowest modules (cumulative):")
+        for own, cumulative, name, depth in sorted(rows, key=lambda row: -row[1])[:top]:
+            self.stdout.write(f"{cumulative / 1000:10.1f} ms  {'  ' * depth}{name}")
+
+    def probe(self, server, path, timeout):
+        started = time.perf_counter()
+        result = self.run([sys.executable, '-c', PROBE, path], timeout=timeout)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return (time.perf_counter() - started) * 1000
+
+    def serve(self, server, path, timeout):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            address = f'127.0.0.1:{sock.getsockname()[1]}'
+        if server == 'runserver':
+            argv = [sys.executable, 'manage.py', 'runserver', '--noreload', address]
+        else:
+            argv = [sys.executable, '-m', 'gunicorn', '--bind', address, '--workers', '1', 'tars.wsgi:application']
+
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            argv, cwd=settings.BASE_DIR, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise CommandError(f"{server} exited with status {process.returncode}")
+                try:
+                    urllib.request.urlopen(f'http://{address}{path}', timeout=timeout).close()
+                except urllib.error.HTTPError:
+                    pass
+                except OSError:
+                    time.sleep(0.01)
+                    continue
+                return (time.perf_counter() - started) * 1000
+            raise CommandError(f"{server} didn't answer within {timeout:.0f}s")
+        finally:
+            process.terminate()
+            process.wait()
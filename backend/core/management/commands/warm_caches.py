@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Prebuild the home snapshot and caches and render the common endpoints once"
+
+    def handle(self, *args, **options):
+        report = warm_up()
+        for step in report['steps']:
+            style = self.style.ERROR if step['detail'].startswith('failed') else self.style.SUCCESS
+            self.stdout.write(f"{step['step']:>20}: {step['ms']:8.1f} ms  " + style(step['detail']))
+        self.stdout.write(f"Warm-up took {report['total_ms']:.1f} ms")
@@ -0,0 +1,349 @@
+"""
+Live meeting events for /api/meetings/events/ (Server-Sent Events, ASGI).
+
+Every ASGI worker keeps one ``MeetingHub``: the domains and start/end times
+of the active meetings, and a timer wheel holding each meeting's next status
+transition (upcoming -> ongoing at its start, ongoing -> completed at its end,
+or an hour after the start when there's no end). A single task advances the
+wheel once per tick and pushes the transitions that fell due, so no client
+has to poll /api/meetings/ and no row's ``computed_status`` is re-evaluated
+to find them. A recurring meeting (core/recurrence.py) has one timer at a
+time, for the next transition of whichever occurrence comes next.
+
+Meeting saves, deletions and domain changes are published on the
+invalidation bus as ``core.meeting`` (see core/signals.py), so edits made
+through any worker or backend reach every hub. The hub reloads those rows
+and sends ``created``, ``updated`` or ``deleted``, per subscriber: a meeting
+that leaves a member's domains is ``deleted`` for them.
+
+Events, one JSON object per ``data:`` line:
+
+    event: status    {"id": 3, "status": "ongoing"}
+                     (plus "occurrence_start" for an occurrence of a series)
+    event: created   <MeetingSerializer data>
+    event: updated   <MeetingSerializer data>
+    event: deleted   {"id": 3}
+    event: resync    {}   (events may have been missed; refetch /api/meetings/)
+
+Subscribers see the meetings /api/meetings/ would list for them.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework import exceptions, serializers
+
+from .invalidation import invalidation_bus
+from .models import Meeting, Member, TeamMember
+from .recurrence import meeting_duration, overridden_occurrences, series_occurrences
+
+logger = logging.getLogger(__name__)
+
+TOPIC = 'core.meeting'
+
+# Seconds per wheel slot, and slots per turn; later timers wait out whole turns
+TICK = 1.0
+WHEEL_SLOTS = 512
+
+HEARTBEAT = 15
+RETRY_MS = 5000
+QUEUE_SIZE = 100
+
+# series: the Meeting, overrides prefetched, if it recurs
+MeetingState = namedtuple('MeetingState', 'domains start end cancelled series')
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: timers are hashed into ``slots`` buckets by their
+    tick, so scheduling and cancelling are O(1) and ``advance`` only looks
+    at the buckets of the ticks that passed. One timer per key.
+    """
+
+    def __init__(self, now, tick=TICK, slots=WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.current = int(now // tick)
+        self.ticks = {}
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def schedule(self, key, when, value):
+        """Fire ``(key, value)`` at the first tick at or after ``when``, replacing ``key``'s timer."""
+        self.cancel(key)
+        tick = max(math.ceil(when / self.tick), self.current + 1)
+        self.slots[tick % len(self.slots)][key] = (tick, value)
+        self.ticks[key] = tick
+
+    def cancel(self, key):
+        tick = self.ticks.pop(key, None)
+        if tick is not None:
+            del self.slots[tick % len(self.slots)][key]
+
+    def advance(self, now):
+        """Remove and return the ``(key, value)`` timers due by ``now``, in order."""
+        target = int(now // self.tick)
+        due = []
+        # After a stall longer than a turn, one pass over every slot finds everything
+        for tick in range(self.current + 1, min(target, self.current + len(self.slots)) + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key, (timer_tick, value) in list(slot.items()):
+                if timer_tick <= target:
+                    del slot[key]
+                    del self.ticks[key]
+                    due.append((timer_tick, key, value))
+        self.current = max(self.current, target)
+        due.sort(key=lambda timer: timer[0])
+        return [(key, value) for _, key, value in due]
+
+
+def span_transition(start, end, now):
+    end = end or start + Meeting.DEFAULT_DURATION
+    if now < start:
+        return start, 'ongoing'
+    if now < end:
+        return end, 'completed'
+    return None
+
+
+def next_transition(state, now):
+    """
+    ``(when, status, occurrence_start)`` of the meeting's next status change
+    after ``now``, or None; occurrence_start is None unless it's a series.
+    """
+    if state.cancelled:
+        return None
+    if state.series is None:
+        transition = span_transition(state.start, state.end, now)
+        return transition and (*transition, None)
+    found = None
+    series = state.series
+
+    def consider(instance):
+        nonlocal found
+        transition = span_transition(instance.scheduled_date, instance.end_time, now)
+        if instance.status != 'cancelled' and transition is not None and (found is None or transition[0] < found[0]):
+            found = (*transition, instance.occurrence_start)
+
+    # A moved or lengthened occurrence may be running from before the scheduled ones
+    for instance in overridden_occurrences(series):
+        consider(instance)
+    for instance in series_occurrences(series, now - meeting_duration(series)):
+        if found is not None and instance.scheduled_date >= found[0]:
+            break
+        consider(instance)
+    return found
+
+
+def meeting_state(meeting):
+    return MeetingState(
+        domains=frozenset(domain.pk for domain in meeting.domains.all()),
+        start=meeting.scheduled_date,
+        end=meeting.end_time,
+        cancelled=meeting.status == 'cancelled',
+        series=meeting if meeting.recurrence else None,
+    )
+
+
+def load_meetings(pks=None):
+    """``{pk: (MeetingState, serialized or None)}`` of the active meetings (only ``pks`` if given)."""
+    from .serializers import MeetingSerializer
+
+    close_old_connections()
+    try:
+        meetings = Meeting.objects.filter(is_active=True).prefetch_related('domains', 'overrides')
+        if pks is None:
+            return {meeting.pk: (meeting_state(meeting), None) for meeting in meetings}
+        meetings = meetings.filter(pk__in=pks).select_related('speaker', 'scheduled_by')
+        return {meeting.pk: (meeting_state(meeting), MeetingSerializer(meeting).data) for meeting in meetings}
+    finally:
+        close_old_connections()
+
+
+def visible_domains(user):
+    """
+    None if ``user`` sees every meeting, else the ids of the domains whose
+    meetings they see besides the all-domain ones (MeetingViewSet's rules).
+    """
+    if user.is_staff or TeamMember.objects.filter(user=user).exists():
+        return None
+    member = Member.objects.filter(user=user).first()
+    if member is None:
+        raise exceptions.PermissionDenied("Only members can follow meetings")
+    return frozenset([member.domain_id] if member.domain_id else [])
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+class Subscriber:
+    def __init__(self, domains):
+        self.domains = domains
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def sees(self, state):
+        if state is None:
+            return False
+        return self.domains is None or not state.domains or bool(state.domains & self.domains)
+
+    def send(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client this far behind refetches instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event('resync', {}))
+
+
+class MeetingHub:
+    def __init__(self):
+        self.loop = None
+        self.task = None
+        self.subscribers = set()
+        self.meetings = {}
+        self.wheel = None
+        self.loaded = False
+        self.pending = set()
+        self.reload_all = False
+        self.flushing = False
+
+    def start(self):
+        """Load the meetings and run the wheel on the running loop, once per loop."""
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            if self.task.done():
+                # run() only ends on an error it couldn't handle; keep the state
+                self.task = loop.create_task(self.run())
+            return
+        self.loop = loop
+        self.meetings = {}
+        self.wheel = TimerWheel(time.time())
+        self.loaded = False
+        self.pending = set()
+        self.flushing = False
+        self.queue_reload(None)
+        self.task = loop.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick - time.time() % self.wheel.tick)
+            for pk, (status, occurrence_start) in self.wheel.advance(time.time()):
+                # One meeting's failure mustn't stop the timers of the others
+                try:
+                    state = self.meetings.get(pk)
+                    self.reschedule(pk, state)
+                    data = {'id': pk, 'status': status}
+                    if occurrence_start is not None:
+                        data['occurrence_start'] = serializers.DateTimeField().to_representation(occurrence_start)
+                    self.broadcast(state, format_event('status', data))
+                except Exception:
+                    logger.exception("Couldn't send the status change of meeting %s", pk)
+
+    def reschedule(self, pk, state):
+        try:
+            transition = next_transition(state, timezone.now()) if state else None
+        except Exception:
+            # E.g. a malformed RRULE saved behind the API's validation
+            logger.exception("Couldn't find the next status change of meeting %s", pk)
+            transition = None
+        if transition is None:
+            self.wheel.cancel(pk)
+        else:
+            when, status, occurrence_start = transition
+            self.wheel.schedule(pk, when.timestamp(), (status, occurrence_start))
+
+    def apply_all(self, rows):
+        self.meetings = {pk: state for pk, (state, _) in rows.items()}
+        self.wheel = TimerWheel(time.time())
+        for pk, state in self.meetings.items():
+            self.reschedule(pk, state)
+
+    def broadcast(self, state, message):
+        for subscriber in self.subscribers:
+            if subscriber.sees(state):
+                subscriber.send(message)
+
+    # Changes
+
+    def meetings_changed(self, keys):
+        """Bus handler; runs on whichever thread received the message."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self.queue_reload, keys)
+
+    def queue_reload(self, keys):
+        if keys is None:
+            self.reload_all = True
+        else:
+            self.pending.update(int(key) for key in keys)
+        if not self.flushing:
+            self.flushing = True
+            self.loop.create_task(self.flush())
+
+    async def flush(self):
+        try:
+            # Yield once so a save and its domain changes arrive as one reload
+            await asyncio.sleep(0)
+            while self.reload_all or self.pending:
+                if self.reload_all:
+                    self.reload_all = False
+                    self.pending.clear()
+                    self.apply_all(await sync_to_async(load_meetings)())
+                    if self.loaded:
+                        for subscriber in self.subscribers:
+                            subscriber.send(format_event('resync', {}))
+                    self.loaded = True
+                    continue
+                pks, self.pending = self.pending, set()
+                rows = await sync_to_async(load_meetings)(pks)
+                for pk in sorted(pks):
+                    self.apply(pk, *rows.get(pk, (None, None)))
+        except Exception:
+            logger.exception("Couldn't reload changed meetings")
+        finally:
+            self.flushing = False
+
+    def apply(self, pk, state, data):
+        old = self.meetings.pop(pk, None)
+        if state is not None:
+            self.meetings[pk] = state
+        self.reschedule(pk, state)
+        for subscriber in self.subscribers:
+            saw, sees = subscriber.sees(old), subscriber.sees(state)
+            if sees:
+                subscriber.send(format_event('updated' if saw else 'created', data))
+            elif saw:
+                subscriber.send(format_event('deleted', {'id': pk}))
+
+    # Streams
+
+    async def stream(self, domains):
+        """SSE messages for a subscriber who sees ``domains`` (see visible_domains)."""
+        self.start()
+        subscriber = Subscriber(domains)
+        self.subscribers.add(subscriber)
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+        finally:
+            self.subscribers.discard(subscriber)
+
+
+meeting_hub = MeetingHub()
+invalidation_bus.subscribe(TOPIC, meeting_hub.meetings_changed)
@@ -0,0 +1,161 @@
+"""
+gzip / brotli compression for API responses.
+
+JSON responses under /api/ larger than ``RESPONSE_COMPRESSION['MIN_SIZE']``
+are compressed with the best encoding the client accepts (brotli when the
+``brotli`` package is installed, otherwise gzip). Responses of the
+``SHARED_PATHS``, the same for every client (home page, site settings,
+sponsors), keep their compressed bodies in the cache keyed by a hash of
+the uncompressed payload, so an unchanged payload is compressed once and
+served from the cache until its content changes; hashing is much cheaper
+than compressing. Other responses (per user, paginated, filtered) are
+compressed each time rather than filling the cache with bodies that are
+never asked for again.
+
+Responses under ``EXCLUDED_PATHS`` (the auth endpoints, calendar feed
+links) carry tokens and are never compressed: a compressed secret next to
+attacker-controlled input leaks through the response size (BREACH).
+
+Static files are left to WhiteNoise, which serves its own precompressed
+files.
+"""
+
+import gzip
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/msgpack', 'text/')
+
+
+def compression_settings():
+    return {
+        'MIN_SIZE': 1024,
+        'GZIP_LEVEL': 6,
+        'BROTLI_QUALITY': 5,
+        'CACHE_ALIAS': 'default',
+        'CACHE_TIMEOUT': 3600,
+        'SHARED_PATHS': (
+            '/api/home/', '/api/async/home/', '/api/site-settings/', '/api/sponsors/',
+            '/api/social-links/', '/api/team-members/', '/api/domains/',
+        ),
+        'EXCLUDED_PATHS': ('/api/auth/', '/api/calendar/'),
+        **getattr(settings, 'RESPONSE_COMPRESSION', {}),
+    }
+
+
+def accepted_encodings(header):
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(content, coding, options):
+    if coding == 'br':
+        return brotli.compress(content, quality=options['BROTLI_QUALITY'])
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(content, compresslevel=options['GZIP_LEVEL'], mtime=0)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = compression_settings()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if not self.applies(request, response):
+            return response
+        return self.compress_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if not self.applies(request, response):
+            return response
+        # The compressed-body cache and the compression itself block
+        return await sync_to_async(self.compress_response)(request, response)
+
+    def applies(self, request, response):
+        if not request.path.startswith('/api/') or request.path.startswith(self.options['EXCLUDED_PATHS']):
+            return False
+        return self.should_compress(response)
+
+    def compress_response(self, request, response):
+        # Whether or not this client gets a compressed body, caches must
+        # keep the variants apart
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if request.path in self.options['SHARED_PATHS'] and not request.META.get('QUERY_STRING'):
+            body = self.compressed_body(response.content, coding)
+        else:
+            body = compress(response.content, coding, self.options)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = coding
+        # The representation changed, so a strong ETag no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def should_compress(self, response):
+        if response.streaming or response.status_code != 200:
+            return False
+        if response.has_header('Content-Encoding'):
+            return False
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return False
+        return len(response.content) >= self.options['MIN_SIZE']
+
+    def compressed_body(self, content, coding):
+        cache = caches[self.options['CACHE_ALIAS']]
+        key = f'compressed:{coding}:{hashlib.sha1(content).hexdigest()}'
+        body = cache.get(key)
+        if body is None:
+            body = compress(content, coding, self.options)
+            cache.set(key, body, self.options['CACHE_TIMEOUT'])
+        return body
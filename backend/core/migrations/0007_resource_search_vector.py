@@ -0,0 +1,61 @@
+# Full-text search over Resource: tsvector column, trigger and GIN index
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Weights: title (A) > tags (B) > description (C) > author (D)
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION core_resource_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', replace(coalesce(NEW.tags, ''), ',', ' ')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW.author, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_resource_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, tags, description, author ON core_resource
+    FOR EACH ROW EXECUTE FUNCTION core_resource_search_vector_update();
+
+-- Backfill existing rows through the trigger
+UPDATE core_resource SET title = title;
+
+CREATE INDEX core_resource_search_vector_gin ON core_resource USING gin (search_vector);
+"""
+
+DROP_TRIGGER_SQL = """
+DROP INDEX IF EXISTS core_resource_search_vector_gin;
+DROP TRIGGER IF EXISTS core_resource_search_vector_trigger ON core_resource;
+DROP FUNCTION IF EXISTS core_resource_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    # SQLite has no tsvector; core/search.py falls back to plain matching there
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_class_meeting_migration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
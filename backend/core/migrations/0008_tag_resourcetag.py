@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-19 11:56
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def populate_tags(apps, schema_editor):
+    """Build Tag/ResourceTag rows from the existing comma-separated strings"""
+    Resource = apps.get_model('core', 'Resource')
+    Tag = apps.get_model('core', 'Tag')
+    ResourceTag = apps.get_model('core', 'ResourceTag')
+
+    tags = {}
+    links = []
+    for resource in Resource.objects.exclude(tags__isnull=True).exclude(tags='').only('id', 'tags'):
+        seen = set()
+        for tag in resource.tags.split(','):
+            name = tag.strip()[:100]
+            key = name.lower()
+            if not name or key in seen:
+                continue
+            seen.add(key)
+            if key not in tags:
+                tags[key] = Tag.objects.create(name=name)
+            links.append(ResourceTag(resource_id=resource.id, tag=tags[key], position=len(seen) - 1))
+    ResourceTag.objects.bulk_create(links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_resource_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='core_tag_name_lower_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_tags', to='core.resource')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_tags', to='core.tag')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['tag', 'resource'], name='core_resourcetag_tag_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'tag'), name='core_resourcetag_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
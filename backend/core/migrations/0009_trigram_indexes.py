@@ -0,0 +1,47 @@
+# Trigram indexes for member / team member search (admin changelist and typeahead)
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Django compiles icontains on Postgres as UPPER("col"::text) LIKE UPPER(...), so
+# the indexes are built on that exact expression. pg_trgm ignores case, so the
+# same indexes also serve the % similarity operator used by core/search.py.
+TRIGRAM_INDEXES = [
+    ('core_trgm_user_username', 'auth_user', 'username'),
+    ('core_trgm_user_email', 'auth_user', 'email'),
+    ('core_trgm_member_personal_mail', 'core_member', 'personal_mail'),
+    ('core_trgm_member_gla_mail', 'core_member', 'gla_mail'),
+    ('core_trgm_member_university_roll', 'core_member', 'university_roll'),
+    ('core_trgm_teammember_name', 'core_teammember', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tag_resourcetag'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
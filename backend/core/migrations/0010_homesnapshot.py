@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-19 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body', models.BinaryField(default=b'', help_text='Rendered JSON')),
+                ('gzip_body', models.BinaryField(default=b'')),
+                ('brotli_body', models.BinaryField(blank=True, help_text="Empty when brotli isn't installed", null=True)),
+                ('etag', models.CharField(blank=True, max_length=64)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Home Snapshot',
+                'verbose_name_plural': 'Home Snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# GiST index over meeting spans for conflict detection (core/scheduling.py)
+
+from django.db import migrations
+
+
+# IMMUTABLE so it can be indexed: adding a fixed hour to a timestamptz doesn't
+# depend on the session time zone. An end before the start gives an empty span.
+CREATE_SPAN_SQL = """
+CREATE OR REPLACE FUNCTION core_meeting_span(start timestamptz, finish timestamptz)
+RETURNS tstzrange
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT tstzrange(start, GREATEST(COALESCE(finish, start + interval '1 hour'), start)) $$;
+
+CREATE INDEX IF NOT EXISTS core_meeting_span_gist ON core_meeting
+USING gist (core_meeting_span(scheduled_date, end_time))
+WHERE is_active AND status <> 'cancelled';
+"""
+
+DROP_SPAN_SQL = """
+DROP INDEX IF EXISTS core_meeting_span_gist;
+DROP FUNCTION IF EXISTS core_meeting_span(timestamptz, timestamptz);
+"""
+
+
+def create_span_index(apps, schema_editor):
+    # Other databases use the in-memory interval tree in core/scheduling.py
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SPAN_SQL)
+
+
+def drop_span_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SPAN_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_homesnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_span_index, drop_span_index),
+    ]
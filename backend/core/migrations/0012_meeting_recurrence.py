@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-19 12:50
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_meeting_span_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='recurrence',
+            field=models.CharField(blank=True, help_text='Repeat rule, e.g. FREQ=WEEKLY;BYDAY=MO,TH;COUNT=12. Leave empty for a one-off meeting.', max_length=200, null=True, validators=[core.models.validate_recurrence]),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, editable=False, help_text="When the last occurrence ends; empty if the meeting doesn't repeat or repeats forever", null=True),
+        ),
+        migrations.CreateModel(
+            name='MeetingOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField(help_text='Start of the occurrence as the repeat rule schedules it')),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('title', models.CharField(blank=True, max_length=300, null=True)),
+                ('scheduled_date', models.DateTimeField(blank=True, help_text='New start of this occurrence', null=True)),
+                ('end_time', models.DateTimeField(blank=True, help_text='New end of this occurrence', null=True)),
+                ('meeting_link', models.URLField(blank=True, null=True)),
+                ('location', models.CharField(blank=True, max_length=300, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('meeting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overrides', to='core.meeting')),
+            ],
+            options={
+                'verbose_name': 'Meeting Occurrence Override',
+                'verbose_name_plural': 'Meeting Occurrence Overrides',
+                'ordering': ['meeting', 'original_start'],
+                'constraints': [models.UniqueConstraint(fields=('meeting', 'original_start'), name='core_meetingoverride_unique_occurrence')],
+            },
+        ),
+    ]
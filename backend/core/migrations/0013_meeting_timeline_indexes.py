@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_meeting_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['scheduled_date', 'id'], name='core_meeting_active_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('is_active', True), ('recurrence__isnull', False)), fields=['recurrence_end'], name='core_meeting_series_end_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_meeting_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.class')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.member')),
+            ],
+            options={
+                'verbose_name': 'Enrollment',
+                'verbose_name_plural': 'Enrollments',
+                'ordering': ['course', 'created_at'],
+                'constraints': [models.UniqueConstraint(fields=('member', 'course'), name='core_enrollment_unique_member')],
+            },
+        ),
+    ]
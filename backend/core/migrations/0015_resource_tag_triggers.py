@@ -0,0 +1,127 @@
+# Keep ResourceTag/Tag in step with Resource.tags in the database, so edits
+# that bypass Resource.save() (the Android backend's admin, QuerySet.update())
+# still reach the tag filters
+
+from django.db import migrations
+
+
+# pg_advisory_xact_lock key serializing tag rebuilds and tag cleanup, so a
+# tag isn't deleted as unused while another transaction links to it
+TAG_LOCK_KEY = 0x7a45_0002
+
+CREATE_TRIGGERS_SQL = f"""
+-- Same parsing as Resource.parse_tags: trimmed, at most 100 characters,
+-- blanks and case-insensitive repeats dropped, in the order written
+CREATE OR REPLACE FUNCTION core_resource_sync_tags(resource bigint, tags text) RETURNS void AS $$
+DECLARE
+    kept bigint[];
+BEGIN
+    PERFORM pg_advisory_xact_lock({TAG_LOCK_KEY});
+    WITH parts AS (
+        SELECT left(btrim(part, E' \\t\\n\\r\\f\\v'), 100) AS name, n
+        FROM unnest(string_to_array(coalesce(tags, ''), ',')) WITH ORDINALITY AS p(part, n)
+    ), firsts AS (
+        SELECT DISTINCT ON (lower(name)) name, n FROM parts WHERE name <> '' ORDER BY lower(name), n
+    ), names AS (
+        SELECT name, row_number() OVER (ORDER BY n) - 1 AS position FROM firsts
+    ), found AS (
+        INSERT INTO core_tag (name, created_at) SELECT name, now() FROM names
+        ON CONFLICT ((lower(name))) DO UPDATE SET name = core_tag.name
+        RETURNING id, lower(name) AS name_lower
+    ), linked AS (
+        INSERT INTO core_resourcetag (resource_id, tag_id, position)
+        SELECT resource, found.id, names.position FROM names JOIN found ON found.name_lower = lower(names.name)
+        ON CONFLICT (resource_id, tag_id) DO UPDATE SET position = EXCLUDED.position
+        RETURNING tag_id
+    )
+    SELECT coalesce(array_agg(tag_id), '{{}}') INTO kept FROM linked;
+    DELETE FROM core_resourcetag WHERE resource_id = resource AND tag_id <> ALL(kept);
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_resource_tags_update() RETURNS trigger AS $$
+BEGIN
+    PERFORM core_resource_sync_tags(NEW.id, NEW.tags);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_resource_tags_insert_trigger
+    AFTER INSERT ON core_resource
+    FOR EACH ROW EXECUTE FUNCTION core_resource_tags_update();
+
+CREATE TRIGGER core_resource_tags_update_trigger
+    AFTER UPDATE OF tags ON core_resource
+    FOR EACH ROW WHEN (OLD.tags IS DISTINCT FROM NEW.tags)
+    EXECUTE FUNCTION core_resource_tags_update();
+
+-- Drop tags nothing links to any more, however the links went (a rebuild,
+-- or the cascade from a deleted resource)
+CREATE OR REPLACE FUNCTION core_tag_delete_unused() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock({TAG_LOCK_KEY});
+    DELETE FROM core_tag WHERE id IN (SELECT tag_id FROM old_links)
+        AND NOT EXISTS (SELECT 1 FROM core_resourcetag WHERE core_resourcetag.tag_id = core_tag.id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_resourcetag_unused_tags_trigger
+    AFTER DELETE ON core_resourcetag
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE FUNCTION core_tag_delete_unused();
+
+-- Catch up with edits made since 0008, and drop the tags they orphaned
+SELECT core_resource_sync_tags(id, tags) FROM core_resource;
+DELETE FROM core_tag WHERE NOT EXISTS (SELECT 1 FROM core_resourcetag WHERE core_resourcetag.tag_id = core_tag.id);
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS core_resourcetag_unused_tags_trigger ON core_resourcetag;
+DROP TRIGGER IF EXISTS core_resource_tags_update_trigger ON core_resource;
+DROP TRIGGER IF EXISTS core_resource_tags_insert_trigger ON core_resource;
+DROP FUNCTION IF EXISTS core_tag_delete_unused();
+DROP FUNCTION IF EXISTS core_resource_tags_update();
+DROP FUNCTION IF EXISTS core_resource_sync_tags(bigint, text);
+"""
+
+
+def resource_fk_sql(schema_editor, on_delete):
+    """Recreate ResourceTag.resource's constraint with the ``on_delete`` action"""
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, 'core_resourcetag')
+    name = next(
+        name for name, constraint in constraints.items()
+        if constraint['foreign_key'] and constraint['columns'] == ['resource_id']
+    )
+    quoted = schema_editor.quote_name(name)
+    return (
+        f'ALTER TABLE core_resourcetag DROP CONSTRAINT {quoted}, '
+        f'ADD CONSTRAINT {quoted} FOREIGN KEY (resource_id) REFERENCES core_resource (id) '
+        f'{on_delete} DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+def create_tag_triggers(apps, schema_editor):
+    # SQLite keeps using Resource.sync_tags()
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGERS_SQL)
+        # Backends that don't know ResourceTag (Android) can delete resources
+        schema_editor.execute(resource_fk_sql(schema_editor, 'ON DELETE CASCADE'))
+
+
+def drop_tag_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(resource_fk_sql(schema_editor, ''))
+        schema_editor.execute(DROP_TRIGGERS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_enrollment'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tag_triggers, drop_tag_triggers),
+    ]
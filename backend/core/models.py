@@ -1,6 +1,11 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import connection, models, transaction
+from django.db.models.functions import Lower
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator, RegexValidator
+from django.contrib.postgres.search import SearchVectorField
 
 
 class SiteSettings(models.Model):
@@ -266,7 +271,17 @@ class Class(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
-    
+
+    def save(self, *args, **kwargs):
+        # enrolled_count only moves by conditional UPDATEs (core/enrollment.py);
+        # writing back the count this copy was loaded with would undo seats taken since
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'enrolled_count'
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def instructor_display(self):
         """Get instructor name for display"""
@@ -400,6 +415,51 @@ class Class(models.Model):
         return mode_map.get(self.mode, 'Online')
 
 
+class Enrollment(models.Model):
+    """A member's seat in a class; Class.enrolled_count counts these (core/enrollment.py)"""
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='enrollments')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['course', 'created_at']
+        verbose_name = "Enrollment"
+        verbose_name_plural = "Enrollments"
+        constraints = [
+            models.UniqueConstraint(fields=['member', 'course'], name='core_enrollment_unique_member'),
+        ]
+
+    def __str__(self):
+        return f"{self.member.user.username} - {self.course.title}"
+
+
+class TagQuerySet(models.QuerySet):
+    def named(self, names):
+        """Case-insensitive match on tag names (uses the lower(name) index)"""
+        return self.annotate(name_lower=Lower('name')).filter(
+            name_lower__in=[name.lower() for name in names]
+        )
+
+
+class Tag(models.Model):
+    """Normalized resource tag, kept in sync with Resource.tags"""
+    name = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Tag"
+        verbose_name_plural = "Tags"
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='core_tag_name_lower_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class Resource(models.Model):
     """Learning resources and materials"""
     CATEGORY_CHOICES = [
@@ -426,6 +486,8 @@ class Resource(models.Model):
     view_count = models.IntegerField(default=0)
     download_count = models.IntegerField(default=0)
     order = models.IntegerField(default=0)
+    # Maintained by a Postgres trigger (migration 0007); stays NULL on SQLite
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -437,14 +499,78 @@ class Resource(models.Model):
     def __str__(self):
         return f"{self.title} - {self.get_category_display()}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        # Postgres rebuilds the links in a trigger (migration 0015), which also
+        # sees edits that bypass save()
+        if connection.vendor != 'postgresql' and (update_fields is None or 'tags' in update_fields):
+            self.sync_tags()
+    
+    @staticmethod
+    def parse_tags(tags):
+        """Split a comma-separated tag string, dropping blanks and case-insensitive repeats"""
+        names = []
+        seen = set()
+        for tag in (tags or '').split(','):
+            name = tag.strip()[:100]
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                names.append(name)
+        return names
+    
+    def sync_tags(self):
+        """Rebuild the ResourceTag rows from the comma-separated tags field (what the trigger does on Postgres)"""
+        names = self.parse_tags(self.tags)
+        with transaction.atomic():
+            Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+            tags = {tag.name.lower(): tag for tag in Tag.objects.named(names)}
+            old_tag_ids = list(ResourceTag.objects.filter(resource=self).values_list('tag_id', flat=True))
+            ResourceTag.objects.filter(resource=self).delete()
+            ResourceTag.objects.bulk_create([
+                ResourceTag(resource=self, tag=tags[name.lower()], position=position)
+                for position, name in enumerate(names)
+            ])
+            Tag.objects.filter(pk__in=old_tag_ids, resource_tags__isnull=True).delete()
+    
     @property
     def tag_list(self):
         """Return tags as a list"""
+        # Use the normalized rows when the view prefetched them
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'resource_tags' in prefetched:
+            return [resource_tag.tag.name for resource_tag in prefetched['resource_tags']]
         if self.tags:
             return [tag.strip() for tag in self.tags.split(',')]
         return []
 
 
+class ResourceTag(models.Model):
+    """Link between a Resource and a Tag, in the order the tags were written"""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='resource_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='resource_tags')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'tag'], name='core_resourcetag_uniq'),
+        ]
+        indexes = [
+            # Tag filters and facet counts walk tag -> resources
+            models.Index(fields=['tag', 'resource'], name='core_resourcetag_tag_idx'),
+        ]
+
+
+def validate_recurrence(value):
+    from .recurrence import parse_rrule
+
+    try:
+        parse_rrule(value)
+    except ValueError as exc:
+        raise ValidationError(str(exc))
+
+
 class Meeting(models.Model):
     """Meetings scheduled by team members for specific domains or all members"""
     
@@ -506,19 +632,60 @@ class Meeting(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='upcoming')
     is_active = models.BooleanField(default=True)
     
+    # Repetition (core/recurrence.py): this meeting is the first occurrence
+    recurrence = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        validators=[validate_recurrence],
+        help_text="Repeat rule, e.g. FREQ=WEEKLY;BYDAY=MO,TH;COUNT=12. Leave empty for a one-off meeting.",
+    )
+    recurrence_end = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="When the last occurrence ends; empty if the meeting doesn't repeat or repeats forever",
+    )
+    
     # Tracking
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # A meeting without an end time counts as lasting this long
+    DEFAULT_DURATION = timedelta(hours=1)
+    
     class Meta:
         ordering = ['-scheduled_date']
         verbose_name = "Meeting"
         verbose_name_plural = "Meetings"
+        indexes = [
+            # Keyset pages of /api/meetings/?from=&to=&status= (core/timeline.py)
+            models.Index(
+                fields=['scheduled_date', 'id'],
+                condition=models.Q(is_active=True),
+                name='core_meeting_active_start_idx',
+            ),
+            # The repeating meetings that can reach a window
+            models.Index(
+                fields=['recurrence_end'],
+                condition=models.Q(is_active=True, recurrence__isnull=False),
+                name='core_meeting_series_end_idx',
+            ),
+        ]
     
     def __str__(self):
         speaker_name = self.speaker.name if self.speaker else (self.speaker_other or "Unknown")
         return f"{self.title} - {speaker_name} ({self.scheduled_date.strftime('%Y-%m-%d %H:%M')})"
     
+    def save(self, *args, **kwargs):
+        from .recurrence import series_end
+        
+        self.recurrence_end = series_end(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'recurrence', 'scheduled_date', 'end_time'}.isdisjoint(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'recurrence_end'}
+        super().save(*args, **kwargs)
+    
     @property
     def speaker_display(self):
         """Get speaker name for display"""
@@ -567,8 +734,68 @@ class Meeting(models.Model):
                 return 'ongoing'
         else:
             # If no end_time, consider it ongoing if within 1 hour of start
-            from datetime import timedelta
-            if now <= start + timedelta(hours=1):
+            if now <= start + self.DEFAULT_DURATION:
                 return 'ongoing'
         
         return 'completed'
+
+
+class MeetingOverride(models.Model):
+    """A change to, or the cancellation of, one occurrence of a recurring meeting"""
+    meeting = models.ForeignKey(Meeting, on_delete=models.CASCADE, related_name='overrides')
+    original_start = models.DateTimeField(help_text="Start of the occurrence as the repeat rule schedules it")
+    is_cancelled = models.BooleanField(default=False)
+
+    # Left empty, the series' value applies
+    title = models.CharField(max_length=300, blank=True, null=True)
+    scheduled_date = models.DateTimeField(blank=True, null=True, help_text="New start of this occurrence")
+    end_time = models.DateTimeField(blank=True, null=True, help_text="New end of this occurrence")
+    meeting_link = models.URLField(blank=True, null=True)
+    location = models.CharField(max_length=300, blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['meeting', 'original_start']
+        verbose_name = "Meeting Occurrence Override"
+        verbose_name_plural = "Meeting Occurrence Overrides"
+        constraints = [
+            models.UniqueConstraint(fields=['meeting', 'original_start'], name='core_meetingoverride_unique_occurrence'),
+        ]
+
+    def clean(self):
+        from .recurrence import is_occurrence, parse_rrule
+
+        if self.meeting_id is None or self.original_start is None:
+            return
+        if not self.meeting.recurrence:
+            raise ValidationError("Only recurring meetings have occurrences to change")
+        if not is_occurrence(parse_rrule(self.meeting.recurrence), self.meeting.scheduled_date, self.original_start):
+            raise ValidationError({'original_start': "Not an occurrence of this meeting"})
+
+    def __str__(self):
+        change = "cancelled" if self.is_cancelled else "changed"
+        return f"{self.meeting.title} on {self.original_start.strftime('%Y-%m-%d %H:%M')} ({change})"
+
+
+class HomeSnapshot(models.Model):
+    """
+    Pre-rendered /api/home/ payload, kept in a single row (pk=1).
+
+    Rewritten by core.snapshots.refresh_home_snapshot once a change to the
+    home page models commits, so both backends serve the home page with
+    one primary-key read.
+    """
+    body = models.BinaryField(default=b'', help_text="Rendered JSON")
+    gzip_body = models.BinaryField(default=b'')
+    brotli_body = models.BinaryField(null=True, blank=True, help_text="Empty when brotli isn't installed")
+    etag = models.CharField(max_length=64, blank=True)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Home Snapshot"
+        verbose_name_plural = "Home Snapshots"
+
+    def __str__(self):
+        return f"Home Snapshot ({self.generated_at})"
@@ -0,0 +1,274 @@
+"""
+Recurring meetings: an RRULE subset and lazy occurrence expansion.
+
+A Meeting with ``recurrence`` set is a series. Its own scheduled_date and
+end_time are the first occurrence, and the rule repeats it (RFC 5545 RRULE
+subset):
+
+    FREQ=DAILY|WEEKLY|MONTHLY   required
+    INTERVAL=n                  every n days/weeks/months (default 1)
+    COUNT=n or UNTIL=<date>     at most one; without either the series runs on
+    BYDAY=MO,WE,...             WEEKLY only; defaults to the first day's weekday
+
+Occurrences keep the series' local wall-clock time (settings.TIME_ZONE) and
+duration. A monthly series skips months without its day of the month, as
+RFC 5545 does.
+
+Occurrences are never stored. ``series_occurrences`` generates them from
+any point on, jumping straight there instead of walking the series from its
+start (core/timeline.py merges them into meeting listings). Changes to one occurrence are stored sparsely as
+MeetingOverride rows, keyed by the occurrence's original start: a
+cancellation, another time, title, location or link. Each occurrence is an
+unsaved copy of its series Meeting, so MeetingSerializer renders it like
+any meeting; ``occurrence_start`` identifies it.
+"""
+
+import copy
+import heapq
+import itertools
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Meeting
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Bounds the work of finding a series' last occurrence
+MAX_COUNT = 1000
+
+RecurrenceRule = namedtuple('RecurrenceRule', 'freq interval count until byday')
+
+# Meetings that are series
+IS_SERIES = Q(recurrence__isnull=False) & ~Q(recurrence='')
+
+
+def parse_until(value):
+    """UNTIL as an aware datetime: 20250131T235959Z, or a date meaning its whole (local) day"""
+    if len(value) == 8 and value.isdigit():
+        day = parse_date(f'{value[:4]}-{value[4:6]}-{value[6:]}')
+        if day:
+            return timezone.make_aware(datetime.combine(day, time.max))
+    elif len(value) == 16 and value[8] == 'T' and value.endswith('Z'):
+        moment = parse_datetime(f'{value[:4]}-{value[4:6]}-{value[6:8]}T{value[9:11]}:{value[11:13]}:{value[13:15]}Z')
+        if moment:
+            return moment
+    raise ValueError(f'UNTIL must look like 20250131 or 20250131T235959Z, not "{value}"')
+
+
+def parse_rrule(text):
+    """A RecurrenceRule from RRULE text (an optional "RRULE:" prefix is allowed); raises ValueError"""
+    text = text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.split(';')):
+        name, sep, value = part.partition('=')
+        name = name.strip().upper()
+        if not sep or not value.strip():
+            raise ValueError(f'"{part}" is not NAME=value')
+        if name in parts:
+            raise ValueError(f'{name} is given twice')
+        parts[name] = value.strip().upper()
+
+    unsupported = set(parts) - {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY'}
+    if unsupported:
+        raise ValueError(f'Unsupported RRULE parts: {", ".join(sorted(unsupported))}')
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise ValueError(f'FREQ must be one of {", ".join(FREQUENCIES)}')
+
+    def positive(name, default=None, maximum=None):
+        value = parts.get(name)
+        if value is None:
+            return default
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f'{name} must be a positive integer')
+        if maximum is not None and int(value) > maximum:
+            raise ValueError(f'{name} can be at most {maximum}')
+        return int(value)
+
+    interval = positive('INTERVAL', default=1, maximum=366)
+    count = positive('COUNT', maximum=MAX_COUNT)
+    until = parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+    if count is not None and until is not None:
+        raise ValueError('COUNT and UNTIL are mutually exclusive')
+
+    byday = ()
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise ValueError('BYDAY is only supported with FREQ=WEEKLY')
+        days = parts['BYDAY'].split(',')
+        if not all(day in WEEKDAYS for day in days):
+            raise ValueError(f'BYDAY takes weekdays from {",".join(WEEKDAYS)}')
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+    return RecurrenceRule(freq, interval, count, until, byday)
+
+
+def format_rrule(rule):
+    """The normalized RRULE text of ``rule``"""
+    parts = [f'FREQ={rule.freq}']
+    if rule.interval != 1:
+        parts.append(f'INTERVAL={rule.interval}')
+    if rule.byday:
+        parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in rule.byday))
+    if rule.count is not None:
+        parts.append(f'COUNT={rule.count}')
+    if rule.until is not None:
+        parts.append('UNTIL=' + rule.until.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ'))
+    return ';'.join(parts)
+
+
+def _days(rule, first, skip_to=None):
+    """``(index, date)`` of the series' local dates from about ``skip_to`` on, in order"""
+    if rule.freq == 'MONTHLY':
+        index = 0
+        for period in itertools.count():
+            month = first.month - 1 + period * rule.interval
+            try:
+                day = first.replace(year=first.year + month // 12, month=month % 12 + 1)
+            except ValueError:
+                # No such day this month (the 31st, February 29th); not counted
+                continue
+            yield index, day
+            index += 1
+    elif rule.freq == 'DAILY':
+        step = rule.interval
+        start = max(0, (skip_to - first).days // step - 1) if skip_to else 0
+        for period in itertools.count(start):
+            yield period, first + timedelta(days=period * step)
+    else:
+        yield from _weekly_days(rule, first, skip_to)
+
+
+def _weekly_days(rule, first, skip_to):
+    # The first week only has the days from the first date on
+    weekdays = rule.byday or (first.weekday(),)
+    first_week = [day for day in weekdays if day >= first.weekday()]
+    week_start = first - timedelta(days=first.weekday())
+    step = 7 * rule.interval
+    start = max(0, (skip_to - week_start).days // step - 1) if skip_to else 0
+    for period in itertools.count(start):
+        days = first_week if period == 0 else weekdays
+        index = 0 if period == 0 else len(first_week) + (period - 1) * len(weekdays)
+        for offset, day in enumerate(days):
+            yield index + offset, week_start + timedelta(days=period * step + day)
+
+
+def occurrence_starts(rule, dtstart, after=None):
+    """The series' occurrence starts, lazily and in order; only those at or after ``after`` if given"""
+    zone = timezone.get_default_timezone()
+    local = timezone.localtime(dtstart, zone)
+    clock = local.time()
+    skip_to = timezone.localtime(after, zone).date() if after is not None else None
+    for index, day in _days(rule, local.date(), skip_to):
+        if rule.count is not None and index >= rule.count:
+            return
+        start = timezone.make_aware(datetime.combine(day, clock), zone)
+        if rule.until is not None and start > rule.until:
+            return
+        if after is None or start >= after:
+            yield start
+
+
+def is_occurrence(rule, dtstart, moment):
+    return next(occurrence_starts(rule, dtstart, after=moment), None) == moment
+
+
+def parse_moment(value, name):
+    """An aware datetime from an ISO datetime or date (its local midnight) query parameter; raises ValueError"""
+    value = (value or '').strip()
+    # An unencoded "+05:30" arrives as " 05:30"
+    moment = parse_datetime(value.replace(' ', '+')) if 'T' in value else None
+    if moment is None:
+        day = parse_date(value) if value else None
+        if day is None:
+            raise ValueError(f'"{name}" must be an ISO date or datetime')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def series_end(meeting):
+    """When the series' last occurrence ends; None if it doesn't end (or isn't a series)"""
+    if not meeting.recurrence:
+        return None
+    rule = parse_rrule(meeting.recurrence)
+    duration = meeting_duration(meeting)
+    if rule.until is not None:
+        # A bound is enough: this only narrows which series a window loads
+        return rule.until + duration
+    if rule.count is not None:
+        *_, last = occurrence_starts(rule, meeting.scheduled_date)
+        return last + duration
+    return None
+
+
+def meeting_duration(meeting):
+    if meeting.end_time:
+        return max(meeting.end_time - meeting.scheduled_date, timedelta(0))
+    return Meeting.DEFAULT_DURATION
+
+
+def occurrence(series, original, override=None):
+    """An unsaved copy of ``series`` for its occurrence at ``original``, with ``override`` applied"""
+    instance = copy.copy(series)
+    instance.occurrence_start = original
+    instance.scheduled_date = original
+    if series.end_time:
+        instance.end_time = original + (series.end_time - series.scheduled_date)
+    if override is not None:
+        if override.scheduled_date:
+            instance.scheduled_date = override.scheduled_date
+            if series.end_time and not override.end_time:
+                instance.end_time = override.scheduled_date + (series.end_time - series.scheduled_date)
+        if override.end_time:
+            instance.end_time = override.end_time
+        for field in ('title', 'location', 'meeting_link'):
+            if getattr(override, field):
+                setattr(instance, field, getattr(override, field))
+        if override.is_cancelled:
+            instance.status = 'cancelled'
+    return instance
+
+
+def series_overrides(series):
+    # An unsaved series (one being validated) has none yet
+    return series.overrides.all() if series.pk is not None else []
+
+
+def overridden_occurrences(series):
+    """The occurrences of ``series`` that have overrides, in start order"""
+    rule = parse_rrule(series.recurrence)
+    return sorted(
+        (occurrence(series, override.original_start, override) for override in series_overrides(series)
+         # Not overrides left behind by a change to the rule
+         if is_occurrence(rule, series.scheduled_date, override.original_start)),
+        key=lambda instance: instance.scheduled_date,
+    )
+
+
+def series_occurrences(series, after=None):
+    """
+    The occurrences of ``series`` starting at or after ``after``, lazily and
+    in start order, overrides applied (moved ones where they were moved to)
+    """
+    rule = parse_rrule(series.recurrence)
+    overrides = {override.original_start: override for override in series_overrides(series)}
+
+    def scheduled():
+        for original in occurrence_starts(rule, series.scheduled_date, after=after):
+            override = overrides.get(original)
+            if override is None or not override.scheduled_date:
+                yield occurrence(series, original, override)
+
+    moved = [
+        instance for instance in overridden_occurrences(series)
+        if overrides[instance.occurrence_start].scheduled_date and (after is None or instance.scheduled_date >= after)
+    ]
+    return heapq.merge(scheduled(), moved, key=lambda instance: instance.scheduled_date)
@@ -0,0 +1,347 @@
+"""
+Conflict detection for meeting scheduling.
+
+Two active, non-cancelled meetings conflict when their spans overlap and
+they share the speaker, the scheduler or a domain. A meeting for all domains
+shares every domain. A span runs from scheduled_date to end_time, or for an
+hour without an end time, as in Meeting.computed_status.
+
+A recurring meeting (core/recurrence.py) is checked occurrence by
+occurrence, overrides applied, up to CONFLICT_HORIZON ahead: a new or
+edited series against every meeting and occurrence in that year, and a
+single meeting or moved occurrence against the occurrences it overlaps.
+
+On Postgres the overlapping single meetings come from a GiST index on
+``core_meeting_span(scheduled_date, end_time)``, a tstzrange (migration
+0011). Other databases (SQLite locally) use an interval tree over the active
+meetings, kept per process and rebuilt after the meeting changes published
+on the invalidation bus. Either way a check costs O(log n + k) in the
+meeting history. Series have no rows to index: the ones that can reach the
+checked window come from their partial recurrence_end index, and their
+occurrences there are generated.
+
+``check_schedule`` takes a transaction-level lock first, so two leads
+booking the same slot at once are checked one after the other.
+"""
+
+import itertools
+import threading
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Exists, Func, OuterRef, Q
+from django.utils import timezone
+from rest_framework import exceptions, serializers, status
+
+from .invalidation import invalidation_bus
+from .meeting_events import TOPIC
+from .models import Meeting, MeetingOverride
+from .recurrence import IS_SERIES, meeting_duration, overridden_occurrences, series_occurrences
+
+# pg_advisory_xact_lock key serializing meeting checks and saves
+SCHEDULE_LOCK_KEY = 0x7a45_0001
+
+# How far ahead a recurring meeting's occurrences are checked
+CONFLICT_HORIZON = timedelta(days=365)
+
+# occurrence: the original start of a series' occurrence, None for a single meeting
+MeetingSpan = namedtuple(
+    'MeetingSpan', 'pk title start end speaker_id scheduled_by_id domains occurrence', defaults=(None,)
+)
+
+
+class MeetingConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The meeting overlaps other meetings.'
+    default_code = 'meeting_conflict'
+
+    def __init__(self, conflicts):
+        super().__init__()
+        self.detail = {'detail': self.detail, 'code': self.default_code, 'conflicts': conflicts}
+
+
+class MeetingSpanFunc(Func):
+    """``core_meeting_span(scheduled_date, end_time)``, the expression the GiST index is built on"""
+    function = 'core_meeting_span'
+
+    def __init__(self, *expressions, **extra):
+        from django.contrib.postgres.fields import DateTimeRangeField
+
+        super().__init__(*expressions, output_field=DateTimeRangeField(), **extra)
+
+
+def span_end(start, end):
+    # core_meeting_span() clamps an end before the start the same way
+    return max(end or start + Meeting.DEFAULT_DURATION, start)
+
+
+class IntervalTree:
+    """
+    Static interval tree: the intervals sorted by start form an implicit
+    balanced tree, each node holding the largest end in its subtree, so a
+    query skips every subtree that ends too early or starts too late.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.max_end = [None] * len(self.intervals)
+        self._build(0, len(self.intervals))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        end = self.intervals[mid][1]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > end:
+                end = child
+        self.max_end[mid] = end
+        return end
+
+    def overlapping(self, start, end):
+        """Items of the ``(start, end, item)`` intervals overlapping [start, end)"""
+        found = []
+        self._query(0, len(self.intervals), start, end, found)
+        return found
+
+    def _query(self, lo, hi, start, end, found):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self.max_end[mid] <= start:
+            return
+        self._query(lo, mid, start, end, found)
+        interval_start, interval_end, item = self.intervals[mid]
+        if interval_start >= end:
+            return
+        if interval_end > start:
+            found.append(item)
+        self._query(mid + 1, hi, start, end, found)
+
+
+def active_meetings():
+    return Meeting.objects.filter(is_active=True).exclude(status='cancelled')
+
+
+def single_meetings():
+    return active_meetings().exclude(IS_SERIES)
+
+
+def meeting_spans(meetings):
+    columns = ('pk', 'title', 'scheduled_date', 'end_time', 'speaker_id', 'scheduled_by_id')
+    rows = list(meetings.order_by().values_list(*columns))
+    domains = defaultdict(set)
+    memberships = Meeting.domains.through.objects.filter(meeting__in=meetings.values('pk'))
+    for meeting_id, domain_id in memberships.values_list('meeting_id', 'domain_id'):
+        domains[meeting_id].add(domain_id)
+    return [
+        MeetingSpan(pk, title, start, span_end(start, end), speaker_id, scheduled_by_id, frozenset(domains[pk]))
+        for pk, title, start, end, speaker_id, scheduled_by_id in rows
+    ]
+
+
+class MeetingIndex:
+    """Interval tree of the active single meetings, rebuilt on first use after a change"""
+
+    def __init__(self):
+        self._tree = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, keys=None):
+        self._tree = None
+
+    def overlapping(self, start, end):
+        with self._lock:
+            if self._tree is None:
+                self._tree = IntervalTree((span.start, span.end, span) for span in meeting_spans(single_meetings()))
+            tree = self._tree
+        return tree.overlapping(start, end)
+
+
+meeting_index = MeetingIndex()
+invalidation_bus.subscribe(TOPIC, meeting_index.invalidate)
+
+
+def overlapping_meetings(start, end):
+    """Spans of the active single meetings overlapping [start, end)"""
+    if connection.vendor == 'postgresql':
+        from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+
+        meetings = single_meetings().annotate(span=MeetingSpanFunc('scheduled_date', 'end_time'))
+        return meeting_spans(meetings.filter(span__overlap=DateTimeTZRange(start, end)))
+    return meeting_index.overlapping(start, end)
+
+
+def occurrence_spans(series, start, end):
+    """Spans of the non-cancelled occurrences of ``series`` overlapping [start, end), domains left empty"""
+    found = {}
+    scheduled = series_occurrences(series, start - meeting_duration(series))
+    # Overridden ones may have been moved from anywhere, or made longer
+    for instance in itertools.chain(
+        itertools.takewhile(lambda instance: instance.scheduled_date < end, scheduled),
+        overridden_occurrences(series),
+    ):
+        span = MeetingSpan(
+            series.pk, instance.title, instance.scheduled_date, span_end(instance.scheduled_date, instance.end_time),
+            series.speaker_id, series.scheduled_by_id, frozenset(), instance.occurrence_start,
+        )
+        if instance.status != 'cancelled' and span.start < end and span.end > start:
+            found[span.occurrence] = span
+    return sorted(found.values(), key=lambda span: span.start)
+
+
+def overlapping_occurrences(start, end):
+    """Spans of the active series' occurrences overlapping [start, end)"""
+    # An occurrence moved without an end of its own keeps its series' length; a day covers that
+    moved_on = MeetingOverride.objects.filter(meeting=OuterRef('pk')).filter(
+        Q(end_time__gt=start) | Q(scheduled_date__gt=start - timedelta(days=1))
+    )
+    series = active_meetings().filter(IS_SERIES, scheduled_date__lt=end).filter(
+        Q(recurrence_end__isnull=True) | Q(recurrence_end__gt=start) | Exists(moved_on)
+    ).prefetch_related('overrides', 'domains')
+    return [
+        span._replace(domains=frozenset(domain.pk for domain in instance.domains.all()))
+        for instance in series
+        for span in occurrence_spans(instance, start, end)
+    ]
+
+
+def find_conflicts(spans, speaker_id, scheduled_by_id, domains, exclude=None, exclude_occurrence=None):
+    """
+    The meetings and occurrences a meeting with these values would conflict
+    with, as dicts giving the reasons ('speaker', 'scheduled_by', 'domains')
+    and the shared domains (empty when one of the two is for all domains).
+
+    ``spans`` are the meeting's ``(start, end, occurrence)``: one for a
+    single meeting, one per occurrence for a series. Conflicts with a
+    series' occurrence carry its ``occurrence_start``, and conflicts of a
+    series' occurrence the ``for_occurrence`` it's about. ``exclude`` is the
+    meeting's own id: all of it is left out, or only its occurrence at
+    ``exclude_occurrence`` if given.
+    """
+    if not spans:
+        return []
+    lower = min(start for start, _, _ in spans)
+    upper = max(end for _, end, _ in spans)
+    others = IntervalTree(
+        (span.start, span.end, span)
+        for span in itertools.chain(overlapping_meetings(lower, upper), overlapping_occurrences(lower, upper))
+        if span.pk != exclude or (exclude_occurrence is not None and span.occurrence != exclude_occurrence)
+    )
+    as_datetime = serializers.DateTimeField().to_representation
+    conflicts = []
+    for start, end, occurrence in spans:
+        for other in sorted(others.overlapping(start, end), key=lambda span: (span.start, span.pk)):
+            conflict = conflict_with(other, speaker_id, scheduled_by_id, domains, as_datetime)
+            if conflict is not None:
+                if occurrence is not None:
+                    conflict['for_occurrence'] = as_datetime(occurrence)
+                conflicts.append(conflict)
+    return conflicts
+
+
+def conflict_with(other, speaker_id, scheduled_by_id, domains, as_datetime):
+    """The conflict dict for ``other``, or None if nothing is shared"""
+    reasons = []
+    if speaker_id is not None and other.speaker_id == speaker_id:
+        reasons.append('speaker')
+    if scheduled_by_id is not None and other.scheduled_by_id == scheduled_by_id:
+        reasons.append('scheduled_by')
+    shared = domains & other.domains
+    if not domains or not other.domains or shared:
+        reasons.append('domains')
+    if not reasons:
+        return None
+    conflict = {
+        'id': other.pk,
+        'title': other.title,
+        'scheduled_date': as_datetime(other.start),
+        'end_time': as_datetime(other.end),
+        'reasons': reasons,
+        'domains': sorted(shared),
+    }
+    if other.occurrence is not None:
+        conflict['occurrence_start'] = as_datetime(other.occurrence)
+    return conflict
+
+
+def schedule_lock():
+    """Hold the scheduling lock until the transaction ends (SQLite serializes writers anyway)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SCHEDULE_LOCK_KEY])
+
+
+def check_schedule(data, instance=None):
+    """
+    Raise MeetingConflict if saving validated MeetingSerializer ``data``
+    (over ``instance`` for an update) would conflict. Call it in the
+    transaction that saves the meeting.
+    """
+    def value(name, default=None):
+        return data[name] if name in data else getattr(instance, name, default)
+
+    if not value('is_active', True) or value('status', 'upcoming') == 'cancelled':
+        return
+    schedule_lock()
+
+    def related_id(name):
+        if name in data:
+            return data[name].pk if data[name] is not None else None
+        return getattr(instance, f'{name}_id', None)
+
+    if 'domains' in data:
+        domains = frozenset(domain.pk for domain in data['domains'])
+    elif instance is not None:
+        domains = frozenset(instance.domains.values_list('pk', flat=True))
+    else:
+        domains = frozenset()
+
+    start, end = value('scheduled_date'), value('end_time')
+    if value('recurrence'):
+        series = Meeting(pk=instance.pk if instance is not None else None, scheduled_date=start, end_time=end,
+                         recurrence=value('recurrence'), status='upcoming')
+        # Occurrences already over can't conflict any more
+        lower = max(start, timezone.now())
+        spans = [
+            (span.start, span.end, span.occurrence)
+            for span in occurrence_spans(series, lower, lower + CONFLICT_HORIZON)
+        ]
+    else:
+        spans = [(start, span_end(start, end), None)]
+
+    conflicts = find_conflicts(
+        spans,
+        related_id('speaker'),
+        related_id('scheduled_by'),
+        domains,
+        exclude=instance.pk if instance is not None else None,
+    )
+    if conflicts:
+        raise MeetingConflict(conflicts)
+
+
+def check_occurrence(series, instance):
+    """
+    Raise MeetingConflict if ``instance``, an occurrence of ``series`` with
+    a new override applied, would conflict. Call it in the transaction that
+    saves the override.
+    """
+    if not series.is_active or series.status == 'cancelled' or instance.status == 'cancelled':
+        return
+    schedule_lock()
+    start = instance.scheduled_date
+    conflicts = find_conflicts(
+        [(start, span_end(start, instance.end_time), instance.occurrence_start)],
+        series.speaker_id,
+        series.scheduled_by_id,
+        frozenset(series.domains.values_list('pk', flat=True)),
+        exclude=series.pk,
+        exclude_occurrence=instance.occurrence_start,
+    )
+    if conflicts:
+        raise MeetingConflict(conflicts)
@@ -0,0 +1,228 @@
+"""
+Search over Resources, Members and TeamMembers.
+
+Resources: on Postgres the query runs against ``Resource.search_vector``
+(kept up to date by the trigger from migration 0007 and covered by a GIN
+index), ranked with title > tags > description > author and with ``<mark>``
+highlighted snippets from ``ts_headline``. Snippets are HTML-escaped before
+the marks go in, on either backend. On SQLite, used for local tests,
+it falls back to case-insensitive substring matching with the same field
+priorities. The admin changelist matches the last typed word as a prefix
+(``prefix_search_query``), so a partial word still finds the resource.
+
+People: the staff typeahead matches members and team members by substring
+or trigram similarity using the pg_trgm indexes from migration 0009, within
+a fixed time budget. SQLite falls back to substring matching.
+"""
+
+import re
+import time
+from difflib import SequenceMatcher
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection, transaction, OperationalError
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Cast, Replace, Upper
+from django.utils.html import escape
+
+from .models import Resource, Member, TeamMember
+
+SEARCH_CONFIG = 'english'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+SNIPPET_RADIUS = 80
+
+# Fallback scores mirror the tsvector weights (A=1.0, B=0.4, C=0.2, D=0.1)
+FALLBACK_WEIGHTS = (
+    ('title', 1.0),
+    ('tags', 0.4),
+    ('description', 0.2),
+    ('author', 0.1),
+)
+
+
+def search_resources(query, queryset=None):
+    """
+    Return resources matching ``query``, best match first.
+
+    Each result carries ``rank`` and ``headline`` attributes. Postgres returns
+    a lazy queryset; the SQLite fallback returns a list.
+    """
+    if queryset is None:
+        queryset = Resource.objects.filter(is_active=True)
+    if connection.vendor == 'postgresql':
+        return _search_postgres(query, queryset)
+    return _search_fallback(query, queryset)
+
+
+def prefix_tsquery(term):
+    """
+    Raw tsquery text needing every word of ``term``, the last one as a
+    prefix, so "data pyth" finds "Python for data". Empty without words.
+    """
+    words = re.findall(r'\w+', term)
+    return ' & '.join(words[:-1] + [f'{words[-1]}:*']) if words else ''
+
+
+def prefix_search_query(term):
+    """SearchQuery for ``prefix_tsquery(term)``, None when there is no word to match"""
+    raw = prefix_tsquery(term)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG) if raw else None
+
+
+def html_escaped(expression):
+    """``expression`` escaped like django.utils.html.escape, in SQL"""
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;')):
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+def _search_postgres(query, queryset):
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+        # Escaped first, so the only markup in a headline is the marks
+        headline=SearchHeadline(
+            html_escaped(F('description')),
+            search_query,
+            config=SEARCH_CONFIG,
+            start_sel=HIGHLIGHT_START,
+            stop_sel=HIGHLIGHT_STOP,
+            max_words=35,
+            min_words=15,
+        ),
+    ).order_by('-rank', 'order', '-created_at')
+
+
+def _search_fallback(query, queryset):
+    terms = [term for term in query.split() if term]
+    if not terms:
+        return []
+
+    condition = Q()
+    for term in terms:
+        term_condition = Q()
+        for field, _ in FALLBACK_WEIGHTS:
+            term_condition |= Q(**{f'{field}__icontains': term})
+        condition &= term_condition
+
+    results = []
+    for resource in queryset.filter(condition):
+        rank = 0.0
+        for field, weight in FALLBACK_WEIGHTS:
+            value = (getattr(resource, field) or '').lower()
+            rank += weight * sum(1 for term in terms if term.lower() in value)
+        resource.rank = rank
+        resource.headline = _highlight(resource.description or '', terms)
+        results.append(resource)
+
+    results.sort(key=lambda resource: -resource.rank)
+    return results
+
+
+def _highlight(text, terms):
+    """Cut a snippet around the first match and wrap matches in <mark>."""
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(match.start() - SNIPPET_RADIUS, 0) if match else 0
+    snippet = escape(text[start:start + SNIPPET_RADIUS * 2])
+    escaped_pattern = re.compile('|'.join(re.escape(escape(term)) for term in terms), re.IGNORECASE)
+    return escaped_pattern.sub(lambda m: f'{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}', snippet)
+
+
+PEOPLE_SEARCH_BUDGET_MS = 150
+PEOPLE_SIMILARITY_THRESHOLD = 0.3
+
+# (kind, queryset factory, field) - one indexed query per field
+PEOPLE_FIELDS = (
+    ('member', lambda: Member.objects.filter(is_active=True).select_related('user'), 'user__username'),
+    ('member', lambda: Member.objects.filter(is_active=True).select_related('user'), 'user__email'),
+    ('member', lambda: Member.objects.filter(is_active=True).select_related('user'), 'personal_mail'),
+    ('member', lambda: Member.objects.filter(is_active=True).select_related('user'), 'gla_mail'),
+    ('member', lambda: Member.objects.filter(is_active=True).select_related('user'), 'university_roll'),
+    ('team_member', lambda: TeamMember.objects.filter(is_active=True), 'name'),
+)
+
+
+def search_people(query, limit=10):
+    """
+    Top ``limit`` members and team members for a typeahead query.
+
+    Returns ``(results, partial)``; ``partial`` is True when the time budget
+    ran out before every field was searched.
+    """
+    matches = {}
+    partial = False
+    deadline = time.perf_counter() + PEOPLE_SEARCH_BUDGET_MS / 1000
+
+    for kind, make_queryset, field in PEOPLE_FIELDS:
+        remaining_ms = int((deadline - time.perf_counter()) * 1000)
+        if remaining_ms <= 0:
+            partial = True
+            break
+        try:
+            if connection.vendor == 'postgresql':
+                rows = _people_postgres(make_queryset(), field, query, limit, remaining_ms)
+            else:
+                rows = _people_fallback(make_queryset(), field, query, limit)
+        except OperationalError:
+            # statement_timeout cancelled the query
+            partial = True
+            break
+        for obj, score in rows:
+            key = (kind, obj.pk)
+            if key not in matches or matches[key]['score'] < score:
+                matches[key] = _person_result(kind, obj, field, score)
+
+    results = sorted(matches.values(), key=lambda result: -result['score'])[:limit]
+    return results, partial
+
+
+def _people_postgres(queryset, field, query, limit, budget_ms):
+    # Same expression the trigram indexes are built on
+    expression = Upper(Cast(field, output_field=TextField()))
+    needle = query.upper()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # set_config(..., true) is SET LOCAL taking bound parameters, which
+        # SET itself can't once the driver binds them server-side (psycopg 3)
+        cursor.execute(
+            "SELECT set_config('statement_timeout', %s, true), set_config('pg_trgm.similarity_threshold', %s, true)",
+            [str(budget_ms), str(PEOPLE_SIMILARITY_THRESHOLD)],
+        )
+        rows = list(
+            queryset.annotate(match=expression)
+            .filter(Q(match__contains=needle) | Q(match__trigram_similar=needle))
+            .annotate(score=TrigramSimilarity(expression, needle))
+            .order_by('-score')[:limit]
+        )
+    return [(obj, obj.score) for obj in rows]
+
+
+def _people_fallback(queryset, field, query, limit):
+    rows = []
+    needle = query.lower()
+    for obj in queryset.filter(**{f'{field}__icontains': query})[:limit]:
+        value = _field_value(obj, field).lower()
+        rows.append((obj, SequenceMatcher(None, needle, value).ratio()))
+    return rows
+
+
+def _field_value(obj, field):
+    for part in field.split('__'):
+        obj = getattr(obj, part, None)
+    return str(obj or '')
+
+
+def _person_result(kind, obj, field, score):
+    if kind == 'team_member':
+        label, detail = obj.name, obj.position
+    else:
+        label, detail = obj.user.username, _field_value(obj, field)
+    return {
+        'type': kind,
+        'id': obj.pk,
+        'label': label,
+        'detail': detail,
+        'matched_field': field,
+        'score': round(float(score), 4),
+    }
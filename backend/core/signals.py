@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    SiteSettings, Sponsor, SocialLink, Class, Enrollment, Resource, TeamMember, Domain, Member, Meeting, MeetingOverride,
+)
+from .invalidation import invalidation_bus
+from . import authentication, calendar_feeds, meeting_events, profiles, scheduling, suggest  # noqa: F401 - subscribe their bus handlers
+from .enrollment import release_seat
+from .snapshots import refresh_home_snapshot_on_commit
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    invalidation_bus.publish('principal', instance.pk)
+    invalidation_bus.publish('profile', instance.pk)
+
+
+@receiver(pre_save, sender=Member)
+@receiver(pre_save, sender=TeamMember)
+def remember_previous_user(sender, instance, update_fields=None, **kwargs):
+    # An admin can move the profile to another user; the one it leaves goes stale too
+    instance.previous_user_id = None
+    if instance.pk is not None and (update_fields is None or 'user' in update_fields):
+        instance.previous_user_id = sender.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Member)
+def member_changed(sender, instance, **kwargs):
+    invalidation_bus.publish('profile', instance.user_id, getattr(instance, 'previous_user_id', None))
+
+
+# pre_delete for these two: the SET_NULL on Member runs before post_delete
+@receiver([post_save, pre_delete], sender=TeamMember)
+def team_member_changed(sender, instance, **kwargs):
+    # Members show their lead's name, so their profiles go stale too
+    led_user_ids = list(Member.objects.filter(lead=instance).values_list('user_id', flat=True))
+    invalidation_bus.publish(
+        'profile', instance.user_id, getattr(instance, 'previous_user_id', None), *led_user_ids
+    )
+
+
+@receiver([post_save, pre_delete], sender=Domain)
+def domain_changed(sender, instance, **kwargs):
+    invalidation_bus.publish('profile', *Member.objects.filter(domain=instance).values_list('user_id', flat=True))
+
+
+@receiver(request_started)
+def start_invalidation_listener(sender, **kwargs):
+    # Lazily, so each forked worker gets its own listener thread
+    invalidation_bus.ensure_listening()
+
+
+# Models behind the /api/suggest/ index; published by both backends
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=TeamMember)
+@receiver([post_save, post_delete], sender=Domain)
+def suggest_source_changed(sender, instance, **kwargs):
+    invalidation_bus.publish(sender._meta.label_lower, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=Sponsor)
+@receiver([post_save, post_delete], sender=TeamMember)
+@receiver([post_save, post_delete], sender=SocialLink)
+def home_source_changed(sender, instance, **kwargs):
+    refresh_home_snapshot_on_commit()
+
+
+def publish_meetings(*pks):
+    invalidation_bus.publish(meeting_events.TOPIC, *pks)
+
+
+@receiver([post_save, post_delete], sender=Meeting)
+def meeting_changed(sender, instance, **kwargs):
+    publish_meetings(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=MeetingOverride)
+def meeting_override_changed(sender, instance, **kwargs):
+    publish_meetings(instance.meeting_id)
+
+
+@receiver(m2m_changed, sender=Meeting.domains.through)
+def meeting_domains_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        publish_meetings(*(pk_set or ()))
+    else:
+        publish_meetings(instance.pk)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    # Unenrolling, admin deletes and cascades from Member all free the seat
+    release_seat(instance.course_id)
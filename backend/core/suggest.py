@@ -0,0 +1,189 @@
+"""
+Per-worker prefix index for the /api/suggest/ typeahead.
+
+Titles of active classes and resources, team member names and domain
+display names are tokenized into a sorted list of ``(token, kind, pk)``
+tuples. A lookup is a bisect to the first token with the typed prefix
+followed by a short scan, so answering never touches the database.
+
+The index is built lazily on the first lookup and kept current through
+the invalidation bus: saves and deletes of the source models, made in this
+process or any other worker of either backend, reload the affected entry
+(see core/signals.py). It is still rebuilt after ``SUGGEST_INDEX_TTL``
+seconds as a backstop, by one request thread while the others keep using
+the old index.
+
+Lookups don't lock: every change builds new entries and labels and swaps
+them in as one tuple, so a lookup always reads a consistent pair.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from functools import partial
+
+from django.conf import settings
+
+from .invalidation import invalidation_bus
+
+from .models import Class, Resource, TeamMember, Domain
+
+TOKEN_RE = re.compile(r'\w+')
+
+# kind -> (model, label field)
+SOURCES = {
+    'class': (Class, 'title'),
+    'resource': (Resource, 'title'),
+    'team_member': (TeamMember, 'name'),
+    'domain': (Domain, 'display_name'),
+}
+
+
+def normalize(text):
+    return text.casefold().strip()
+
+
+def tokenize(label):
+    """Every word of the label plus the whole label, so 'intro to py' matches too."""
+    words = TOKEN_RE.findall(normalize(label))
+    tokens = set(words)
+    tokens.add(normalize(label))
+    return tokens
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        # (sorted [(token, kind, pk)], {(kind, pk): label}); replaced, never changed
+        self._state = ([], {})
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._state[0])
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    def is_fresh(self):
+        ttl = getattr(settings, 'SUGGEST_INDEX_TTL', 300)
+        return self.is_built and time.monotonic() - self.built_at <= ttl
+
+    def build(self):
+        entries = []
+        labels = {}
+        for kind, (model, field) in SOURCES.items():
+            for pk, label in model.objects.filter(is_active=True).values_list('pk', field):
+                if not label:
+                    continue
+                labels[(kind, pk)] = label
+                entries.extend((token, kind, pk) for token in tokenize(label))
+        entries.sort()
+        with self._lock:
+            self._state = (entries, labels)
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if self.is_fresh():
+            return
+        # Until there's an index every lookup waits for it; after that one
+        # thread rebuilds and the rest use the old one meanwhile
+        if not self._build_lock.acquire(blocking=not self.is_built):
+            return
+        try:
+            if not self.is_fresh():
+                self.build()
+        finally:
+            self._build_lock.release()
+
+    @staticmethod
+    def _without(entries, labels, key):
+        label = labels.pop(key, None)
+        if label is None:
+            return
+        for token in tokenize(label):
+            entry = (token, *key)
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+
+    def update(self, kind, pk, label, active=True):
+        """Reindex one object; inactive or unlabeled objects are dropped."""
+        if not self.is_built:
+            return
+        key = (kind, pk)
+        with self._lock:
+            entries, labels = list(self._state[0]), dict(self._state[1])
+            self._without(entries, labels, key)
+            if active and label:
+                labels[key] = label
+                for token in tokenize(label):
+                    insort(entries, (token, kind, pk))
+            self._state = (entries, labels)
+
+    def reload(self, kind, pk):
+        """Reindex one object from the database; gone objects are dropped."""
+        if not self.is_built:
+            return
+        model, field = SOURCES[kind]
+        row = model.objects.filter(pk=pk).values_list(field, 'is_active').first()
+        if row is None:
+            self.remove(kind, pk)
+        else:
+            self.update(kind, pk, row[0], active=row[1])
+
+    def expire(self):
+        """Rebuild on the next lookup."""
+        self.built_at = None
+
+    def remove(self, kind, pk):
+        if not self.is_built:
+            return
+        with self._lock:
+            entries, labels = list(self._state[0]), dict(self._state[1])
+            self._without(entries, labels, (kind, pk))
+            self._state = (entries, labels)
+
+    def suggest(self, prefix, limit=10, kinds=None):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        entries, labels = self._state
+        seen = set()
+        matches = []
+        position = bisect_left(entries, (prefix,))
+        # Scan a bounded window; one object can own several matching tokens
+        while position < len(entries) and len(seen) < limit * 4:
+            token, kind, pk = entries[position]
+            if not token.startswith(prefix):
+                break
+            position += 1
+            key = (kind, pk)
+            if key in seen or (kinds is not None and kind not in kinds):
+                continue
+            seen.add(key)
+            label = labels.get(key)
+            if label is not None:
+                matches.append({'type': kind, 'id': pk, 'label': label})
+
+        # Labels that start with the prefix first, then shorter labels
+        matches.sort(key=lambda match: (not normalize(match['label']).startswith(prefix), len(match['label'])))
+        return matches[:limit]
+
+
+suggest_index = PrefixIndex()
+
+
+def _source_changed(kind, pks):
+    if pks is None:
+        suggest_index.expire()
+        return
+    for pk in pks:
+        suggest_index.reload(kind, int(pk))
+
+
+for _kind, (_model, _) in SOURCES.items():
+    invalidation_bus.subscribe(_model._meta.label_lower, partial(_source_changed, _kind))
@@ -1,3 +1,1148 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from importlib import import_module
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import OperationalError, connection, transaction
+from django.http import JsonResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from tars.passwords import PasswordPoolBusy, password_pool
+
+from .authentication import get_principal, invalidate_principal, principal_cache_key
+from .calendar_feeds import GENERATION_KEY, feed_token, feed_user, fold
+from .enrollment import ClassFull, EnrollmentClosed, enroll, unenroll
+from .formatting import format_datetime, format_local_datetime, format_month
+from .invalidation import invalidation_bus
+from .meeting_events import MeetingHub, MeetingState, TimerWheel, meeting_state, next_transition
+from .middleware import CompressionMiddleware
+from .models import (
+    Class, Domain, Enrollment, HomeSnapshot, Meeting, MeetingOverride, Member, Resource, ResourceTag, SocialLink, Tag,
+    TeamMember,
+)
+from .recurrence import occurrence, parse_rrule, series_occurrences
+from .scheduling import IntervalTree, MeetingConflict, check_occurrence, check_schedule, meeting_index
+from .search import prefix_search_query, prefix_tsquery, search_people, search_resources
+from .serializers import ClassSerializer, MeetingSerializer
+from .snapshots import build_home_payload
+from .throttling import LoginRateThrottle, MemoryBucketStore
+from .timeline import TimelineQuery, key, timeline_page
+from .views import ClassViewSet
+from .warmup import warm_up
+
+
+def make_class(**fields):
+    return Class.objects.create(**{
+        'title': 'Intro to Robotics',
+        'description': 'Basics',
+        'start_date': timezone.now() + timedelta(days=7),
+        'duration': '4 weeks',
+        **fields,
+    })
+
+
+def make_member(username):
+    user = get_user_model().objects.create_user(username=username, password='secret')
+    return Member.objects.create(user=user)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite locks the table against concurrent writers')
+class EnrollmentBurstTests(TransactionTestCase):
+    """Enrollments racing for the last seats, each on its own connection"""
+
+    SEATS = 5
+    MEMBERS = 24
+
+    def test_burst_fills_exactly_the_seats(self):
+        course = make_class(max_participants=self.SEATS)
+        members = [make_member(f'burst{index}') for index in range(self.MEMBERS)]
+        barrier = threading.Barrier(self.MEMBERS)
+
+        def attempt(member):
+            try:
+                barrier.wait()
+                enroll(member, course.pk)
+                return 'seated'
+            except ClassFull:
+                return 'full'
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.MEMBERS) as pool:
+            outcomes = list(pool.map(attempt, members))
+
+        course.refresh_from_db()
+        self.assertEqual(outcomes.count('seated'), self.SEATS)
+        self.assertEqual(outcomes.count('full'), self.MEMBERS - self.SEATS)
+        self.assertEqual(course.enrolled_count, self.SEATS)
+        self.assertEqual(Enrollment.objects.filter(course=course).count(), self.SEATS)
+
+    def test_burst_of_one_member_takes_one_seat(self):
+        course = make_class(max_participants=self.SEATS)
+        member = make_member('repeat')
+        attempts = 8
+        barrier = threading.Barrier(attempts)
+
+        def attempt(_):
+            try:
+                barrier.wait()
+                return enroll(member, course.pk)[1]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=attempts) as pool:
+            created = list(pool.map(attempt, range(attempts)))
+
+        course.refresh_from_db()
+        self.assertEqual(created.count(True), 1)
+        self.assertEqual(course.enrolled_count, 1)
+
+
+class EnrollmentTests(TestCase):
+    def setUp(self):
+        self.course = make_class(max_participants=1)
+        self.member = make_member('first')
+
+    def test_unenroll_frees_the_seat(self):
+        enroll(self.member, self.course.pk)
+        self.assertTrue(unenroll(self.member, self.course.pk))
+        self.assertFalse(unenroll(self.member, self.course.pk))
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 0)
+        enroll(make_member('second'), self.course.pk)
+
+    def test_saving_a_stale_class_keeps_the_count(self):
+        stale = Class.objects.get(pk=self.course.pk)
+        enroll(self.member, self.course.pk)
+        stale.title = 'Robotics 101'
+        stale.save()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+
+    def test_closed_class(self):
+        self.course.status = 'archived'
+        self.course.save()
+        with self.assertRaises(EnrollmentClosed):
+            enroll(self.member, self.course.pk)
+
+    # No listener thread: it would hold a connection to the test database
+    @override_settings(INVALIDATION_BUS={'ENABLED': False})
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(self.member.user)
+        url = f'/api/classes/{self.course.pk}/enroll/'
+        response = client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['enrolled_count'], 1)
+        self.assertEqual(client.post(url).status_code, 200)
+
+        client.force_authenticate(make_member('second').user)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['detail'].code, 'class_full')
+        self.assertEqual(client.delete(url).status_code, 404)
+
+
+class InvalidationBusTests(TestCase):
+    def test_publish_waits_for_commit(self):
+        seen = []
+        invalidation_bus.subscribe('tests.bus', seen.append)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidation_bus.publish('tests.bus', 1)
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                invalidation_bus.publish('tests.bus', 2)
+                raise RuntimeError
+            self.assertEqual(seen, [])
+        self.assertEqual(seen, [['1']])
+
+
+# Serially: pool threads keep their own connections to the test database
+@override_settings(INVALIDATION_BUS={'ENABLED': False}, BATCH_API={'MAX_WORKERS': 1})
+class BatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_member('batcher').user)
+
+    def batch(self, *paths):
+        response = self.client.post('/api/batch/', {'requests': [
+            {'id': index, 'path': path} for index, path in enumerate(paths)
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['responses']
+
+    def test_async_views_get_their_own_error(self):
+        async_entry, sync_entry = self.batch('/api/async/home/', '/api/classes/')
+        self.assertEqual(async_entry['status'], 501)
+        self.assertEqual(sync_entry['status'], 200)
+
+    def test_failures_are_not_echoed(self):
+        failing = mock.patch.object(ClassViewSet, 'list', side_effect=RuntimeError('password=hunter2'))
+        with failing, self.assertLogs('tars.batch', 'ERROR'):
+            entry, = self.batch('/api/classes/')
+        self.assertEqual(entry, {'id': 0, 'status': 500, 'body': {'error': 'Request failed'}})
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+def starts(meetings, count=None):
+    return [meeting.scheduled_date for meeting in itertools.islice(meetings, count)]
+
+
+class RecurrenceRuleTests(TestCase):
+    def test_parse(self):
+        rule = parse_rrule('RRULE:freq=weekly;INTERVAL=2;BYDAY=FR,MO;COUNT=6')
+        self.assertEqual((rule.freq, rule.interval, rule.count, rule.byday), ('WEEKLY', 2, 6, (0, 4)))
+        self.assertEqual(parse_rrule('FREQ=DAILY;UNTIL=20250131').until, local(2025, 1, 31, 23, 59, 59, 999999))
+
+    def test_invalid(self):
+        for text in (
+            '', 'FREQ=YEARLY', 'FREQ=DAILY;COUNT=0', 'FREQ=DAILY;COUNT=2;UNTIL=20250131',
+            'FREQ=DAILY;BYDAY=MO', 'FREQ=WEEKLY;BYDAY=XX', 'FREQ=DAILY;FREQ=DAILY', 'FREQ=DAILY;BYMONTH=1',
+        ):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_rrule(text)
+
+
+class SeriesOccurrenceTests(TestCase):
+    def series(self, recurrence, start, hours=1):
+        return Meeting.objects.create(
+            title='Standup', scheduled_date=start, end_time=start + timedelta(hours=hours), recurrence=recurrence
+        )
+
+    def test_weekly_by_day(self):
+        # A Wednesday: the first week only has its Wednesday and Friday
+        series = self.series('FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=5', local(2025, 1, 1, 18))
+        self.assertEqual(starts(series_occurrences(series)), [
+            local(2025, 1, 1, 18), local(2025, 1, 3, 18), local(2025, 1, 6, 18),
+            local(2025, 1, 8, 18), local(2025, 1, 10, 18),
+        ])
+        self.assertEqual(starts(series_occurrences(series, local(2025, 1, 7))), [
+            local(2025, 1, 8, 18), local(2025, 1, 10, 18),
+        ])
+
+    def test_monthly_skips_short_months(self):
+        series = self.series('FREQ=MONTHLY;COUNT=3', local(2025, 1, 31, 10))
+        self.assertEqual(starts(series_occurrences(series)), [
+            local(2025, 1, 31, 10), local(2025, 3, 31, 10), local(2025, 5, 31, 10),
+        ])
+
+    def test_skipping_ahead_keeps_the_local_time(self):
+        series = self.series('FREQ=DAILY;INTERVAL=3', local(2025, 1, 1, 9, 30))
+        self.assertEqual(starts(series_occurrences(series, local(2026, 1, 1)), 2), [
+            local(2026, 1, 2, 9, 30), local(2026, 1, 5, 9, 30),
+        ])
+
+    def test_overrides(self):
+        series = self.series('FREQ=DAILY;COUNT=4', local(2025, 1, 1, 9))
+        MeetingOverride.objects.create(meeting=series, original_start=local(2025, 1, 2, 9), is_cancelled=True)
+        MeetingOverride.objects.create(
+            meeting=series, original_start=local(2025, 1, 3, 9), scheduled_date=local(2025, 1, 5, 9)
+        )
+        MeetingOverride.objects.create(meeting=series, original_start=local(2025, 1, 4, 9), title='Retro')
+        occurrences = list(series_occurrences(series))
+        self.assertEqual(starts(occurrences), [
+            local(2025, 1, 1, 9), local(2025, 1, 2, 9), local(2025, 1, 4, 9), local(2025, 1, 5, 9),
+        ])
+        self.assertEqual(occurrences[1].status, 'cancelled')
+        self.assertEqual(occurrences[2].title, 'Retro')
+        moved = occurrences[3]
+        self.assertEqual((moved.occurrence_start, moved.end_time), (local(2025, 1, 3, 9), local(2025, 1, 5, 10)))
+        self.assertEqual(starts(series_occurrences(series, local(2025, 1, 4, 12))), [local(2025, 1, 5, 9)])
+
+
+class ScheduleConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The test schema is built without migrations; the conflict query needs 0011's function
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(import_module('core.migrations.0011_meeting_span_index').CREATE_SPAN_SQL)
+
+    def setUp(self):
+        # SQLite's index outlives the rolled back meetings of earlier tests
+        meeting_index.invalidate()
+        self.asha = TeamMember.objects.create(name='Asha', role='lead', position='Tech Lead')
+        self.ravi = TeamMember.objects.create(name='Ravi', role='mentor', position='Mentor')
+        self.ai, self.web = (Domain.objects.create(name=name, display_name=name.upper()) for name in ('ai', 'web'))
+        self.start = local(2030, 1, 7, 10)
+        self.existing = self.create(
+            title='AI sync', speaker=self.asha, scheduled_by=self.ravi, domains=[self.ai],
+        )
+
+    def create(self, domains=(), **fields):
+        fields = {'scheduled_date': self.start, 'end_time': self.start + timedelta(hours=1), **fields}
+        # The commit refreshes SQLite's meeting index
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting = Meeting.objects.create(**fields)
+            meeting.domains.set(domains)
+        return meeting
+
+    def data(self, start=None, minutes=30, **fields):
+        start = start or self.start + timedelta(minutes=15)
+        return {'scheduled_date': start, 'end_time': start + timedelta(minutes=minutes), 'domains': [self.web], **fields}
+
+    def conflict(self, data):
+        with self.assertRaises(MeetingConflict) as raised:
+            check_schedule(data)
+        conflict, = raised.exception.detail['conflicts']
+        self.assertEqual(conflict['id'], self.existing.pk)
+        return conflict['reasons'], conflict['domains']
+
+    def test_each_reason(self):
+        self.assertEqual(self.conflict(self.data(speaker=self.asha)), (['speaker'], []))
+        self.assertEqual(self.conflict(self.data(scheduled_by=self.ravi)), (['scheduled_by'], []))
+        self.assertEqual(self.conflict(self.data(domains=[self.ai, self.web])), (['domains'], [self.ai.pk]))
+        # A meeting for all domains shares every domain
+        self.assertEqual(self.conflict(self.data(domains=[])), (['domains'], []))
+        self.assertEqual(
+            self.conflict(self.data(speaker=self.asha, scheduled_by=self.ravi, domains=[self.ai])),
+            (['speaker', 'scheduled_by', 'domains'], [self.ai.pk]),
+        )
+
+    def test_nothing_shared(self):
+        check_schedule(self.data(speaker=self.ravi, scheduled_by=self.asha))
+
+    def test_back_to_back_meetings(self):
+        before = self.start - timedelta(minutes=30)
+        check_schedule(self.data(before, speaker=self.asha))
+        check_schedule(self.data(self.start + timedelta(hours=1), speaker=self.asha))
+        self.assertEqual(self.conflict(self.data(before, minutes=31, speaker=self.asha)), (['speaker'], []))
+
+    def test_meeting_without_an_end_lasts_an_hour(self):
+        self.existing.end_time = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.existing.save()
+        self.conflict(self.data(self.start + timedelta(minutes=59), speaker=self.asha))
+        check_schedule(self.data(self.start + timedelta(hours=1), speaker=self.asha))
+
+    def test_cancelled_and_inactive_meetings_are_free(self):
+        check_schedule(self.data(speaker=self.asha, status='cancelled'))
+        self.existing.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.existing.save()
+        check_schedule(self.data(speaker=self.asha))
+
+    def test_edit_ignores_itself(self):
+        check_schedule({'end_time': self.start + timedelta(hours=2)}, self.existing)
+
+    def test_index_follows_committed_changes(self):
+        later = self.start + timedelta(days=1)
+        check_schedule(self.data(later, speaker=self.asha))
+        self.existing.scheduled_date, self.existing.end_time = later, later + timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.existing.save()
+        self.conflict(self.data(later, speaker=self.asha))
+        check_schedule(self.data(speaker=self.asha))
+
+    def test_interval_tree_matches_a_scan(self):
+        intervals = [(start, start + length, index) for index, (start, length) in enumerate(
+            itertools.product(range(0, 40, 3), (1, 4, 9))
+        )]
+        tree = IntervalTree(intervals)
+        for start, end in itertools.product(range(-2, 45, 2), (1, 5)):
+            end += start
+            with self.subTest(start=start, end=end):
+                self.assertCountEqual(
+                    tree.overlapping(start, end),
+                    [item for lo, hi, item in intervals if lo < end and hi > start],
+                )
+        self.assertEqual(IntervalTree([]).overlapping(0, 10), [])
+
+    def test_api_conflicts_are_a_409(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='staff', is_staff=True))
+        start = self.start + timedelta(minutes=30)
+        body = {
+            'title': 'Demo', 'speaker': self.asha.pk, 'domains': [self.web.pk],
+            'scheduled_date': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat(),
+        }
+        response = client.post('/api/meetings/', body, format='json')
+        self.assertEqual(response.status_code, 409)
+        as_datetime = serializers.DateTimeField().to_representation
+        self.assertEqual(response.json(), {
+            'detail': 'The meeting overlaps other meetings.',
+            'code': 'meeting_conflict',
+            'conflicts': [{
+                'id': self.existing.pk,
+                'title': 'AI sync',
+                'scheduled_date': as_datetime(self.start),
+                'end_time': as_datetime(self.start + timedelta(hours=1)),
+                'reasons': ['speaker'],
+                'domains': [],
+            }],
+        })
+        self.assertFalse(Meeting.objects.filter(title='Demo').exists())
+
+        demo = self.create(title='Demo', speaker=self.asha, scheduled_date=start + timedelta(hours=2))
+        response = client.patch(f'/api/meetings/{demo.pk}/', {'scheduled_date': start.isoformat()}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([conflict['id'] for conflict in response.json()['conflicts']], [self.existing.pk])
+        demo.refresh_from_db()
+        self.assertEqual(demo.scheduled_date, start + timedelta(hours=2))
+        response = client.patch(f'/api/meetings/{demo.pk}/', {'title': 'Demo day'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class RecurringScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The test schema is built without migrations; the conflict query needs 0011's function
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(import_module('core.migrations.0011_meeting_span_index').CREATE_SPAN_SQL)
+
+    def setUp(self):
+        self.speaker = TeamMember.objects.create(name='Asha', role='lead', position='Tech Lead')
+        self.start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        self.series = self.create(
+            title='Weekly sync', scheduled_date=self.start, end_time=self.start + timedelta(hours=1),
+            recurrence='FREQ=WEEKLY',
+        )
+
+    def create(self, **fields):
+        # The commit refreshes SQLite's meeting index
+        with self.captureOnCommitCallbacks(execute=True):
+            return Meeting.objects.create(speaker=self.speaker, **fields)
+
+    def data(self, start, **fields):
+        return {'scheduled_date': start, 'end_time': start + timedelta(minutes=30), 'speaker': self.speaker, **fields}
+
+    def test_meeting_on_a_later_occurrence(self):
+        later = self.start + timedelta(weeks=5, minutes=15)
+        with self.assertRaises(MeetingConflict) as raised:
+            check_schedule(self.data(later))
+        conflict, = raised.exception.detail['conflicts']
+        self.assertEqual((conflict['id'], conflict['reasons']), (self.series.pk, ['speaker', 'domains']))
+        check_schedule(self.data(later + timedelta(hours=1)))
+
+    def test_series_meeting_a_later_meeting(self):
+        start = self.start + timedelta(hours=3)
+        meeting = self.create(title='Demo day', scheduled_date=start + timedelta(weeks=8))
+        with self.assertRaises(MeetingConflict) as raised:
+            check_schedule(self.data(start, recurrence='FREQ=WEEKLY'))
+        conflict, = raised.exception.detail['conflicts']
+        self.assertEqual(conflict['id'], meeting.pk)
+        self.assertEqual(conflict['for_occurrence'], serializers.DateTimeField().to_representation(meeting.scheduled_date))
+        check_schedule(self.data(start, recurrence='FREQ=WEEKLY;COUNT=8'))
+
+    def test_edit_ignores_its_own_occurrences(self):
+        check_schedule({'end_time': self.start + timedelta(hours=2)}, self.series)
+
+    def test_moved_occurrence(self):
+        week = self.start + timedelta(weeks=1)
+        onto_next = MeetingOverride(meeting=self.series, original_start=week, scheduled_date=week + timedelta(weeks=1))
+        with self.assertRaises(MeetingConflict):
+            check_occurrence(self.series, occurrence(self.series, week, onto_next))
+        later = MeetingOverride(meeting=self.series, original_start=week, scheduled_date=week + timedelta(days=1))
+        check_occurrence(self.series, occurrence(self.series, week, later))
+
+    def test_status_timer_follows_the_occurrences(self):
+        state = meeting_state(Meeting.objects.prefetch_related('domains', 'overrides').get(pk=self.series.pk))
+        second = self.start + timedelta(weeks=1)
+        self.assertEqual(next_transition(state, self.start), (self.start + timedelta(hours=1), 'completed', self.start))
+        self.assertEqual(next_transition(state, self.start + timedelta(hours=2)), (second, 'ongoing', second))
+
+
+class TimelinePagingTests(TestCase):
+    def setUp(self):
+        start = local(2024, 1, 1, 9)
+        Meeting.objects.create(title='Daily', scheduled_date=start, recurrence='FREQ=DAILY;INTERVAL=2')
+        weekly = Meeting.objects.create(
+            title='Weekly', scheduled_date=start + timedelta(days=3), end_time=start + timedelta(days=3, hours=2),
+            recurrence='FREQ=WEEKLY;BYDAY=TH,SA',
+        )
+        MeetingOverride.objects.create(meeting=weekly, original_start=local(2024, 3, 7, 9), is_cancelled=True)
+        MeetingOverride.objects.create(
+            meeting=weekly, original_start=local(2024, 3, 9, 9), scheduled_date=local(2024, 3, 1, 9)
+        )
+        for day in range(1, 60, 5):
+            Meeting.objects.create(title='Talk', scheduled_date=local(2024, 2, 1, 9) + timedelta(days=day))
+        # Same start as a daily occurrence: the id breaks the tie
+        Meeting.objects.create(title='Clash', scheduled_date=local(2024, 3, 2, 9))
+        self.meetings = Meeting.objects.filter(is_active=True)
+
+    def pages(self, query):
+        page, before, after = timeline_page(self.meetings, query)
+        forward = [key(meeting) for meeting in page]
+        while after is not None:
+            page, before, after = timeline_page(self.meetings, query._replace(cursor=after))
+            forward.extend(key(meeting) for meeting in page)
+        backward = [key(meeting) for meeting in page]
+        while before is not None:
+            page, before, _ = timeline_page(self.meetings, query._replace(cursor=before))
+            backward[:0] = [key(meeting) for meeting in page]
+        return forward, backward
+
+    def test_backward_pages_match_forward_pages(self):
+        for query in (
+            TimelineQuery(None, local(2024, 4, 1), None, None, 7),
+            TimelineQuery(local(2024, 2, 10), local(2024, 3, 20), None, None, 4),
+            TimelineQuery(None, local(2024, 4, 1), 'cancelled', None, 2),
+        ):
+            with self.subTest(query=query):
+                forward, backward = self.pages(query)
+                self.assertEqual(backward, forward)
+                self.assertEqual(forward, sorted(set(forward)))
+                self.assertTrue(forward)
+
+
+class MemoryBucketStoreTests(TestCase):
+    def test_full_store_drops_expired_then_least_recent_buckets(self):
+        now = [100.0]
+        store = MemoryBucketStore()
+        store.max_keys = 3
+        store.clock = lambda: now[0]
+        store.set('a', 99.0, 60)
+        store.set('b', 160.0, 60)
+        store.set('c', 160.0, 60)
+        store.set('b', 170.0, 60)
+        # 'a' has expired
+        store.set('d', 160.0, 60)
+        self.assertEqual(list(store._tats), ['c', 'b', 'd'])
+        # No scan again within prune_interval: the least recently set goes
+        store.set('e', 160.0, 60)
+        self.assertEqual(list(store._tats), ['b', 'd', 'e'])
+        self.assertEqual(store.get('b'), 170.0)
+
+    def test_concurrent_burst_spends_each_token_once(self):
+        store = MemoryBucketStore()
+        rate = LoginRateThrottle(store=store).num_requests
+        callers = rate * 4
+        barrier = threading.Barrier(callers)
+
+        def attempt(_):
+            # One throttle per request, as DRF builds them
+            throttle = LoginRateThrottle(store=store)
+            barrier.wait()
+            return throttle.allow_request(RequestFactory().post('/api/auth/login/', REMOTE_ADDR='203.0.113.9'), None)
+
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            allowed = list(pool.map(attempt, range(callers)))
+        self.assertEqual(allowed.count(True), rate)
+
+
+class ThrottleKeyTests(TestCase):
+    def test_spoofed_forwarded_for_hits_the_same_bucket(self):
+        throttle = LoginRateThrottle(store=MemoryBucketStore())
+        allowed = [
+            # The client's own value first, then what the proxy saw
+            throttle.allow_request(
+                RequestFactory().post('/api/auth/login/', HTTP_X_FORWARDED_FOR=f'10.0.{n}.1, 203.0.113.9'), None
+            )
+            for n in range(throttle.num_requests + 5)
+        ]
+        self.assertEqual(allowed.count(True), throttle.num_requests)
+        self.assertEqual(len(throttle.store._tats), 1)
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        self.body = {'items': ['x' * 40] * 100}
+        self.middleware = CompressionMiddleware(lambda request: JsonResponse(self.body))
+        self.middleware.compressed_body = mock.Mock(wraps=self.middleware.compressed_body)
+
+    def get(self, path):
+        return self.middleware(RequestFactory().get(path, HTTP_ACCEPT_ENCODING='gzip'))
+
+    def test_only_shared_responses_use_the_cache(self):
+        self.assertEqual(self.get('/api/home/')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.middleware.compressed_body.call_count, 1)
+        self.assertEqual(self.get('/api/meetings/?page=2')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.get('/api/home/?fields=classes')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.middleware.compressed_body.call_count, 1)
+
+    def test_token_responses_stay_uncompressed(self):
+        for path in ('/api/auth/login/', '/api/calendar/'):
+            with self.subTest(path=path):
+                self.assertFalse(self.get(path).has_header('Content-Encoding'))
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class PasswordPoolBusyTests(TestCase):
+    def test_busy_pool_is_a_503_on_every_login(self):
+        get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+        credentials = {'username': 'admin', 'password': 'secret'}
+        with mock.patch.object(password_pool, 'run', side_effect=PasswordPoolBusy):
+            for path in ('/api/auth/login/', '/admin/login/'):
+                with self.subTest(path=path):
+                    response = Client().post(path, credentials)
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(response['Retry-After'], '2')
+
+    def test_pool_counters_are_staff_only(self):
+        client = APIClient()
+        self.assertNotIn('password_pool', client.get('/api/health/').json())
+        client.force_authenticate(get_user_model().objects.create_user(username='staff', is_staff=True))
+        self.assertIn('password_pool', client.get('/api/health/').json())
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class SuggestTests(TestCase):
+    def test_types_filter(self):
+        make_class(title='Robotics Lab')
+        client = APIClient()
+        client.force_authenticate(make_member('suggester').user)
+        response = client.get('/api/suggest/', {'q': 'robo', 'types': 'domain'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertTrue(client.get('/api/suggest/', {'q': 'robo', 'types': 'class'}).data['results'])
+        self.assertEqual(client.get('/api/suggest/', {'q': 'robo', 'types': 'bogus'}).status_code, 400)
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class ResourceSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_member('reader').user)
+
+    def resource(self, title, description, **fields):
+        return Resource.objects.create(title=title, description=description, category='tutorial', **fields)
+
+    def search(self, query):
+        response = self.client.get('/api/resources/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_title_outranks_tags_and_description(self):
+        in_description = self.resource('Data wrangling', 'Cleaning tables with python scripts')
+        in_tags = self.resource('Scripting', 'Automating chores', tags='python, shell')
+        in_title = self.resource('Python basics', 'Variables and loops')
+        self.resource('Rust basics', 'Ownership and borrowing')
+        results = self.search('python')
+        self.assertEqual([result['id'] for result in results], [in_title.pk, in_tags.pk, in_description.pk])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    def test_headline_escapes_the_description(self):
+        self.resource('Unsafe', 'Beware <script>alert(1)</script> in python snippets & more')
+        headline = self.search('python')[0]['headline']
+        self.assertIn('<mark>python</mark>', headline)
+        self.assertIn('&lt;script&gt;', headline)
+        self.assertNotIn('<script>', headline)
+
+    def test_inactive_resources_are_not_found(self):
+        self.resource('Python archive', 'Old notes', is_active=False)
+        self.assertEqual(self.search('python'), [])
+
+    def test_prefix_query_keeps_the_last_word_partial(self):
+        self.assertEqual(prefix_tsquery('data  pyth'), 'data & pyth:*')
+        self.assertEqual(prefix_tsquery("o'reilly"), 'o & reilly:*')
+        self.assertIsNone(prefix_search_query(' -- '))
+
+    def test_admin_finds_partial_words(self):
+        python = self.resource('Python basics', 'Variables and loops')
+        self.resource('Rust basics', 'Ownership and borrowing')
+        resource_admin = admin.site._registry[Resource]
+        found, _ = resource_admin.get_search_results(None, Resource.objects.all(), 'pyth')
+        self.assertEqual(list(found), [python])
+
+    @skipUnless(connection.vendor == 'postgresql', 'tsvector ranking is Postgres only')
+    def test_postgres_uses_the_search_vector(self):
+        self.resource('Python basics', 'Variables and loops')
+        self.assertIn('search_vector', str(search_resources('python').query))
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class ResourceTagTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_member('tagger').user)
+        self.web = self.resource('Web apps', 'Python, Web')
+        self.scripts = self.resource('Scripts', 'python, shell')
+        self.sites = self.resource('Static sites', 'web')
+
+    def resource(self, title, tags, **fields):
+        return Resource.objects.create(title=title, description='Notes', category='tutorial', tags=tags, **fields)
+
+    def ids(self, **params):
+        response = self.client.get('/api/resources/', params)
+        self.assertEqual(response.status_code, 200)
+        return {result['id'] for result in response.data['results']}
+
+    def tag_names(self, resource):
+        return list(ResourceTag.objects.filter(resource=resource).values_list('tag__name', flat=True))
+
+    def test_tag_matches_any_resource_carrying_it(self):
+        self.assertEqual(self.ids(tag='python'), {self.web.pk, self.scripts.pk})
+        self.assertEqual(self.ids(tag='WEB'), {self.web.pk, self.sites.pk})
+
+    def test_tags_all_needs_every_tag(self):
+        self.assertEqual(self.ids(tags_all='python,web'), {self.web.pk})
+        self.assertEqual(self.ids(tags_all='python', tag='shell'), {self.scripts.pk})
+        self.assertEqual(self.ids(tags_all='python,nonexistent'), set())
+
+    def test_facet_counts_only_active_resources(self):
+        self.resource('Old scripts', 'shell, perl', is_active=False)
+        response = self.client.get('/api/resources/tags/')
+        self.assertEqual(response.data, [
+            {'name': 'Python', 'count': 2},
+            {'name': 'Web', 'count': 2},
+            {'name': 'shell', 'count': 1},
+        ])
+
+    def test_tag_rows_follow_the_legacy_field(self):
+        self.scripts.tags = 'shell, Bash, shell'
+        self.scripts.save()
+        self.assertEqual(self.tag_names(self.scripts), ['shell', 'Bash'])
+        self.assertEqual(self.ids(tag='python'), {self.web.pk})
+
+    @skipUnless(connection.vendor == 'postgresql', 'the sync trigger is Postgres only (migration 0015)')
+    def test_trigger_follows_edits_that_bypass_save(self):
+        Resource.objects.filter(pk=self.sites.pk).update(tags='web, css')
+        self.assertEqual(self.tag_names(self.sites), ['Web', 'css'])
+        Resource.objects.filter(pk=self.scripts.pk).update(tags='')
+        self.assertEqual(self.tag_names(self.scripts), [])
+        # Nothing links to "shell" any more
+        self.assertFalse(Tag.objects.filter(name='shell').exists())
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class PeopleTypeaheadTests(TestCase):
+    def setUp(self):
+        for username in ('asha', 'ashanti', 'natasha_k', 'ravi'):
+            make_member(username)
+        TeamMember.objects.create(name='Asha Rao', role='lead', position='Tech Lead')
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='staff', is_staff=True))
+
+    def typeahead(self, **params):
+        return self.client.get('/api/typeahead/people/', params)
+
+    def test_staff_only(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/typeahead/people/', {'q': 'asha'}).status_code, 401)
+        client.force_authenticate(make_member('nosy').user)
+        self.assertEqual(client.get('/api/typeahead/people/', {'q': 'asha'}).status_code, 403)
+
+    def test_best_matches_first_up_to_the_limit(self):
+        data = self.typeahead(q='asha', limit=3).data
+        self.assertFalse(data['partial'])
+        self.assertEqual([result['label'] for result in data['results']], ['asha', 'ashanti', 'Asha Rao'])
+        scores = [result['score'] for result in data['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_budget_running_out_returns_what_was_found(self):
+        # The deadline, then the first field in time, then every later field too late
+        clock = itertools.chain([0.0, 0.0], itertools.repeat(1.0))
+        with mock.patch('core.search.time.perf_counter', side_effect=lambda: next(clock)):
+            results, partial = search_people('asha')
+        self.assertTrue(partial)
+        self.assertEqual({result['matched_field'] for result in results}, {'user__username'})
+
+    def test_cancelled_query_is_partial(self):
+        with mock.patch('core.search._people_fallback', side_effect=OperationalError('canceling statement')), \
+                mock.patch('core.search._people_postgres', side_effect=OperationalError('canceling statement')):
+            self.assertEqual(self.typeahead(q='asha').data, {'results': [], 'partial': True})
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm is Postgres only')
+    def test_postgres_budget_is_a_bound_setting(self):
+        with CaptureQueriesContext(connection) as queries:
+            results, _ = search_people('ashaa')
+        self.assertIn('asha', [result['label'] for result in results])
+        self.assertTrue(any("set_config('statement_timeout'" in query['sql'] for query in queries))
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        speaker = TeamMember.objects.create(name='Asha', role='lead', position='Tech Lead')
+        start = timezone.now() + timedelta(days=1)
+        for index in range(3):
+            make_class(title=f'Class {index}', instructor=speaker)
+            meeting = Meeting.objects.create(
+                title=f'Sync {index}', scheduled_date=start, end_time=start + timedelta(hours=1), speaker=speaker,
+            )
+            meeting.domains.add(Domain.objects.create(name=f'domain{index}', display_name=f'Domain {index}'))
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='staff', is_staff=True))
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_fields_keeps_only_the_named_fields(self):
+        for path in ('/api/classes/', '/api/meetings/'):
+            with self.subTest(path=path):
+                self.assertEqual({tuple(item) for item in self.get(path, fields='id,title')}, {('id', 'title')})
+
+    def test_unknown_field_names_are_ignored(self):
+        self.assertEqual({tuple(item) for item in self.get('/api/classes/', fields='id,bogus')}, {('id',)})
+
+    def test_omit_drops_the_named_fields(self):
+        item = self.get('/api/meetings/', omit='description,domains_detail')[0]
+        self.assertNotIn('description', item)
+        self.assertNotIn('domains_detail', item)
+        self.assertIn('computed_status', item)
+
+    def test_unrequested_method_fields_are_not_evaluated(self):
+        cases = (
+            ('/api/meetings/', MeetingSerializer, 'get_computed_status'),
+            ('/api/meetings/', MeetingSerializer, 'get_scheduled_date_formatted'),
+            ('/api/classes/', ClassSerializer, 'get_start_date_formatted'),
+        )
+        for path, serializer, method in cases:
+            with self.subTest(method=method), mock.patch.object(serializer, method, return_value='') as getter:
+                self.get(path, fields='id,title')
+                getter.assert_not_called()
+                self.get(path, omit=method[len('get_'):])
+                getter.assert_not_called()
+                self.get(path)
+                getter.assert_called()
+
+    def test_queryset_loads_only_what_the_fields_need(self):
+        for path in ('/api/classes/', '/api/meetings/'):
+            with self.subTest(path=path):
+                # The page count and the page, without the list's prefetches
+                with self.assertNumQueries(2), CaptureQueriesContext(connection) as queries:
+                    self.get(path, fields='id,title')
+                page_sql = queries[-1]['sql']
+                self.assertIn('"title"', page_sql)
+                self.assertNotIn('"description"', page_sql)
+                self.assertNotIn('JOIN', page_sql)
+
+    def test_viewset_queryset_is_narrowed(self):
+        view = ClassViewSet(format_kwarg=None)
+        view.request = mock.Mock(method='GET', query_params={'fields': 'id,title,instructor_display'})
+        queryset = view.filter_queryset(Class.objects.select_related('instructor'))
+        loaded, deferred = queryset.query.deferred_loading
+        self.assertFalse(deferred)
+        self.assertEqual(set(loaded), {'id', 'title', 'instructor', 'instructor_name'})
+
+
+class FormattingTests(TestCase):
+    def test_naive_values_follow_the_active_timezone(self):
+        naive = datetime(2025, 12, 28, 9, 0)
+        with timezone.override('UTC'):
+            self.assertEqual(format_local_datetime(naive), 'December 28, 2025 at 02:30 PM')
+        with timezone.override('Asia/Kolkata'):
+            self.assertEqual(format_local_datetime(naive), 'December 28, 2025 at 09:00 AM')
+
+    def test_aware_values_are_shown_in_ist(self):
+        instant = datetime(2025, 12, 28, 9, 0, tzinfo=ZoneInfo('UTC'))
+        self.assertEqual(format_local_datetime(instant), 'December 28, 2025 at 02:30 PM')
+        self.assertEqual(format_local_datetime(instant.astimezone(ZoneInfo('America/New_York'))), 'December 28, 2025 at 02:30 PM')
+
+    def test_format_datetime_keeps_each_offsets_wall_clock(self):
+        instant = datetime(2025, 12, 28, 9, 0, tzinfo=ZoneInfo('UTC'))
+        # Equal instants, different offsets: the cache must not mix them up
+        self.assertEqual(format_datetime(instant), 'December 28, 2025 at 09:00 AM')
+        self.assertEqual(format_datetime(instant.astimezone(ZoneInfo('Asia/Kolkata'))), 'December 28, 2025 at 02:30 PM')
+        self.assertEqual(format_datetime(datetime(2025, 12, 28, 9, 0)), 'December 28, 2025 at 09:00 AM')
+
+    def test_format_month(self):
+        self.assertEqual(format_month(datetime(2025, 12, 1).date()), 'December 2025')
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class HomeSnapshotTests(TestCase):
+    def link(self, platform='github'):
+        return SocialLink.objects.create(platform=platform, url=f'https://{platform}.com/tars')
+
+    def home(self, **headers):
+        return Client().get('/api/home/', **headers)
+
+    def test_home_serves_the_stored_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link()
+        snapshot = HomeSnapshot.objects.get()
+        response = self.home()
+        self.assertEqual(response.content, bytes(snapshot.body))
+        self.assertEqual(response['ETag'], f'W/"{snapshot.etag}"')
+        self.assertEqual(self.home(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_edit_refreshes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            link = self.link()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            link.url = 'https://github.com/tars-club'
+            link.save()
+            # Not before the commit
+            self.assertNotIn(b'tars-club', bytes(HomeSnapshot.objects.get().body))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.home().json()['social_links'][0]['url'], 'https://github.com/tars-club')
+
+    def test_one_refresh_per_transaction(self):
+        with mock.patch('core.snapshots.build_home_payload', wraps=build_home_payload) as build:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for platform in ('github', 'discord', 'youtube'):
+                    self.link(platform)
+                SocialLink.objects.get(platform='discord').delete()
+            self.assertEqual(len(callbacks), 1)
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(self.home().json()['social_links']), 2)
+
+    def test_rolled_back_change_does_not_hold_back_the_next(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.link()
+                raise RuntimeError
+            self.link('discord')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([link['platform'] for link in self.home().json()['social_links']], ['discord'])
+
+    def test_stale_snapshot_is_refreshed_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link()
+        HomeSnapshot.objects.update(generated_at=timezone.now() - timedelta(days=1))
+        with mock.patch('core.snapshots.build_home_payload', wraps=build_home_payload) as build:
+            for _ in range(3):
+                self.assertEqual(self.home().status_code, 200)
+        self.assertEqual(build.call_count, 1)
+
+
+class MeetingHubTests(TestCase):
+    def state(self):
+        start = timezone.now() + timedelta(hours=1)
+        return MeetingState(domains=frozenset(), start=start, end=None, cancelled=False, series=None)
+
+    def test_failing_transition_drops_only_that_timer(self):
+        hub = MeetingHub()
+        hub.wheel = TimerWheel(time.time())
+        with mock.patch('core.meeting_events.next_transition', side_effect=ValueError('bad RRULE')), \
+                self.assertLogs('core.meeting_events', 'ERROR'):
+            hub.reschedule(1, self.state())
+        self.assertEqual(len(hub.wheel), 0)
+        hub.reschedule(2, self.state())
+        self.assertEqual(len(hub.wheel), 1)
+
+    def test_run_survives_a_failing_meeting(self):
+        async def scenario():
+            hub = MeetingHub()
+            hub.wheel = TimerWheel(time.time(), tick=0.01)
+            hub.meetings = {1: self.state(), 2: self.state()}
+            hub.broadcast = mock.Mock(side_effect=[RuntimeError('boom'), None, None])
+            hub.reschedule = mock.Mock()
+            for pk in (1, 2):
+                hub.wheel.schedule(pk, time.time(), ('ongoing', None))
+            task = asyncio.get_running_loop().create_task(hub.run())
+            await asyncio.sleep(0.05)
+            hub.wheel.schedule(1, time.time(), ('completed', None))
+            await asyncio.sleep(0.05)
+            sent = [call.args[1] for call in hub.broadcast.call_args_list]
+            self.assertFalse(task.done())
+            task.cancel()
+            return sent
+
+        with self.assertLogs('core.meeting_events', 'ERROR'):
+            sent = asyncio.run(scenario())
+        self.assertEqual(len(sent), 3)
+        self.assertIn('"status":"completed"', sent[-1])
+
+    def test_start_restarts_a_finished_task(self):
+        async def scenario():
+            hub = MeetingHub()
+            hub.run = mock.AsyncMock()
+            hub.queue_reload = mock.Mock()
+            hub.start()
+            first = hub.task
+            await first
+            hub.start()
+            self.assertIsNot(hub.task, first)
+            hub.queue_reload.assert_called_once_with(None)
+            await hub.task
+
+        asyncio.run(scenario())
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        # Ids repeat between tests, cached principals and feeds must not
+        cache.clear()
+        self.ai, self.web = (Domain.objects.create(name=name, display_name=name.upper()) for name in ('ai', 'web'))
+        self.member = make_member('subscriber')
+        self.member.domain = self.ai
+        self.member.save()
+        self.start = local(2030, 1, 7, 18)
+
+    def meeting(self, title, *domains, **fields):
+        meeting = Meeting.objects.create(
+            title=title, scheduled_date=fields.pop('scheduled_date', self.start), **fields,
+        )
+        meeting.domains.set(domains)
+        return meeting
+
+    def feed(self, user=None, **headers):
+        return Client().get(f'/api/calendar/{feed_token(user or self.member.user)}.ics', **headers)
+
+    def summaries(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [line[len('SUMMARY:'):] for line in response.content.decode().split('\r\n') if line.startswith('SUMMARY:')]
+
+    def test_token_is_revoked_by_a_password_change(self):
+        user = self.member.user
+        token = feed_token(user)
+        self.assertEqual(feed_user(token), user)
+        user.set_password('changed')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertIsNone(feed_user(token))
+        self.assertEqual(Client().get(f'/api/calendar/{token}.ics').status_code, 404)
+        self.assertIsNone(feed_user(token[:-2] + 'xx'))
+
+    def test_token_of_an_inactive_user(self):
+        user = self.member.user
+        token = feed_token(user)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertIsNone(feed_user(token))
+
+    def test_member_sees_their_domain_and_all_domain_meetings(self):
+        self.meeting('AI sync', self.ai)
+        self.meeting('Web sync', self.web)
+        self.meeting('All hands')
+        self.meeting('Joint review', self.ai, self.web)
+        self.assertEqual(self.summaries(self.feed()), ['AI sync', 'All hands', 'Joint review'])
+        staff = get_user_model().objects.create_user(username='staff', is_staff=True)
+        self.assertEqual(len(self.summaries(self.feed(staff))), 4)
+
+    def test_matching_etag_is_a_304(self):
+        self.meeting('All hands')
+        etag = self.feed()['ETag']
+        self.assertEqual(self.feed(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.feed(HTTP_IF_NONE_MATCH='W/"stale"').status_code, 200)
+
+    def test_meeting_and_class_saves_drop_the_generation(self):
+        meeting = self.meeting('All hands')
+        for instance in (meeting, make_class()):
+            with self.subTest(model=type(instance).__name__):
+                self.feed()
+                self.assertIsNotNone(cache.get(GENERATION_KEY))
+                with self.captureOnCommitCallbacks(execute=True):
+                    instance.title = 'Renamed'
+                    instance.save()
+                self.assertIsNone(cache.get(GENERATION_KEY))
+        self.assertIn('Renamed', self.summaries(self.feed()))
+
+    def test_fold_keeps_lines_within_75_octets(self):
+        line = 'SUMMARY:' + 'Réunion des équipes 日本語 ' * 10
+        folded = fold(line)
+        self.assertTrue(folded.endswith('\r\n'))
+        lines = folded[:-2].split('\r\n')
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in lines))
+        self.assertTrue(all(part.startswith(' ') for part in lines[1:]))
+        self.assertEqual(''.join(part[1:] if index else part for index, part in enumerate(lines)), line)
+
+    def test_series_with_cancelled_and_moved_occurrences(self):
+        series = self.meeting('Weekly sync', end_time=self.start + timedelta(hours=1), recurrence='FREQ=WEEKLY;COUNT=4')
+        cancelled, moved = self.start + timedelta(weeks=1), self.start + timedelta(weeks=2)
+        MeetingOverride.objects.create(meeting=series, original_start=cancelled, is_cancelled=True)
+        MeetingOverride.objects.create(
+            meeting=series, original_start=moved, scheduled_date=moved + timedelta(days=1), title='Moved sync',
+        )
+        body = self.feed().content.decode()
+        self.assertIn('RRULE:FREQ=WEEKLY;COUNT=4\r\n', body)
+        self.assertIn('DTSTART;TZID=Asia/Kolkata:20300107T180000\r\n', body)
+        self.assertIn('EXDATE;TZID=Asia/Kolkata:20300114T180000\r\n', body)
+        self.assertIn('RECURRENCE-ID;TZID=Asia/Kolkata:20300121T180000\r\n', body)
+        self.assertIn('DTSTART:20300122T123000Z\r\n', body)
+        self.assertEqual(body.count(f'UID:meeting-{series.pk}@tars'), 2)
+        self.assertEqual(self.summaries(self.feed()), ['Weekly sync', 'Moved sync'])
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class WarmUpTests(TestCase):
+    def test_authenticated_lists_are_built(self):
+        make_class()
+        Resource.objects.create(title='Notes', description='Notes', category='tutorial')
+        Meeting.objects.create(title='Sync', scheduled_date=timezone.now() + timedelta(days=1))
+        report = warm_up()
+        self.assertEqual(report['failed'], [])
+        details = {step['step']: step['detail'] for step in report['steps']}
+        self.assertEqual(details['/api/portal/'], '1 classes, 1 resources')
+        for path in ('/api/classes/', '/api/resources/', '/api/meetings/'):
+            self.assertEqual(details[path], '1 row(s)')
+
+    def test_refused_renders_are_failures(self):
+        report = warm_up(paths=('/api/classes/',), lists={})
+        self.assertEqual(report['failed'], ['/api/classes/'])
+        step, = (step for step in report['steps'] if step['step'] == '/api/classes/')
+        self.assertEqual(step['detail'], 'failed: HTTP 401')
+        self.assertEqual(Client().get('/api/health/').json()['warm_up']['failed'], ['/api/classes/'])
+
+
+class ProfileInvalidationTests(TestCase):
+    def test_moving_a_profile_refreshes_both_users(self):
+        member = make_member('before')
+        lead = TeamMember.objects.create(name='Asha', role='lead', position='Tech Lead', user=member.user)
+        after = get_user_model().objects.create_user(username='after', password='secret')
+        seen = []
+        invalidation_bus.subscribe('profile', seen.extend)
+        self.addCleanup(invalidation_bus._handlers['profile'].remove, seen.extend)
+        before = member.user_id
+        for profile in (member, lead):
+            with self.subTest(profile=type(profile).__name__):
+                seen.clear()
+                with self.captureOnCommitCallbacks(execute=True):
+                    profile.user = after
+                    profile.save()
+                self.assertLessEqual({str(before), str(after.pk)}, set(seen))
+
+
+@override_settings(INVALIDATION_BUS={'ENABLED': False})
+class PrincipalCacheTests(TestCase):
+    def test_cached_principal_has_no_password_hash(self):
+        user = make_member('cached').user
+        invalidate_principal(user.pk)
+        principal = get_principal(user.pk)
+        self.assertEqual((principal.pk, principal.username), (user.pk, 'cached'))
+        self.assertNotIn(user.password, repr(cache.get(principal_cache_key(user.pk))))
+        self.assertEqual(principal.get_deferred_fields(), {'password'})
+        self.assertEqual(principal.password, user.password)
+
+    def test_deactivation_applies_at_once(self):
+        user = make_member('deactivated').user
+        # Cached principals outlive each test, and the ids repeat
+        invalidate_principal(user.pk)
+        client = APIClient()
+        response = client.post('/api/auth/login/', {'username': 'deactivated', 'password': 'secret'})
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['tokens']['access']}")
+        self.assertEqual(client.get('/api/classes/').status_code, 200)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(client.get('/api/classes/').status_code, 401)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'LOCATION': 'two-tier-tests',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_TIMEOUT': 30},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'tars-two-tier-tests'),
+    },
+})
+class TwoTierCacheTests(TestCase):
+    def local_expiry(self, key):
+        two_tier = caches['default']
+        expires_at, _ = two_tier._tier.entries[two_tier.make_and_validate_key(key)]
+        return expires_at - time.monotonic()
+
+    def test_local_copy_expires_with_the_shared_entry(self):
+        self.addCleanup(caches['default'].clear)
+        caches['shared'].set('lock', 1, 2)
+        caches['shared'].set('report', 'ready', 300)
+        self.assertEqual(caches['default'].get_many(['lock', 'report']), {'lock': 1, 'report': 'ready'})
+        self.assertLessEqual(self.local_expiry('lock'), 2)
+        self.assertGreater(self.local_expiry('report'), 25)
@@ -0,0 +1,230 @@
+"""
+Time-windowed meeting listings: /api/meetings/?from=&to=&status=&cursor=.
+
+Meetings are listed in start order on the key ``(scheduled_date, id)`` and
+paged by keyset: a cursor holds the key of the last (or first) meeting of a
+page, and the next (or previous) page continues strictly after (or before)
+it. A page costs the same however deep it is, and meetings added meanwhile
+don't shift the pages. ``from`` (inclusive) and ``to`` (exclusive) bound
+the starts.
+
+``status`` is Meeting.computed_status as SQL predicates on the start and
+end, so ``?status=upcoming`` is a range scan from now on the partial
+``(scheduled_date, id)`` index of active meetings (migration 0013). With
+MeetingViewSet's domain filter, a correlated subquery per row, the next page
+of upcoming meetings for a domain reads about a page of index entries
+however much history there is.
+
+Recurring meetings (core/recurrence.py) have no row per occurrence. The
+series that can reach the window come from their own partial index, their
+occurrences are generated from the window's lower bound on, and merged
+with the rows by key; an occurrence's key is its (possibly moved) start
+and its series' id. Going back from a cursor, each series is expanded from
+a look-back before the cursor that is widened only while it finds less
+than a page, not from the series' first occurrence.
+"""
+
+import base64
+import heapq
+import itertools
+import json
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.settings import api_settings
+
+from .models import Meeting, MeetingOverride
+from .recurrence import IS_SERIES, overridden_occurrences, parse_moment, parse_rrule, series_occurrences
+
+STATUSES = ('upcoming', 'ongoing', 'completed', 'cancelled')
+PERIOD_DAYS = {'DAILY': 1, 'WEEKLY': 7, 'MONTHLY': 31}
+MAX_PAGE_SIZE = 100
+
+Cursor = namedtuple('Cursor', 'start pk reverse')
+TimelineQuery = namedtuple('TimelineQuery', 'start end status cursor size')
+
+
+def encode_cursor(cursor):
+    data = json.dumps([cursor.start.isoformat(), cursor.pk, cursor.reverse], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """A Cursor from ``encode_cursor`` output; raises ValueError"""
+    try:
+        start, pk, reverse = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        start = parse_datetime(start)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor') from None
+    if start is None or timezone.is_naive(start) or type(pk) is not int or type(reverse) is not bool:
+        raise ValueError('Invalid cursor')
+    return Cursor(start, pk, reverse)
+
+
+def parse_query(params):
+    """The TimelineQuery of request query ``params``; raises ValueError"""
+    start = parse_moment(params['from'], 'from') if params.get('from') else None
+    end = parse_moment(params['to'], 'to') if params.get('to') else None
+    if start is not None and end is not None and end <= start:
+        raise ValueError('"to" must be after "from"')
+
+    status = params.get('status') or None
+    if status is not None and status not in STATUSES:
+        raise ValueError(f'"status" must be one of {", ".join(STATUSES)}')
+
+    cursor = decode_cursor(params['cursor']) if params.get('cursor') else None
+
+    size = params.get('page_size') or api_settings.PAGE_SIZE or MAX_PAGE_SIZE
+    if not str(size).isdigit() or not 1 <= int(size) <= MAX_PAGE_SIZE:
+        raise ValueError(f'"page_size" must be between 1 and {MAX_PAGE_SIZE}')
+    return TimelineQuery(start, end, status, cursor, int(size))
+
+
+def status_q(status, now):
+    """Meeting.computed_status == ``status`` at ``now``, in SQL"""
+    if status == 'cancelled':
+        return Q(status='cancelled')
+    started = Q(scheduled_date__lte=now)
+    # Without an end time a meeting lasts Meeting.DEFAULT_DURATION
+    ended = Q(end_time__lt=now) | Q(end_time__isnull=True, scheduled_date__lt=now - Meeting.DEFAULT_DURATION)
+    if status == 'upcoming':
+        condition = ~started
+    elif status == 'ongoing':
+        condition = started & ~ended
+    else:
+        condition = started & ended
+    return ~Q(status='cancelled') & condition
+
+
+def key(meeting):
+    return meeting.scheduled_date, meeting.pk
+
+
+def beyond_q(cursor):
+    """Rows strictly past ``cursor`` in its direction; the plain bound lets the index seek"""
+    if cursor.reverse:
+        return Q(scheduled_date__lte=cursor.start) & (Q(scheduled_date__lt=cursor.start) | Q(pk__lt=cursor.pk))
+    return Q(scheduled_date__gte=cursor.start) & (Q(scheduled_date__gt=cursor.start) | Q(pk__gt=cursor.pk))
+
+
+def start_bounds(query, now):
+    """The inclusive lower and exclusive upper bound on the starts ``query`` can list"""
+    lower, upper = query.start, query.end
+    if query.status == 'upcoming':
+        lower = now if lower is None else max(lower, now)
+    elif query.status in ('ongoing', 'completed'):
+        # Both have started
+        started = now + timedelta(microseconds=1)
+        upper = started if upper is None else min(upper, started)
+    return lower, upper
+
+
+def series_stream(series, query, lower, upper):
+    """The occurrences of ``series`` within the bounds and matching the status, in key order"""
+    if query.status == 'cancelled' and series.status != 'cancelled':
+        # Only the occurrences cancelled by overrides, so finitely many
+        occurrences = iter([
+            instance for instance in overridden_occurrences(series)
+            if instance.status == 'cancelled' and (lower is None or instance.scheduled_date >= lower)
+        ])
+    elif query.status not in (None, 'cancelled') and series.status == 'cancelled':
+        return iter(())
+    else:
+        occurrences = series_occurrences(series, lower)
+    if upper is not None:
+        occurrences = itertools.takewhile(lambda instance: instance.scheduled_date < upper, occurrences)
+    if query.status is not None:
+        occurrences = (instance for instance in occurrences if instance.computed_status == query.status)
+    return occurrences
+
+
+def occurrences_before(series, query, lower, upper, cursor_key, count):
+    """
+    The last ``count`` occurrences of ``series`` within the bounds, matching
+    the status and before ``cursor_key``, in key order
+    """
+    rule = parse_rrule(series.recurrence)
+    # Enough for ``count`` when none is cancelled, moved or filtered out
+    look_back = timedelta(days=PERIOD_DAYS[rule.freq] * rule.interval * (count + 1))
+    earliest = min([series.scheduled_date, *(
+        override.scheduled_date for override in series.overrides.all() if override.scheduled_date
+    )])
+    while True:
+        start = cursor_key[0] - look_back
+        exhausted = start <= earliest or (lower is not None and start <= lower)
+        if lower is not None:
+            start = max(start, lower)
+        found = deque(itertools.takewhile(
+            lambda instance: key(instance) < cursor_key, series_stream(series, query, start, upper)
+        ), count)
+        if len(found) == count or exhausted:
+            return found
+        look_back *= 4
+
+
+def timeline_page(meetings, query):
+    """
+    ``(page, previous, next)``: the meetings (and occurrences) of queryset
+    ``meetings`` on the page ``query`` asks for, in start order, and the
+    Cursors of the neighbouring pages (None where there's none).
+    """
+    now = timezone.now()
+    lower, upper = start_bounds(query, now)
+    cursor = query.cursor
+    reverse = cursor is not None and cursor.reverse
+    cursor_key = (cursor.start, cursor.pk) if cursor is not None else None
+
+    rows = meetings.exclude(IS_SERIES)
+    if query.start is not None:
+        rows = rows.filter(scheduled_date__gte=query.start)
+    if query.end is not None:
+        rows = rows.filter(scheduled_date__lt=query.end)
+    if query.status is not None:
+        rows = rows.filter(status_q(query.status, now))
+    if cursor is not None:
+        rows = rows.filter(beyond_q(cursor))
+    order = ('-scheduled_date', '-pk') if reverse else ('scheduled_date', 'pk')
+    rows = list(rows.order_by(*order)[:query.size + 1])
+
+    # Occurrences are generated from the cursor on, or up to it
+    if cursor is not None and not reverse:
+        lower = cursor.start if lower is None else max(lower, cursor.start)
+    elif reverse:
+        through = cursor.start + timedelta(microseconds=1)
+        upper = through if upper is None else min(upper, through)
+    series = meetings.filter(IS_SERIES).prefetch_related('overrides')
+    if upper is not None:
+        series = series.filter(scheduled_date__lt=upper)
+    if lower is not None:
+        # recurrence_end leaves out occurrences moved past the last one
+        moved_on = MeetingOverride.objects.filter(meeting=OuterRef('pk'), scheduled_date__gte=lower)
+        series = series.filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gt=lower) | Exists(moved_on))
+
+    if not reverse:
+        streams = [series_stream(instance, query, lower, upper) for instance in series]
+        if cursor is not None:
+            streams = [
+                itertools.dropwhile(lambda instance: key(instance) <= cursor_key, stream)
+                for stream in streams
+            ]
+        page = list(itertools.islice(heapq.merge(rows, *streams, key=key), query.size + 1))
+        more = len(page) > query.size
+        page = page[:query.size]
+    else:
+        # Occurrences only run forwards: keep the last few before the cursor
+        found = list(rows)
+        for instance in series:
+            found.extend(occurrences_before(instance, query, lower, upper, cursor_key, query.size + 1))
+        found.sort(key=key)
+        more = len(found) > query.size
+        page = found[-query.size:]
+
+    if not page:
+        return page, None, None
+    first, last = page[0], page[-1]
+    before = Cursor(*key(first), True) if (more if reverse else cursor is not None) else None
+    after = Cursor(*key(last), False) if (reverse or more) else None
+    return page, before, after
@@ -1,66 +1,198 @@
+import json
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, authentication_classes, action
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.db import models
-from .models import SiteSettings, Sponsor, SocialLink, Class, Resource, TeamMember, Domain, Member, Meeting
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser, SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from django.db import models, transaction
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+from .models import (
+    SiteSettings, Sponsor, SocialLink, Class, Resource, ResourceTag, Tag, TeamMember, Domain, Member, Meeting,
+    MeetingOverride,
+)
 from .serializers import (
     SiteSettingsSerializer, SponsorSerializer, SocialLinkSerializer,
     ClassSerializer, ResourceSerializer, TeamMemberSerializer,
-    DomainSerializer, MemberSerializer, MeetingSerializer
+    DomainSerializer, MemberSerializer, MeetingSerializer, MeetingOverrideSerializer, ResourceSearchSerializer
 )
+from .enrollment import enroll, unenroll
+from .calendar_feeds import feed_domains, feed_response, feed_token, feed_user, get_feed
+from .recurrence import occurrence, parse_moment
+from .scheduling import check_occurrence, check_schedule
+from .search import search_resources, search_people
+from .suggest import SOURCES, suggest_index
+from .snapshots import get_home_snapshot, snapshot_response
+from .throttling import DownloadRateThrottle
+from .timeline import encode_cursor, parse_query, timeline_page
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for read requests: ?fields=id,title keeps only those
+    fields, ?omit=description drops fields. Unrequested fields are never
+    evaluated and the queryset only loads the columns and relations the
+    remaining fields need (see DynamicFieldsModelSerializer).
+    """
 
+    def get_sparse_fieldset(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return {}
+        sparse = {}
+        for key in ('fields', 'omit'):
+            value = self.request.query_params.get(key)
+            names = [name.strip() for name in value.split(',') if name.strip()] if value else []
+            if names:
+                sparse[key] = names
+        return sparse
 
-class SiteSettingsViewSet(viewsets.ReadOnlyModelViewSet):
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_sparse_fieldset().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        sparse = self.get_sparse_fieldset()
+        if sparse:
+            serializer = self.get_serializer_class()(context=self.get_serializer_context(), **sparse)
+            queryset = serializer.optimize_queryset(queryset)
+        return queryset
+
+
+class SiteSettingsViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for site settings"""
     queryset = SiteSettings.objects.all()
     serializer_class = SiteSettingsSerializer
     permission_classes = [AllowAny]
 
 
-class SponsorViewSet(viewsets.ReadOnlyModelViewSet):
+class SponsorViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for sponsors"""
     queryset = Sponsor.objects.filter(is_active=True)
     serializer_class = SponsorSerializer
     permission_classes = [AllowAny]
 
 
-class SocialLinkViewSet(viewsets.ReadOnlyModelViewSet):
+class SocialLinkViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for social links"""
     queryset = SocialLink.objects.filter(is_active=True)
     serializer_class = SocialLinkSerializer
     permission_classes = [AllowAny]
 
 
-class ClassViewSet(viewsets.ReadOnlyModelViewSet):
+class ClassViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for classes - requires authentication"""
     queryset = Class.objects.filter(is_active=True)
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=True, methods=['post', 'delete'])
+    def enroll(self, request, pk=None):
+        """
+        POST takes a seat in the class for the member (409 when it's full or
+        closed), DELETE gives it up; both return the class
+        """
+        try:
+            member = request.user.member_profile
+        except Member.DoesNotExist:
+            return Response({'detail': 'Only members can enroll in classes'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            class_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'detail': 'No such class.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == 'DELETE':
+            if not unenroll(member, class_id):
+                return Response({'detail': 'Not enrolled in this class'}, status=status.HTTP_404_NOT_FOUND)
+            response_status = status.HTTP_200_OK
+        else:
+            _, created = enroll(member, class_id)
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        course = Class.objects.select_related('instructor').get(pk=class_id)
+        return Response(self.get_serializer(course).data, status=response_status)
+
 
-class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
+class ResourceViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for resources - requires authentication"""
-    queryset = Resource.objects.filter(is_active=True)
+    queryset = Resource.objects.filter(is_active=True).prefetch_related(
+        models.Prefetch('resource_tags', queryset=ResourceTag.objects.select_related('tag'))
+    )
     serializer_class = ResourceSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        """
+        Supports ?tag=<name> (single tag) and ?tags_all=a,b (resources
+        carrying every listed tag), both resolved through ResourceTag
+        """
+        queryset = super().get_queryset()
 
-class TeamMemberViewSet(viewsets.ReadOnlyModelViewSet):
+        names = Resource.parse_tags(self.request.query_params.get('tags_all'))
+        tag = self.request.query_params.get('tag', '').strip()
+        if tag:
+            names.append(tag)
+        if not names:
+            return queryset
+
+        tag_ids = list(Tag.objects.named(names).values_list('id', flat=True))
+        if len(tag_ids) < len({name.lower() for name in names}):
+            # At least one requested tag doesn't exist
+            return queryset.none()
+        for tag_id in tag_ids:
+            queryset = queryset.filter(resource_tags__tag_id=tag_id)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def tags(self, request):
+        """Tag facet: number of active resources per tag"""
+        counts = (
+            ResourceTag.objects.filter(resource__is_active=True)
+            .values('tag__name')
+            .annotate(count=models.Count('resource_id'))
+            .order_by('-count', 'tag__name')
+        )
+        return Response([{'name': row['tag__name'], 'count': row['count']} for row in counts])
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search: /api/resources/search/?q="""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'detail': 'Query parameter "q" is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = search_resources(query, self.get_queryset())
+        sparse = self.get_sparse_fieldset()
+        page = self.paginate_queryset(results)
+        if page is not None:
+            serializer = ResourceSearchSerializer(page, many=True, context=self.get_serializer_context(), **sparse)
+            return self.get_paginated_response(serializer.data)
+        serializer = ResourceSearchSerializer(results, many=True, context=self.get_serializer_context(), **sparse)
+        return Response(serializer.data)
+
+
+class TeamMemberViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for mentors/leads"""
     queryset = TeamMember.objects.filter(is_active=True)
     serializer_class = TeamMemberSerializer
     permission_classes = [AllowAny]
 
 
-class DomainViewSet(viewsets.ReadOnlyModelViewSet):
+class DomainViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for member domains"""
     queryset = Domain.objects.filter(is_active=True)
     serializer_class = DomainSerializer
     permission_classes = [AllowAny]
 
 
-class MemberViewSet(viewsets.ReadOnlyModelViewSet):
+class MemberViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for members (PII)"""
     queryset = Member.objects.filter(is_active=True)
     serializer_class = MemberSerializer
@@ -72,7 +204,7 @@ class MemberViewSet(viewsets.ReadOnlyModelViewSet):
         return Member.objects.filter(is_active=True, user=self.request.user).select_related('user', 'domain', 'lead')
 
 
-class MeetingViewSet(viewsets.ModelViewSet):
+class MeetingViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for meetings.
     - Team members (admin/lead/mentor) can create, update, delete meetings
@@ -80,7 +212,8 @@ class MeetingViewSet(viewsets.ModelViewSet):
     """
     serializer_class = MeetingSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Meeting.objects.all()  # Required for router.register()
+    # Every active meeting, what staff and team members see
+    queryset = Meeting.objects.filter(is_active=True).prefetch_related('domains', 'speaker', 'scheduled_by')
     
     def get_queryset(self):
         """
@@ -92,7 +225,7 @@ class MeetingViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         # Get all active meetings
-        meetings = Meeting.objects.filter(is_active=True).prefetch_related('domains', 'speaker', 'scheduled_by')
+        meetings = super().get_queryset()
         
         # If user is staff/admin, return all meetings
         if user.is_staff:
@@ -109,26 +242,48 @@ class MeetingViewSet(viewsets.ModelViewSet):
         # Regular member: filter by domain
         try:
             member = user.member_profile
+            # Show meetings for their domain OR meetings for all domains (no domains selected).
+            # Per meeting, 1 if it's in the member's domain, 0 if only in others, NULL if it
+            # has none (for everyone). A correlated subquery rather than a join (no DISTINCT)
+            # or EXISTS (which Postgres may hash over the whole table), so an index scan in
+            # start order stops after a page (core/timeline.py)
+            in_domain = models.Case(models.When(domain_id=member.domain_id, then=1), default=0)
+            domain_match = (
+                Meeting.domains.through.objects.filter(meeting=models.OuterRef('pk')).order_by()
+                .values('meeting').annotate(match=models.Max(in_domain)).values('match')
+            )
+            meetings = meetings.alias(domain_match=models.Subquery(domain_match))
             if member.domain:
-                # Show meetings for their domain OR meetings for all domains (no domains selected)
-                # A meeting with no domains means it's for everyone
-                meetings_for_domain = meetings.filter(domains__id=member.domain.id)
-                meetings_for_all = meetings.filter(domains__isnull=True)
-                # Also include meetings where domains field is empty (ManyToMany empty means for all)
-                meetings_with_no_domains = meetings.annotate(
-                    domain_count=models.Count('domains')
-                ).filter(domain_count=0)
-                return (meetings_for_domain | meetings_for_all | meetings_with_no_domains).distinct()
+                return meetings.filter(models.Q(domain_match=1) | models.Q(domain_match__isnull=True))
             else:
                 # No domain assigned, show only all-domains meetings
-                meetings_with_no_domains = meetings.annotate(
-                    domain_count=models.Count('domains')
-                ).filter(domain_count=0)
-                return meetings_with_no_domains.distinct()
+                return meetings.filter(domain_match__isnull=True)
         except:
             # User has no member profile, don't show any meetings
             return meetings.none()
     
+    def list(self, request, *args, **kwargs):
+        """
+        With ?from=, ?to= (ISO dates or datetimes), ?status= or ?cursor=: the
+        meetings starting in that window, recurring ones as their occurrences,
+        in start order and paged by keyset (see core/timeline.py)
+        """
+        params = request.query_params
+        if not {'from', 'to', 'status', 'cursor'} & params.keys():
+            return super().list(request, *args, **kwargs)
+        try:
+            query = parse_query(params)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        page, previous, following = timeline_page(self.get_queryset(), query)
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'cursor', encode_cursor(following)) if following else None,
+            'previous': replace_query_param(url, 'cursor', encode_cursor(previous)) if previous else None,
+            'results': self.get_serializer(page, many=True).data,
+        })
+    
     def create(self, request, *args, **kwargs):
         """Only team members can create meetings"""
         user = request.user
@@ -171,6 +326,65 @@ class MeetingViewSet(viewsets.ModelViewSet):
         
         return super().destroy(request, *args, **kwargs)
     
+    def perform_create(self, serializer):
+        """Save unless the meeting conflicts with another (409, see core/scheduling.py)"""
+        with transaction.atomic():
+            check_schedule(serializer.validated_data)
+            serializer.save()
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            check_schedule(serializer.validated_data, serializer.instance)
+            serializer.save()
+    
+    @action(detail=True, methods=['post', 'delete'])
+    def occurrences(self, request, pk=None):
+        """
+        Change or cancel one occurrence of a recurring meeting: POST the
+        override fields with its original_start (replacing any earlier
+        override); DELETE ?original_start= restores the occurrence
+        """
+        meeting = self.get_object()
+        user = request.user
+        
+        if not user.is_staff and (meeting.scheduled_by is None or meeting.scheduled_by.user != user):
+            return Response(
+                {'detail': 'You can only change meetings you created'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if request.method == 'DELETE':
+            try:
+                original_start = parse_moment(request.query_params.get('original_start'), 'original_start')
+            except ValueError as exc:
+                return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            deleted, _ = meeting.overrides.filter(original_start=original_start).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT if deleted else status.HTTP_404_NOT_FOUND)
+        
+        serializer = MeetingOverrideSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        values = {name: serializer.validated_data.get(name) for name in (
+            'title', 'scheduled_date', 'end_time', 'meeting_link', 'location'
+        )}
+        values['is_cancelled'] = serializer.validated_data.get('is_cancelled', False)
+        original_start = serializer.validated_data['original_start']
+        override = MeetingOverride(meeting=meeting, original_start=original_start, **values)
+        try:
+            override.clean()
+        except ValidationError as exc:
+            return Response({'detail': ' '.join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            if override.scheduled_date or override.end_time:
+                check_occurrence(meeting, occurrence(meeting, original_start, override))
+            override, created = MeetingOverride.objects.update_or_create(
+                meeting=meeting, original_start=original_start, defaults=values
+            )
+        return Response(
+            MeetingOverrideSerializer(override).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
     @action(detail=False, methods=['get'])
     def my_scheduled(self, request):
         """Get meetings scheduled by the current user"""
@@ -192,28 +406,28 @@ class MeetingViewSet(viewsets.ModelViewSet):
 @permission_classes([AllowAny])
 def home_page_data(request):
     """
-    Single endpoint to get all home page data
+    Single endpoint to get all home page data, served from the HomeSnapshot row
     """
-    # Get site settings (should be only one)
-    site_settings = SiteSettings.objects.first()
-    
-    # Get active sponsors
-    sponsors = Sponsor.objects.filter(is_active=True)
+    snapshot = get_home_snapshot()
+    if request.accepted_renderer.format != 'json':
+        # Browsable API / MessagePack render the data themselves
+        return Response(json.loads(bytes(snapshot.body)))
+    return snapshot_response(request, snapshot)
 
-    # Get active mentors/leads
-    mentors = TeamMember.objects.filter(is_active=True, role='mentor')
-    leads = TeamMember.objects.filter(is_active=True, role='lead')
-    
-    # Get active social links
-    social_links = SocialLink.objects.filter(is_active=True)
-    
-    return Response({
-        'site_settings': SiteSettingsSerializer(site_settings).data if site_settings else None,
-        'sponsors': SponsorSerializer(sponsors, many=True).data,
-        'mentors': TeamMemberSerializer(mentors, many=True).data,
-        'leads': TeamMemberSerializer(leads, many=True).data,
-        'social_links': SocialLinkSerializer(social_links, many=True).data,
-    })
+
+def portal_classes():
+    return ClassSerializer(Class.objects.filter(is_active=True), many=True).data
+
+
+def portal_resources():
+    return ResourceSerializer(Resource.objects.filter(is_active=True), many=True).data
+
+
+# Independent parts of /api/portal/; the async view runs them concurrently
+PORTAL_SECTIONS = {
+    'classes': portal_classes,
+    'resources': portal_resources,
+}
 
 
 @api_view(['GET'])
@@ -222,20 +436,83 @@ def member_portal_data(request):
     """
     Single endpoint to get all member portal data
     """
-    # Get active classes
-    classes = Class.objects.filter(is_active=True)
-    
-    # Get active resources
-    resources = Resource.objects.filter(is_active=True)
-    
-    return Response({
-        'classes': ClassSerializer(classes, many=True).data,
-        'resources': ResourceSerializer(resources, many=True).data,
-    })
+    return Response({name: build() for name, build in PORTAL_SECTIONS.items()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def calendar_subscription(request):
+    """
+    The URL of the user's iCalendar feed, for calendar apps to subscribe to
+    """
+    # Members, team members and staff only, like the feed itself
+    feed_domains(request.user)
+    token = feed_token(request.user)
+    return Response({'url': request.build_absolute_uri(reverse('calendar_feed', args=[token]))})
+
+
+@require_GET
+def calendar_feed(request, token):
+    """
+    iCalendar feed of the meetings and classes the token's user sees.
+    A plain view: calendar apps send neither a JWT nor an Accept header DRF can negotiate.
+    """
+    user = feed_user(token)
+    if user is None:
+        raise Http404("No such calendar feed")
+    etag, body = get_feed(feed_domains(user))
+    return feed_response(request, etag, body)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([IsAuthenticated])
+def suggest(request):
+    """
+    Typeahead over class/resource titles, team member names and domains:
+    /api/suggest/?q=&types=class,resource&limit=
+    Served from the in-process prefix index; authenticates from the token alone.
+    """
+    query = request.query_params.get('q', '')
+    types = request.query_params.get('types')
+    kinds = ({kind.strip() for kind in types.split(',') if kind.strip()} or None) if types else None
+    if kinds is not None and not kinds <= SOURCES.keys():
+        return Response(
+            {'detail': f"Unknown types: {', '.join(sorted(kinds - SOURCES.keys()))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+
+    suggest_index.ensure_fresh()
+    return Response({'results': suggest_index.suggest(query, limit, kinds)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def people_typeahead(request):
+    """
+    Staff typeahead over members and team members: /api/typeahead/people/?q=
+    """
+    query = request.query_params.get('q', '').strip()
+    if len(query) < 2:
+        return Response({'results': [], 'partial': False})
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+
+    results, partial = search_people(query, limit)
+    return Response({'results': results, 'partial': partial})
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([DownloadRateThrottle])
 def increment_download(request, resource_id):
     """
     Increment download count for a resource
@@ -0,0 +1,86 @@
+"""
+Gunicorn settings for production.
+
+Gunicorn reads ./gunicorn.conf.py on its own, so the usual start command
+picks these up (a --bind on the command line still wins):
+
+    gunicorn tars.wsgi:application
+
+- The app is imported and warmed up once in the master (preload_app, then
+  the when_ready hook), and workers are forked from it, sharing its memory
+  copy-on-write. A recycled worker starts without importing Django again.
+  With preload_app off, each worker warms its own copy (post_worker_init).
+- Each worker runs a few threads (gthread): requests mostly wait on the
+  database, and threads cover that wait while the processes cover the CPU.
+- Workers are recycled after GUNICORN_MAX_REQUESTS requests, with jitter
+  so they don't all restart at once.
+
+``manage.py benchmark_gunicorn`` compares this against a bare gunicorn.
+"""
+
+import math
+import os
+
+# Not "from decouple import config": gunicorn would read it as its --config setting
+import decouple
+
+
+def available_cpus():
+    """CPUs this process may use: the cgroup quota if there is one, else the affinity mask."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+bind = f"0.0.0.0:{decouple.config('PORT', default='8000')}"
+
+preload_app = True
+worker_class = 'gthread'
+workers = decouple.config('WEB_CONCURRENCY', default=available_cpus() + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=4, cast=int)
+
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = decouple.config('GUNICORN_MAX_REQUESTS_JITTER', default=max_requests // 10, cast=int)
+
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = timeout
+keepalive = 5
+
+# Worker heartbeats go to a tmpfs file where there is one (Docker's
+# overlay filesystem can stall the writes)
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def warm_up():
+    # core/warmup.py; gunicorn is the one place that knows a server is starting
+    from django.conf import settings
+
+    if settings.WARM_UP_ON_BOOT:
+        from core.warmup import warm_up
+
+        warm_up()
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        warm_up()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        warm_up()
+
+
+def pre_fork(server, worker):
+    # Warm-up ran in the master and left its DB connections open; a forked
+    # worker must not share those sockets with it or with its siblings
+    from django.db import connections
+
+    connections.close_all()
@@ -2,6 +2,8 @@
 ASGI config for tars project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with ``uvicorn tars.asgi:application``; core/async_views.py has
+the async endpoints.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +11,33 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import sync_to_async
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tars.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """
+    Django, plus the lifespan protocol Django doesn't speak: the server's
+    startup event opens DB connections and prebuilds caches before the
+    process takes traffic (core/warmup.py)
+    """
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+
+    from django.conf import settings
+
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if settings.WARM_UP_ON_BOOT:
+                from core.warmup import warm_up
+
+                await sync_to_async(warm_up)()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
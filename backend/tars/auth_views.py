@@ -1,5 +1,5 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -7,6 +7,19 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from core.profiles import get_profile
+from core.throttling import LoginRateThrottle, RegisterRateThrottle
+from .passwords import RETRY_AFTER, password_pool, PasswordPoolBusy
+
+
+def _busy_response():
+    """503 returned when the password hashing pool is saturated"""
+    return Response(
+        {'error': 'Too many sign-in attempts right now, please try again shortly'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(RETRY_AFTER)}
+    )
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -30,6 +43,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterRateThrottle])
 def register(request):
     """
     Register a new user
@@ -61,15 +75,22 @@ def register(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    # Hash on the bounded pool rather than inside create_user()
+    try:
+        encoded_password = password_pool.make_password(password)
+    except PasswordPoolBusy:
+        return _busy_response()
+
     # Create user
     try:
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
+        user = User(
+            username=User.normalize_username(username),
+            email=User.objects.normalize_email(email),
+            password=encoded_password,
             first_name=first_name,
             last_name=last_name
         )
+        user.save()
         
         # Generate tokens
         refresh = RefreshToken.for_user(user)
@@ -98,6 +119,7 @@ def register(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login(request):
     """
     Login user and return JWT tokens
@@ -111,7 +133,10 @@ def login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    user = authenticate(username=username, password=password)
+    try:
+        user = authenticate(username=username, password=password)
+    except PasswordPoolBusy:
+        return _busy_response()
     
     if user is None:
         return Response(
@@ -168,23 +193,24 @@ def logout(request):
 
 
 @api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
     """
     Get current user profile
+    
+    Authenticates from the token claims alone and serves the cached
+    profile, so the steady state never touches the database.
     """
-    user = request.user
+    profile = get_profile(request.user.id)
     
-    return Response({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'first_name': user.first_name,
-        'last_name': user.last_name,
-        'is_staff': user.is_staff,
-        'is_active': user.is_active,
-        'date_joined': user.date_joined,
-    }, status=status.HTTP_200_OK)
+    if profile is None or not profile['is_active']:
+        return Response(
+            {'error': 'User not found or inactive'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    return Response(profile, status=status.HTTP_200_OK)
 
 
 @api_view(['PUT', 'PATCH'])
@@ -12,12 +12,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import os
-from dotenv import load_dotenv
+import sys
+import tempfile
 from urllib.parse import urlparse, parse_qsl
 
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,34 +38,52 @@ ALLOWED_HOSTS = config(
 )
 
 # Add Render hostname if present
-if os.environ.get('RENDER_EXTERNAL_HOSTNAME'):
-    ALLOWED_HOSTS.append(os.environ.get('RENDER_EXTERNAL_HOSTNAME'))
+if config('RENDER_EXTERNAL_HOSTNAME', default=None):
+    ALLOWED_HOSTS.append(config('RENDER_EXTERNAL_HOSTNAME'))
+
+
+# Uploaded media go to Cloudinary when it's configured, else under MEDIA_ROOT
+USE_CLOUDINARY = bool(config('CLOUDINARY_CLOUD_NAME', default=''))
+
+# MEDIA_ROOT doesn't survive a redeploy: without DEBUG, local media must be
+# asked for rather than be what a missing or renamed variable falls back to
+if not DEBUG and not USE_CLOUDINARY and not config('LOCAL_MEDIA_STORAGE', default=False, cast=bool):
+    raise ImproperlyConfigured(
+        "CLOUDINARY_CLOUD_NAME is not set. Configure Cloudinary, or set "
+        "LOCAL_MEDIA_STORAGE=True to keep uploads under MEDIA_ROOT."
+    )
 
 
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # Registers ModelAdmins on first use rather than at startup (tars/apps.py)
+    "tars.apps.LazyAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "cloudinary_storage",
-    "cloudinary",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "corsheaders",
     "core",
 ]
 
+if USE_CLOUDINARY:
+    INSTALLED_APPS += ["cloudinary_storage", "cloudinary"]
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # 503 instead of a 500 when the password hashing pool turns a login away
+    "tars.passwords.PasswordPoolBusyMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -74,7 +92,10 @@ MIDDLEWARE = [
 
 STORAGES = {
     "default": {
-        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+        "BACKEND": (
+            "cloudinary_storage.storage.MediaCloudinaryStorage" if USE_CLOUDINARY
+            else "django.core.files.storage.FileSystemStorage"
+        ),
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -115,7 +136,7 @@ WSGI_APPLICATION = "tars.wsgi.application"
 #     }
 # }
 
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
+tmpPostgres = urlparse(config("DATABASE_URL", default=None))
 
 DATABASES = {
     'default': {
@@ -126,6 +147,9 @@ DATABASES = {
         'HOST': tmpPostgres.hostname,
         'PORT': 5432,
         'OPTIONS': dict(parse_qsl(tmpPostgres.query)),
+        # Keep connections between requests so warmed ones get reused
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -149,6 +173,19 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = [
+    'tars.passwords.PooledModelBackend',
+]
+
+# Password hashing pool (tars/passwords.py)
+# Caps how many PBKDF2 computations a worker runs at once during login bursts
+AUTH_HASHING = {
+    'MAX_WORKERS': config('AUTH_HASHING_MAX_WORKERS', default=2, cast=int),
+    'MAX_QUEUE': config('AUTH_HASHING_MAX_QUEUE', default=16, cast=int),
+    'QUEUE_TIMEOUT': config('AUTH_HASHING_QUEUE_TIMEOUT', default=5.0, cast=float),
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -173,9 +210,9 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 # Cloudinary Config
 CLOUDINARY_STORAGE = {
-    'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),
-    'API_KEY': os.environ.get('CLOUDINARY_API_KEY'),
-    'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET'),
+    'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=None),
+    'API_KEY': config('CLOUDINARY_API_KEY', default=None),
+    'API_SECRET': config('CLOUDINARY_API_SECRET', default=None),
 }
 
 
@@ -197,13 +234,114 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication with the user cached (core/authentication.py)
+        'core.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # Proxies that append to X-Forwarded-For (Render's one): throttles key
+    # on the address the last of them saw, not on what the client sent
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
+    # Token-bucket rates for core.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('THROTTLE_LOGIN', default='10/min'),
+        'register': config('THROTTLE_REGISTER', default='5/min'),
+        'token_refresh': config('THROTTLE_TOKEN_REFRESH', default='30/min'),
+        'download': config('THROTTLE_DOWNLOAD', default='60/min'),
+    },
+}
+
+# Per-worker LRU in front of a shared cache (core/cache_backends.py). The
+# shared tier is Redis when CACHE_REDIS_URL is set (needs the redis
+# package), otherwise a file cache shared by the workers on this host.
+# KEY_PREFIX keeps this backend's entries apart from the other backend's
+# when they share a Redis or a file cache directory.
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='tars')
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=2000, cast=int),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=30, cast=int),
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+    } if CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_FILE_DIR', default=os.path.join(tempfile.gettempdir(), 'tars-cache')),
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+    },
+}
+
+# Tests cache in memory: their users' ids repeat those of a local server's
+# database, and cached principals would outlive the run in the file cache
+if 'test' in sys.argv[1:2]:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tars-tests',
+    }
+
+# Seconds a cached JWT user lives (core/authentication.py)
+PRINCIPAL_CACHE_TIMEOUT = config('PRINCIPAL_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a cached /api/auth/profile/ payload lives (core/profiles.py)
+PROFILE_CACHE_TIMEOUT = config('PROFILE_CACHE_TIMEOUT', default=900, cast=int)
+
+# Seconds before a worker rebuilds its /api/suggest/ prefix index (core/suggest.py)
+SUGGEST_INDEX_TTL = config('SUGGEST_INDEX_TTL', default=300, cast=int)
+
+# iCalendar feeds (core/calendar_feeds.py): seconds a rendered feed is cached,
+# and how many days of past meetings and classes a feed keeps
+CALENDAR_FEED_CACHE_TIMEOUT = config('CALENDAR_FEED_CACHE_TIMEOUT', default=3600, cast=int)
+CALENDAR_FEED_PAST_DAYS = config('CALENDAR_FEED_PAST_DAYS', default=90, cast=int)
+
+# Cross-process cache invalidation over Postgres LISTEN/NOTIFY
+# (core/invalidation.py); both backends must use the same channel
+INVALIDATION_BUS = {
+    'ENABLED': config('INVALIDATION_BUS_ENABLED', default=True, cast=bool),
+    'CHANNEL': config('INVALIDATION_BUS_CHANNEL', default='tars_invalidation'),
+    'DATABASE': 'default',
+}
+
+# Run core.warmup.warm_up() when a server starts: gunicorn.conf.py's hooks,
+# or the ASGI lifespan startup (tars/asgi.py)
+WARM_UP_ON_BOOT = config('WARM_UP_ON_BOOT', default=True, cast=bool)
+
+# Seconds before /api/home/ re-renders its HomeSnapshot even without a
+# change signal (core/snapshots.py)
+HOME_SNAPSHOT_MAX_AGE = config('HOME_SNAPSHOT_MAX_AGE', default=3600, cast=int)
+
+# /api/batch/ limits (tars/batch.py); MAX_WORKERS=1 runs sub-requests serially
+BATCH_API = {
+    'MAX_REQUESTS': config('BATCH_MAX_REQUESTS', default=10, cast=int),
+    'MAX_WORKERS': config('BATCH_MAX_WORKERS', default=4, cast=int),
+}
+
+# gzip/brotli for API responses (core/middleware.py); compressed bodies of
+# the shared endpoints are cached by payload hash so unchanged payloads are
+# compressed once. SHARED_PATHS and EXCLUDED_PATHS keep their defaults
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CACHE_ALIAS': 'default',
+    'CACHE_TIMEOUT': config('COMPRESSION_CACHE_TIMEOUT', default=3600, cast=int),
+}
+
+# Rate limiter storage: 'memory' (per worker) or 'cache' (shared across workers)
+RATE_LIMIT = {
+    'BACKEND': config('RATE_LIMIT_BACKEND', default='memory'),
+    # Straight to the shared tier: a per-worker copy would undercount
+    'CACHE_ALIAS': 'shared',
 }
 
 # JWT Settings
@@ -3,6 +3,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db import connection
 from django.utils import timezone
+from core import warmup
+from core.cache_backends import cache_stats
+from .passwords import password_pool
 
 
 @api_view(['GET'])
@@ -17,6 +20,7 @@ def root(request):
             'health': '/api/health/',
             'info': '/api/info/',
             'home': '/api/home/',
+            'batch': '/api/batch/',
             'admin': '/admin/',
             'auth': {
                 'register': '/api/auth/register/',
@@ -40,13 +44,21 @@ def health_check(request):
     - API is running
     - Database connection is working
     - Returns current timestamp
+    Staff also get the password hashing pool's counters, which would tell
+    anyone else when login is saturated
     """
     health_status = {
         'status': 'healthy',
         'timestamp': timezone.now().isoformat(),
         'service': 'TARS Backend API',
-        'database': 'disconnected'
+        'database': 'disconnected',
+        'cache': cache_stats(),
+        'warm_up': {
+            key: value for key, value in (warmup.last_report or {}).items() if key != 'steps'
+        },
     }
+    if request.user.is_staff:
+        health_status['password_pool'] = password_pool.stats()
     
     # Check database connection
     try:
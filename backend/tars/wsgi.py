@@ -14,3 +14,6 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tars.settings")
 
 application = get_wsgi_application()
+
+# Warmed up by gunicorn.conf.py's hooks, not here: runserver and its
+# autoreloader import this module too